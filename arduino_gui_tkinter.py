@@ -1,35 +1,100 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import base64
+import os
 import sys
-import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import serial.tools.list_ports
 import threading
-import subprocess  # Cheese kamera uygulamasını başlatmak için
 import datetime    # Tarih bilgisi için
-import random      # Manuel hava durumu için rastgele değerler
+from domu_controller import LINK_BAUDRATE, DomuController, pot_to_temperature
+from domu_metrics import METRICS_PORT, REGISTRY, Histogram
+from domu_uiqueue import CoalescingUpdateQueue, TkUpdatePump
+
+# Açılışı hızlandırmak için yalnızca ilk karede gereken modüller burada
+# yüklenir; port izleyici (ctypes), geçmiş deposu (mmap), kamera, hava durumu
+# (urllib) ve filedialog kullanıldıkları yerde ya da ilk kareden sonra yüklenir.
+
+TREND_POINTS = 120  # Eğilim grafiğinde gösterilen son okuma sayısı
+HISTORY_MAINTAIN_MS = 60 * 60 * 1000  # Eski geçmişin kovalara indirilme aralığı
+DIAGNOSTICS_REFRESH_MS = 1000  # Tanılama penceresinin yenilenme aralığı
+
+# Tema renkleri - Açık Tema
+ROOT_BG_COLOR = "#E8F0F2"  # Ana pencere için çok açık mavi/gri
+BG_COLOR = "#FDFEFE"       # Widget'lar için genel arka plan (neredeyse beyaz)
+FG_COLOR = "#2C3E50"       # Metinler için koyu mavi/gri
+ACCENT_COLOR = "#5DADE2"   # Vurgu için açık mavi
+ACCENT_HOVER_COLOR = "#85C1E9" # Vurgu hover için biraz daha açık mavi
+FG_ON_ACCENT = "#FFFFFF"   # Vurgu rengi üzerindeki metin (beyaz)
+
+FRAME_BG_COLOR = "#FFFFFF" # Frame içerikleri için beyaz
+BUTTON_BG_COLOR = "#D5DBDB" # Standart butonlar için açık gri
+BUTTON_FG_COLOR = "#2C3E50"   # Standart buton metni
+BUTTON_ACTIVE_BG_COLOR = "#AEB6BF" # Standart buton aktif/hover için orta gri
+
+BORDER_COLOR = "#AAB7B8"   # Kenarlıklar için gri
+STATUS_FG_COLOR = "#566573" # Durum etiketi metni için orta koyu gri
+
+COMBO_FIELD_BG = "#FFFFFF"
+COMBO_SELECT_BG = "#D5DBDB" # Combobox seçili öğe arka planı
+
+SCALE_TROUGH_COLOR = "#D5DBDB" # Scale trough rengi
+PROGRESSBAR_BG = ACCENT_COLOR # Progressbar dolgu rengi (Açık Mavi)
+PROGRESSBAR_TROUGH_COLOR = "#D5DBDB" # Progressbar trough rengi
 
 class ArduinoControlGUI:
-    def __init__(self, root):
+    def __init__(self, root, controller=None, lazy=True, camera="auto", weather="random", replay=False):
+        """lazy=True ise yalnızca bağlantı ve ışık panelleri ilk karede kurulur;
+        diğer paneller ve arka plan işleri pencere göründükten sonra başlar.
+
+        camera: "auto" (OpenCV varsa USB kamera, yoksa zilde harici kamera
+        uygulaması), "opencv", "synthetic" ya da "none".
+        replay=True ise kayıt oynatılır: porta bağlanılmaz, olaylar kalıcı
+        günlüğe ve geçmişe yazılmaz, zil kapı sorusu açmaz."""
         self.root = root
         self.root.title("DOMU - Ev Otomasyonu Kontrol Paneli")
         self.root.geometry("960x680")  # Pencere boyutunu büyüttük
         self.root.resizable(True, True)  # Pencere yeniden boyutlandırılabilir
         
+        # Cihaz denetleyicisi: seri bağlantı, protokol ve cihaz durumu burada tutulur
+        self.controller = controller or DomuController()
+        self.metrics = self.controller.metrics
+        self.diagnostics_window = None
+
+        # Okuma thread'inden gelen güncellemeler: anahtar başına son değer tutulur,
+        # Tk thread'i kuyruğu sabit kare hızında toplu olarak uygular
+        self.ui_queue = CoalescingUpdateQueue(self.metrics)
+
+        self.controller.on("pot", lambda value: self.ui_queue.put("pot", self.on_pot_value, value))
+        self.controller.on("led", lambda index, on: self.ui_queue.put(("led", index), self.update_led_indicators_and_status, index))
+        self.controller.on("button", lambda: self.ui_queue.post(self.on_doorbell))
+        self.controller.on("door", lambda is_open: self.ui_queue.put("door", self.on_door_changed, is_open))
+
+        # finish_startup() ile ilk kareden sonra kurulanlar
+        self.started = False
+        self.pot_history = None
+        self.journal = None
+        self.automation = None
+        self.hvac = None
+        self.weather = None
+        self.weather_spec = weather
+        self.replay = replay
+        self.replay_dir = None  # Oynatma sırasındaki geçici olay günlüğü
+        self.port_watcher = None
+        self.link_supervisor = None
+        self.ui_pump = None
+        self.camera_mode = camera
+        self.camera = None
+        self.snapshots = None  # Kamera hazır olunca SnapshotPipeline
+        self.camera_viewer = False  # "auto" modunda görüntü alınamazsa zilde harici uygulama (cheese) açılır
+        self.snapshot_image = None  # PhotoImage referansı (çöp toplayıcı silmesin)
+
         # Uygulama değişkenleri
-        self.serial_port = None
-        self.led_status = [False, False, False, False]
         self.pot_value = tk.IntVar(value=0)
-        self.connected = False
-        self.reading_thread = None
-        self.stop_thread = False
-        self.visitor_count = 0  # Ziyaretçi sayacı
-        self.door_open = False  # Kapı durumu (açık/kapalı)
-        self.auto_update_temp = False  # Otomatik sıcaklık güncelleme
-        self.auto_update_job = None  # Zamanlayıcı işi
+        self.visitor_count = 0  # Ziyaretçi sayacı (açılışta olay günlüğünden okunur)
+        self.visitor_week_count = 0
+        self.auto_update_temp = False  # Otomatik sıcaklık güncelleme (pot aboneliği)
         
         # Hava durumu ve tarih değişkenleri
         self.current_date = datetime.datetime.now().strftime("%d.%m.%Y")
@@ -38,37 +103,199 @@ class ArduinoControlGUI:
         self.weather_condition = tk.StringVar(value="Bilinmiyor")
         self.weather_update_time = tk.StringVar(value="--:--")
 
-        # Stil ayarları
-        style = ttk.Style()
-        
-        # Tema renkleri - Açık Tema
-        ROOT_BG_COLOR = "#E8F0F2"  # Ana pencere için çok açık mavi/gri
-        BG_COLOR = "#FDFEFE"       # Widget'lar için genel arka plan (neredeyse beyaz)
-        FG_COLOR = "#2C3E50"       # Metinler için koyu mavi/gri
-        ACCENT_COLOR = "#5DADE2"   # Vurgu için açık mavi
-        ACCENT_HOVER_COLOR = "#85C1E9" # Vurgu hover için biraz daha açık mavi
-        FG_ON_ACCENT = "#FFFFFF"   # Vurgu rengi üzerindeki metin (beyaz)
+        self.LED_ON_COLOR = "#2ECC71"  # LED açıkken (yeşil)
+        self.LED_OFF_COLOR = "#D5DBDB" # LED kapalıyken (açık gri) - Buton rengine uygun hale getirildi
+
+        self.root.configure(bg=ROOT_BG_COLOR) # Ana pencere arka planı
+        self.configure_styles()
+
+        # Ana frame
+        main_frame = ttk.Frame(self.root, padding="8")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # DOMU başlık - daha küçük
+        title_label = ttk.Label(main_frame, text="DOMU - Ev Otomasyonu Kontrol Paneli", style="Title.TLabel")
+        title_label.pack(pady=(8, 12))
+
+        # Seri port bağlantı bölümü
+        connection_frame = ttk.LabelFrame(main_frame, text="Seri Port Bağlantısı")
+        connection_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(connection_frame, text="Port:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
+        self.port_combo = ttk.Combobox(connection_frame, width=30)
+        self.port_combo.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+
+        self.connect_button = ttk.Button(connection_frame, text="Bağlan", command=self.toggle_connection, style="Connect.TButton")
+        self.connect_button.grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Button(connection_frame, text="Tanılama", command=self.show_diagnostics).grid(
+            row=0, column=3, padx=5, pady=5, sticky=tk.W)
+
+        # Üst satır (Tarih/Hava Durumu ve Ziyaretçi) ile orta satır (Kapı ve
+        # Havalandırma) ilk kareden sonra doldurulur; yerleri şimdiden ayrılır
+        self.top_row_frame = ttk.Frame(main_frame)
+        self.top_row_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.mid_row_frame = ttk.Frame(main_frame)
+        self.mid_row_frame.pack(fill=tk.X, padx=5, pady=3)
+        self.mid_row_frame.columnconfigure(0, weight=1)  # Kapı kontrolü 1 birim
+        self.mid_row_frame.columnconfigure(1, weight=1)  # HVAC kontrolü 1 birim
+
+        # Ev Işığı Kontrolü bölümü
+        led_frame = ttk.LabelFrame(main_frame, text="Ev Işığı Kontrolü")
+        led_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        FRAME_BG_COLOR = "#FFFFFF" # Frame içerikleri için beyaz
-        BUTTON_BG_COLOR = "#D5DBDB" # Standart butonlar için açık gri
-        BUTTON_FG_COLOR = "#2C3E50"   # Standart buton metni
-        BUTTON_ACTIVE_BG_COLOR = "#AEB6BF" # Standart buton aktif/hover için orta gri
+        self.led_buttons = []
+        self.led_names = ["Mutfak", "Koridor", "Yatak Odası", "Oturma Odası"] # LED isimleri
         
-        BORDER_COLOR = "#AAB7B8"   # Kenarlıklar için gri
-        STATUS_FG_COLOR = "#566573" # Durum etiketi metni için orta koyu gri
+        # Butonlar için bir grid oluştur
+        led_grid = ttk.Frame(led_frame)
+        led_grid.pack(fill=tk.X, padx=5, pady=5)
         
-        COMBO_FIELD_BG = "#FFFFFF"
-        COMBO_SELECT_BG = "#D5DBDB" # Combobox seçili öğe arka planı
+        # Sütunların genişliklerini ayarla
+        led_grid.columnconfigure(0, weight=1)  
+        led_grid.columnconfigure(1, weight=1)
         
-        SCALE_TROUGH_COLOR = "#D5DBDB" # Scale trough rengi
-        PROGRESSBAR_BG = ACCENT_COLOR # Progressbar dolgu rengi (Açık Mavi)
-        PROGRESSBAR_TROUGH_COLOR = "#D5DBDB" # Progressbar trough rengi
+        # Butonları 2x2 grid olarak göster - daha kompakt yerleşim
+        for i in range(4):
+            row = i // 2  # İlk iki buton ilk satırda, sonraki ikisi ikinci satırda
+            col = i % 2   # 0 ve 2 ilk sütunda, 1 ve 3 ikinci sütunda
+            
+            led_button = ttk.Button(led_grid, text=self.led_names[i], 
+                                  command=lambda idx=i: self.toggle_led(idx),
+                                  style="LED.Off.TButton",
+                                  width=12) # Daha küçük butonlar
+            led_button.grid(row=row, column=col, padx=3, pady=3, sticky="ew") # Daha az boşluk
+            self.led_buttons.append(led_button)
 
-        self.LED_ON_COLOR = "#2ECC71"  # LED açıkken (yeşil)
-        self.LED_OFF_COLOR = "#D5DBDB" # LED kapalıyken (açık gri) - Buton rengine uygun hale getirildi
+        # Durum bilgisi
+        self.status_label = ttk.Label(main_frame, text="Durum: Bağlantı bekleniyor...", style="Status.TLabel")
+        self.status_label.pack(anchor=tk.S, side=tk.BOTTOM, pady=5, fill=tk.X)
 
-        self.root.configure(bg=ROOT_BG_COLOR) # Ana pencere arka planı
+        # Saat güncellemesini başlat
+        self.update_time()
+
+        if lazy:
+            self.root.bind("<Map>", self.on_first_map, add="+")
+        else:
+            self.finish_startup()
+
+    def on_first_map(self, event):
+        if event.widget is self.root and not self.started:
+            self.root.after(0, self.finish_startup)
+
+    def finish_startup(self):
+        """İlk kare çizildikten sonra kalan panelleri kurar ve arka plan işlerini başlatır."""
+        if self.started:
+            return
+        self.started = True
+        self.root.update_idletasks()  # İlk kareyi bitir
+
+        from domu_automation import DOOR_AUTO_CLOSE, AutomationEngine, EventRule, load_rules
+        from domu_daemon import DEFAULT_SOCKET_PATH, SOCKET_PREFIX
+        from domu_hvac import IDLE, HvacController
+        from domu_journal import DOOR, LIGHT, RING, VISITOR, EventJournal
+        from domu_link import LinkSupervisor
+        from domu_ports import PortWatcher
+        from domu_telemetry import DEFAULT_HISTORY_PATH, PotHistory
+        from domu_weather import WeatherService, provider_from_spec
+
+        self.configure_panel_styles()
+        self.build_info_panels(self.top_row_frame)
+        self.build_control_panels(self.mid_row_frame)
+
+        # Hedef sıcaklık geçmişi: okumalar okuma thread'inde kaydedilir
+        # (kayıt oynatılırken yalnızca bellekte; gerçek geçmişe karışmaz)
+        self.pot_history = PotHistory(None if self.replay else DEFAULT_HISTORY_PATH)
+        self.controller.on("pot", self.pot_history.record)
 
+        # Zil, kapı ve ışık olayları kalıcı günlüğe yazılır (okuma thread'inden, beklemeden).
+        # Kayıt oynatılırken geçici bir günlük kullanılır ve kapanınca silinir.
+        if self.replay:
+            import tempfile
+            self.replay_dir = tempfile.mkdtemp(prefix="domu-replay-")
+            self.journal = EventJournal(self.replay_dir, metrics=self.metrics)
+        else:
+            self.journal = EventJournal(metrics=self.metrics)
+        self.controller.on("button", lambda: self.journal.append(RING))
+        self.controller.on("door", lambda is_open: self.journal.append(DOOR, value=int(is_open)))
+        self.controller.on("led", lambda index, on: self.journal.append(LIGHT, index, int(on)))
+
+        # Ziyaretçi sayaçları günlüğün bölüm özetlerinden hesaplanır
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        week_start = today - datetime.timedelta(days=today.weekday())
+        self.visitor_count = self.journal.count(VISITOR)
+        self.visitor_week_count = self.journal.count(VISITOR, week_start.timestamp())
+        self.update_visitor_labels()
+
+        # Otomasyon kuralları Tk thread'i dışında, kendi zamanlayıcısında çalışır
+        # (kayıt oynatılırken kural yüklenmez: oynatılan olaylar karta komut göndermesin)
+        self.automation = AutomationEngine(self.controller, metrics=self.metrics)
+        if not self.replay:
+            self.automation.add_rule(EventRule("kapıyı otomatik kapat", "door", [("door", None, False)],
+                                               when=[True], delay=DOOR_AUTO_CLOSE))
+            try:
+                for rule in load_rules():
+                    self.automation.add_rule(rule)
+            except Exception as e:
+                print(f"Otomasyon kuralları okunamadı: {str(e)}")
+
+        # HVAC modu histerezisle seçilir; arayüz yalnızca mod değişince güncellenir.
+        # En kısa açık/kapalı süreleri otomasyon zamanlayıcısıyla beklenir.
+        self.hvac = HvacController(scheduler=self.automation.scheduler)
+        self.hvac.on(lambda *args: self.ui_queue.put("hvac", self.show_hvac_mode, *args))
+        self.show_hvac_mode(IDLE, None, None)
+
+        if self.replay:
+            # Kayıt oynatılırken gerçek bir kartın trafiği araya karışmasın
+            self.connect_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Durum: Kayıt oynatılıyor")
+        else:
+            # Bağlantı koparsa kendiliğinden yeniden bağlanılır; bekleyen komutlar kaybolmaz
+            self.link_supervisor = LinkSupervisor(self.controller, metrics=self.metrics)
+            self.link_supervisor.on(lambda *args: self.ui_queue.put("link", self.on_link_changed, *args))
+
+            # Port listesi arka planda izlenir; yalnızca takılan/çıkarılan portlar bildirilir.
+            # Kart yeniden takılınca gözetmen yeniden bağlanma beklemesini keser.
+            def on_ports(added, removed):
+                self.link_supervisor.ports_added(added)
+                self.ui_queue.post(self.on_ports_changed, added, removed)
+            self.port_watcher = PortWatcher(on_ports)
+
+        # Kartı paylaştıran yerel sunucu çalışıyorsa seri port onundur: sunucuya bağlanılır
+        if not self.replay and os.path.exists(DEFAULT_SOCKET_PATH):
+            daemon_port = f"{SOCKET_PREFIX}{DEFAULT_SOCKET_PATH}"
+            self.on_ports_changed([daemon_port], [])
+            if not self.controller.connected:
+                self.port_combo.set(daemon_port)
+
+        # Kamera açılışı yavaş olabilir (USB aygıt), arka planda başlat
+        if self.camera_mode != "none":
+            threading.Thread(target=self.start_camera, daemon=True).start()
+        
+        # Hava durumu işçi thread'inde alınır; önbellekteki son değer hemen gösterilir
+        # ve süresi dolunca arka planda yenilenir
+        try:
+            provider = provider_from_spec(self.weather_spec)
+        except Exception as e:
+            print(f"Hava durumu sağlayıcısı kurulamadı: {str(e)}")
+            provider = provider_from_spec("random")
+        self.weather = WeatherService(provider, scheduler=self.automation.scheduler, metrics=self.metrics)
+        self.weather.on(lambda weather: self.ui_queue.put("weather", self.show_weather, weather))
+        cached = self.weather.get()
+        if cached:
+            self.show_weather(cached)
+        self.weather.start()
+        
+        # Eski sıcaklık geçmişini arka planda kovalara indir
+        self.root.after(5000, self.maintain_history)
+
+        # Cihaz güncellemelerini uygulamaya başla
+        self.ui_pump = TkUpdatePump(self.root, self.ui_queue)
+
+    def configure_styles(self):
+        """İlk karede görünen widget'ların stilleri."""
+        style = ttk.Style()
         style.theme_use('clam') # Modern bir tema tabanı
 
         style.configure("TFrame", background=BG_COLOR)
@@ -112,7 +339,28 @@ class ArduinoControlGUI:
         style.map("LED.On.TButton", 
                   background=[("active", "#27AE60"), ("pressed", "#27AE60")],  # Koyu yeşil tonlar
                   relief=[("pressed", "sunken"), ("!pressed", "flat")])
-                  
+
+        style.configure("TLabelFrame", background=BG_COLOR, relief="solid", borderwidth=1) # bordercolor TLabelFrame'de doğrudan yok, relief ile gelir
+        style.configure("TLabelFrame.Label", background=BG_COLOR, foreground=ACCENT_COLOR, font=("Arial", 14, "bold"))
+
+        style.configure("TCombobox", 
+                        fieldbackground=COMBO_FIELD_BG, 
+                        background=BUTTON_BG_COLOR, # Combobox buton kısmı
+                        foreground=FG_COLOR, # Combobox metni
+                        arrowcolor=FG_COLOR, # Ok rengi
+                        selectbackground=COMBO_SELECT_BG, # Açılır liste seçili öğe arka planı
+                        selectforeground=ACCENT_COLOR, # Açılır liste seçili öğe metni (Açık Mavi)
+                        font=("Arial", 10))
+        style.map("TCombobox",
+                  fieldbackground=[("readonly", COMBO_FIELD_BG)],
+                  # selectbackground=[("readonly", COMBO_SELECT_BG)], # Bu satır bazen sorun çıkarabilir, gerekirse kaldırılabilir
+                  # selectforeground=[("readonly", ACCENT_COLOR)] # Bu satır bazen sorun çıkarabilir
+                  )
+
+    def configure_panel_styles(self):
+        """İlk kareden sonra kurulan panellerin stilleri."""
+        style = ttk.Style()
+
         # HVAC modu butonları için özel stiller
         style.configure("Heating.TButton", 
                         background="#E74C3C",
@@ -141,23 +389,6 @@ class ArduinoControlGUI:
                   background=[("active", "#27AE60"), ("pressed", "#27AE60")],
                   relief=[("pressed", "sunken"), ("!pressed", "flat")])
 
-        style.configure("TLabelFrame", background=BG_COLOR, relief="solid", borderwidth=1) # bordercolor TLabelFrame'de doğrudan yok, relief ile gelir
-        style.configure("TLabelFrame.Label", background=BG_COLOR, foreground=ACCENT_COLOR, font=("Arial", 14, "bold"))
-
-        style.configure("TCombobox", 
-                        fieldbackground=COMBO_FIELD_BG, 
-                        background=BUTTON_BG_COLOR, # Combobox buton kısmı
-                        foreground=FG_COLOR, # Combobox metni
-                        arrowcolor=FG_COLOR, # Ok rengi
-                        selectbackground=COMBO_SELECT_BG, # Açılır liste seçili öğe arka planı
-                        selectforeground=ACCENT_COLOR, # Açılır liste seçili öğe metni (Açık Mavi)
-                        font=("Arial", 10))
-        style.map("TCombobox",
-                  fieldbackground=[("readonly", COMBO_FIELD_BG)],
-                  # selectbackground=[("readonly", COMBO_SELECT_BG)], # Bu satır bazen sorun çıkarabilir, gerekirse kaldırılabilir
-                  # selectforeground=[("readonly", ACCENT_COLOR)] # Bu satır bazen sorun çıkarabilir
-                  )
-
         style.configure("Horizontal.TScale", background=BG_COLOR, troughcolor=SCALE_TROUGH_COLOR)
         # Scale thumb'ı için daha detaylı stil gerekebilir, ttk varsayılanını kullanır.
 
@@ -175,29 +406,8 @@ class ArduinoControlGUI:
                         lightcolor=PROGRESSBAR_BG, 
                         darkcolor=PROGRESSBAR_BG)
 
-        # Ana frame
-        main_frame = ttk.Frame(self.root, padding="8")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-
-        # DOMU başlık - daha küçük
-        title_label = ttk.Label(main_frame, text="DOMU - Ev Otomasyonu Kontrol Paneli", style="Title.TLabel")
-        title_label.pack(pady=(8, 12))
-
-        # Seri port bağlantı bölümü
-        connection_frame = ttk.LabelFrame(main_frame, text="Seri Port Bağlantısı")
-        connection_frame.pack(fill=tk.X, padx=5, pady=5)
-
-        ttk.Label(connection_frame, text="Port:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
-        self.port_combo = ttk.Combobox(connection_frame, width=30)
-        self.port_combo.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
-
-        self.connect_button = ttk.Button(connection_frame, text="Bağlan", command=self.toggle_connection, style="Connect.TButton")
-        self.connect_button.grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
-
-        # Üst satır bölümleri: Tarih/Hava Durumu ve Ziyaretçi yan yana
-        top_row_frame = ttk.Frame(main_frame)
-        top_row_frame.pack(fill=tk.X, padx=5, pady=5)
-        
+    def build_info_panels(self, top_row_frame):
+        """Tarih/Hava Durumu ve Ziyaretçi panelleri."""
         # Tarih ve Hava Durumu bölümü (sol kısım)
         weather_frame = ttk.LabelFrame(top_row_frame, text="Tarih ve Hava Durumu")
         weather_frame.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
@@ -238,15 +448,17 @@ class ArduinoControlGUI:
         visitor_frame = ttk.LabelFrame(top_row_frame, text="Ziyaretçi")
         visitor_frame.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         
-        self.visitor_count = 0  # Ziyaretçi sayacı
         self.visitor_label = ttk.Label(visitor_frame, text="Toplam Ziyaretçi: 0", font=("Arial", 14))
-        self.visitor_label.pack(anchor=tk.CENTER, padx=3, pady=6)
-        
-        # Kapı Kontrolü ve Havalandırma yan yana
-        mid_row_frame = ttk.Frame(main_frame)
-        mid_row_frame.pack(fill=tk.X, padx=5, pady=3)
-        mid_row_frame.columnconfigure(0, weight=1)  # Kapı kontrolü 1 birim
-        mid_row_frame.columnconfigure(1, weight=1)  # HVAC kontrolü 1 birim
+        self.visitor_label.pack(anchor=tk.CENTER, padx=3, pady=(6, 0))
+        self.visitor_week_label = ttk.Label(visitor_frame, text="Bu hafta: 0", font=("Arial", 9))
+        self.visitor_week_label.pack(anchor=tk.CENTER, padx=3, pady=(0, 6))
+
+        # Son zil görüntüsünün küçük resmi
+        self.snapshot_label = ttk.Label(visitor_frame, text="Kamera görüntüsü yok", font=("Arial", 8))
+        self.snapshot_label.pack(anchor=tk.CENTER, padx=3, pady=(0, 6))
+
+    def build_control_panels(self, mid_row_frame):
+        """Kapı ve Havalandırma panelleri."""
         # Kapı Kontrolü bölümü (sol kısım)
         door_frame = ttk.LabelFrame(mid_row_frame, text="Kapı Kontrolü")
         door_frame.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
@@ -295,6 +507,11 @@ class ArduinoControlGUI:
         self.hvac_mode_button = ttk.Button(hvac_mid_frame, text="", width=10)
         self.hvac_mode_button.grid(row=0, column=1, padx=2, pady=1, sticky="e")
         
+        # Hedef sıcaklık eğilimi (son okumalar)
+        self.trend_canvas = tk.Canvas(hvac_mid_frame, height=28, bg=FRAME_BG_COLOR, highlightthickness=0)
+        self.trend_canvas.grid(row=1, column=0, columnspan=2, padx=2, pady=1, sticky="ew")
+        self.trend_line = self.trend_canvas.create_line(0, 0, 0, 0, fill=ACCENT_COLOR, width=1.5)
+        
         # Butonlar yan yana
         hvac_buttons_frame = ttk.Frame(hvac_frame)
         hvac_buttons_frame.pack(fill=tk.X, padx=2, pady=1)
@@ -310,130 +527,89 @@ class ArduinoControlGUI:
                                       command=self.toggle_auto_update_temp,
                                       width=10)
         self.auto_update_button.grid(row=0, column=1, padx=2, pady=1, sticky="e")
-        
-        # Ev Işığı Kontrolü bölümü
-        led_frame = ttk.LabelFrame(main_frame, text="Ev Işığı Kontrolü")
-        led_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        self.led_buttons = []
-        self.led_names = ["Mutfak", "Koridor", "Yatak Odası", "Oturma Odası"] # LED isimleri
-        self.led_status = [False, False, False, False]  # LED durumları
-        
-        # Butonlar için bir grid oluştur
-        led_grid = ttk.Frame(led_frame)
-        led_grid.pack(fill=tk.X, padx=5, pady=5)
-        
-        # Sütunların genişliklerini ayarla
-        led_grid.columnconfigure(0, weight=1)  
-        led_grid.columnconfigure(1, weight=1)
-        
-        # Butonları 2x2 grid olarak göster - daha kompakt yerleşim
-        for i in range(4):
-            row = i // 2  # İlk iki buton ilk satırda, sonraki ikisi ikinci satırda
-            col = i % 2   # 0 ve 2 ilk sütunda, 1 ve 3 ikinci sütunda
-            
-            led_button = ttk.Button(led_grid, text=self.led_names[i], 
-                                  command=lambda idx=i: self.toggle_led(idx),
-                                  style="LED.Off.TButton",
-                                  width=12) # Daha küçük butonlar
-            led_button.grid(row=row, column=col, padx=3, pady=3, sticky="ew") # Daha az boşluk
-            self.led_buttons.append(led_button)
-
-        # Durum bilgisi
-        self.status_label = ttk.Label(main_frame, text="Durum: Bağlantı bekleniyor...", style="Status.TLabel")
-        self.status_label.pack(anchor=tk.S, side=tk.BOTTOM, pady=5, fill=tk.X)
-
-        # Port listesini güncelleme
-        self.update_ports()
-
-        # Periyodik port güncellemesi
-        self.root.after(2000, self.periodic_update_ports)
-        
-        # İlk hava durumu güncellemesi
-        self.root.after(1000, self.update_weather_info)
-        
-        # Saat güncellemesini başlat
-        self.update_time()
 
-    def update_ports(self):
+    def on_ports_changed(self, added, removed):
+        """Takılan ve çıkarılan portları listeye yansıtır."""
         # Mevcut port seçimini hatırla
         current_port = self.port_combo.get()
-        
-        # Port listesini güncelle
-        self.port_combo['values'] = [port.device for port in serial.tools.list_ports.comports()]
-        
-        # Önceki port hala varsa, onu seç
+
+        ports = [port for port in self.port_combo['values'] if port not in removed]
+        self.port_combo['values'] = sorted(ports + [port for port in added if port not in ports])
+
+        # Önceki port hala varsa, onu seç; bağlıyken seçim değiştirilmez
         if current_port in self.port_combo['values']:
             self.port_combo.set(current_port)
-        elif len(self.port_combo['values']) > 0:
-            self.port_combo.current(0)
-    
-    def periodic_update_ports(self):
-        # Bağlantı yoksa portları güncelle
-        if not self.connected:
-            self.update_ports()
-        # Her 2 saniyede bir kontrol et
-        self.root.after(2000, self.periodic_update_ports)
-    
-    def update_hvac_status(self, temperature):
-        """Sıcaklık değerine göre HVAC durumunu günceller."""
-        self.temp_label.config(text=f"Sıcaklık: {temperature} °C")
-        
-        # Sıcaklığa göre HVAC durumunu belirle
-        if temperature < 18:
-            status = "Isıtma Aktif"
-            status_text = f"Durum: {status} (Düşük Sıcaklık)"
-        elif temperature > 26:
-            status = "Soğutma Aktif"
-            status_text = f"Durum: {status} (Yüksek Sıcaklık)"
-        else:
-            status = "İdeal Sıcaklık"
-            status_text = f"Durum: {status} (Konforlu)"
-            
-        # HVAC durum etiketini güncelle
-        self.hvac_status.config(text=status_text)
-    
+        elif not self.controller.connected and not self.reconnecting():
+            if len(self.port_combo['values']) > 0:
+                self.port_combo.current(0)
+            else:
+                self.port_combo.set("")
+
+    def reconnecting(self):
+        return bool(self.link_supervisor and self.link_supervisor.reconnecting)
+
     def toggle_connection(self):
-        if not self.connected:
-            try:
-                port = self.port_combo.get()
-                if not port:
-                    messagebox.showwarning("Hata", "Lütfen bir seri port seçin.")
-                    return
-                
-                self.serial_port = serial.Serial(port, 9600, timeout=1)
-                time.sleep(2) # Arduino'nun reset olması için bekle
-                
-                self.connect_button.config(text="Bağlantıyı Kes")
-                self.status_label.config(text=f"Durum: {port} portuna bağlandı")
-                self.connected = True
-                
-                # Seri veri okuma thread'ini başlat
-                self.stop_thread = False
-                self.reading_thread = threading.Thread(target=self.read_serial_data)
-                self.reading_thread.daemon = True
-                self.reading_thread.start()
-                
-                # Arduino'dan mevcut durum bilgisini iste
-                self.request_pot_value()
-                
-            except Exception as e:
-                messagebox.showerror("Bağlantı Hatası", f"Seri porta bağlanırken hata oluştu: {str(e)}")
-                self.serial_port = None
+        if self.reconnecting():
+            # Yeniden bağlanmaktan vazgeç
+            self.link_supervisor.cancel()
+            self.controller.disconnect()
+            self.connect_button.config(text="Bağlan")
+            self.status_label.config(text="Durum: Bağlantı kesildi")
+        elif not self.controller.connected:
+            port = self.port_combo.get()
+            if not port:
+                messagebox.showwarning("Hata", "Lütfen bir seri port seçin.")
+                return
+
+            # Bağlantı (READY beklemesi dahil) arka planda kurulur; pencere donmaz
+            self.connect_button.config(state=tk.DISABLED)
+            self.status_label.config(text=f"Durum: {port} portuna bağlanılıyor...")
+            threading.Thread(target=self.connect_in_background, args=(port,), daemon=True).start()
         else:
-            # Thread'i durdur
-            self.stop_thread = True
-            if self.reading_thread:
-                self.reading_thread.join(timeout=1.0)
+            # Thread'i durdur ve bağlantıyı kapat
+            self.controller.disconnect()
             
-            # Bağlantıyı kapat
-            if self.serial_port and self.serial_port.is_open:
-                self.serial_port.close()
-            
-            self.serial_port = None
             self.connect_button.config(text="Bağlan")
             self.status_label.config(text="Durum: Bağlantı kesildi")
-            self.connected = False
+
+    def connect_in_background(self, port):
+        """Porta bağlanır; sonucu arayüz kuyruğuna bırakır (Tk thread'i dışında çalışır)."""
+        try:
+            self.controller.connect(port)
+        except Exception as e:
+            self.controller.disconnect()
+            self.ui_queue.post(self.on_connect_failed, e)
+            return
+        self.ui_queue.post(self.on_connected, port)
+
+    def on_connected(self, port):
+        self.connect_button.config(text="Bağlantıyı Kes", state=tk.NORMAL)
+        version = self.controller.protocol_version
+        detail = f"protokol {version}" if version is not None else "eski firmware"
+        self.status_label.config(text=f"Durum: {port} portuna bağlandı ({detail})")
+
+        # Arduino'dan mevcut durum bilgisini iste; otomatik güncelleme
+        # açıksa aboneliği yeniden başlat (ilk değer hemen gelir)
+        if self.auto_update_temp:
+            self.subscribe_pot_updates()
+        else:
+            self.request_pot_value()
+
+    def on_link_changed(self, connected, seconds):
+        """Bağlantı koptuğunda ya da kendiliğinden yeniden kurulduğunda (arayüz thread'inde)."""
+        if not connected:
+            self.status_label.config(text="Durum: Bağlantı koptu, yeniden bağlanılıyor...")
+            return
+        self.status_label.config(
+            text=f"Durum: {self.controller.port_name} portuna yeniden bağlandı ({seconds * 1000:.0f} ms)")
+        # Kart reset olduysa abonelik de gitmiştir
+        if self.auto_update_temp:
+            self.subscribe_pot_updates()
+
+    def on_connect_failed(self, error):
+        self.connect_button.config(text="Bağlan", state=tk.NORMAL)
+        self.status_label.config(text="Durum: Bağlantı kurulamadı")
+        messagebox.showerror("Bağlantı Hatası", f"Seri porta bağlanırken hata oluştu: {str(error)}")
     
     def toggle_led(self, led_index):
         if not self.check_connection():
@@ -441,8 +617,7 @@ class ArduinoControlGUI:
         
         try:
             # Arduino'ya LED komutunu gönder
-            command = f"LED:{led_index}\n"
-            self.serial_port.write(command.encode())
+            self.watch_command(self.controller.toggle_led(led_index), self.led_names[led_index])
             # Durum etiketini komut gönderildi olarak güncelle, Arduino'dan yanıt bekleniyor
             self.status_label.config(text=f"Durum: {self.led_names[led_index]} için komut gönderildi...")
 
@@ -455,98 +630,212 @@ class ArduinoControlGUI:
             return
             
         try:
-            command = "GET_POT\n"
-            self.serial_port.write(command.encode())
+            self.watch_command(self.controller.request_pot_value(), "Hedef sıcaklık")
             self.status_label.config(text="Durum: Hedef sıcaklık bilgisi istendi")
             
         except Exception as e:
             messagebox.showwarning("Hata", f"Hedef sıcaklık bilgisi istenirken hata: {str(e)}")
     
     def toggle_auto_update_temp(self):
-        """Otomatik sıcaklık güncellemeyi açar veya kapatır."""
+        """Otomatik sıcaklık güncellemeyi açar veya kapatır.
+        
+        Her saniye GET_POT göndermek yerine Arduino'ya abone olunur; Arduino
+        değer değiştikçe POT: satırını kendisi gönderir."""
         self.auto_update_temp = not self.auto_update_temp
         
         if self.auto_update_temp:
             # Otomatik güncellemeyi başlat
             self.status_label.config(text="Durum: Otomatik hedef sıcaklık güncelleme açıldı")
-            self.hvac_status.config(text="Durum: Otomatik güncellemede")
             self.auto_update_button.config(text="Otomatik Kapat")
             self.update_temp_button.config(state="disabled")  # Manuel butonunu devre dışı bırak
-            self.auto_update_job = self.root.after(1000, self.auto_update_temperature)
+            self.subscribe_pot_updates()
         else:
             # Otomatik güncellemeyi durdur
-            if self.auto_update_job:
-                self.root.after_cancel(self.auto_update_job)
-                self.auto_update_job = None
+            if self.controller.connected:
+                self.watch_command(self.controller.unsubscribe_pot(), "Otomatik güncelleme")
             self.status_label.config(text="Durum: Otomatik hedef sıcaklık güncelleme kapatıldı")
-            self.hvac_status.config(text="Durum: Beklemede")
             self.auto_update_button.config(text="Otomatik Güncelle")
             self.update_temp_button.config(state="normal")  # Manuel butonunu etkinleştir
+        # HVAC etiketi yalnızca mod değişince güncellenir: geçerli mod yeniden gösterilir
+        if self.hvac:
+            self.show_hvac_mode(self.hvac.mode, self.hvac.setpoint, self.hvac.temperature)
     
-    def auto_update_temperature(self):
-        """Periyodik olarak sıcaklık değerini günceller."""
-        if self.connected and self.auto_update_temp:
-            self.request_pot_value()
-            # 1 saniyede bir tekrarla
-            self.auto_update_job = self.root.after(1000, self.auto_update_temperature)
+    def subscribe_pot_updates(self):
+        """Bağlıysa Arduino'dan pot değişikliklerini göndermesini ister."""
+        if self.controller.connected:
+            self.watch_command(self.controller.subscribe_pot(), "Otomatik güncelleme")
     
-    def read_serial_data(self):
-        while not self.stop_thread:
-            if not self.serial_port or not self.serial_port.is_open:
-                time.sleep(0.1)
-                continue
-                
-            try:
-                if self.serial_port.in_waiting:
-                    data = self.serial_port.readline().decode('utf-8').strip()
-                    
-                    if data.startswith("POT:"):
-                        pot_value = int(data[4:])
-                        self.pot_value.set(pot_value)
-                        
-                        # Potansiyometre değerini istenen oda sıcaklığına dönüştür (15-30°C arasında)
-                        desired_temp = 15 + (pot_value / 1023) * 15
-                        formatted_temp = round(desired_temp, 1)
-                        
-                        # Sıcaklık ve HVAC durumunu güncelle
-                        self.root.after(0, lambda: self.update_hvac_status(formatted_temp))
-                        
-                    elif data.startswith("LED_OK:"): # Arduino'dan LED durum onayı geldiğinde
-                        led_index = int(data[7:])
-                        # LED durumunu tersine çevir
-                        self.led_status[led_index] = not self.led_status[led_index]
-                        # UI'ı güncelle - buton stilini değiştir
-                        led_idx = led_index  # Değişkeni kopyala
-                        self.root.after(0, lambda: self.update_led_indicators_and_status(led_idx))
-                            
-                    elif data == "BUTTON_PRESSED":
-                        # Butona basıldığında kamerayı aç ve popup göster
-                        self.root.after(0, self.open_camera_and_show_popup)
-                        
-                    elif data == "DOOR_OPENED":
-                        self.door_open = True
-                        self.root.after(0, lambda: self.status_label.config(text="Durum: Kapı açıldı"))
-                        
-                    elif data == "DOOR_CLOSED":
-                        self.door_open = False
-                        self.root.after(0, lambda: self.status_label.config(text="Durum: Kapı kapandı"))
-                        
-            except Exception as e:
-                print(f"Seri veri okuma hatası: {str(e)}")
-                
-            time.sleep(0.1)  # CPU kullanımını azaltmak için kısa bekleme
+    def watch_command(self, future, name):
+        """Komut yanıtsız kalırsa ya da başarısız olursa durum etiketinde gösterir."""
+        def done(f):
+            if f.cancelled():
+                return  # Olay döngüsü durdu (uygulama kapanıyor)
+            error = f.exception()
+            if error is not None:
+                self.ui_queue.put("status", lambda: self.status_label.config(text=f"Durum: {name} komutu başarısız ({error})"))
+        future.add_done_callback(done)
     
-    def open_camera_and_show_popup(self):
-        """Kamerayı açar ve kapı açma popup'ını gösterir."""
+    def show_diagnostics(self):
+        """Sayaçları ve gecikme histogramlarını gösteren pencereyi açar."""
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("DOMU - Tanılama")
+        window.geometry("720x420")
+        self.diagnostics_window = window
+
+        columns = ("value", "p50", "p99", "max", "count")
+        tree = ttk.Treeview(window, columns=columns)
+        tree.heading("#0", text="Ölçüm")
+        tree.column("#0", width=300)
+        for column, title in zip(columns, ("Değer", "p50 ms", "p99 ms", "Maks ms", "Sayı")):
+            tree.heading(column, text=title)
+            tree.column(column, width=80, anchor=tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.diagnostics_tree = tree
+
+        ttk.Button(window, text="Prometheus Dosyasına Kaydet", command=self.export_metrics).pack(pady=5)
+
+        def close():
+            self.root.after_cancel(self.diagnostics_job)
+            self.diagnostics_window = None
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Tanılama penceresi açıksa ölçümleri yeniler."""
+        if self.diagnostics_window is None:
+            return
+        tree = self.diagnostics_tree
+        tree.delete(*tree.get_children())
+        for name, kind, labels, metric in self.metrics.collect():
+            label = name + "".join(f" {key}={value}" for key, value in labels)
+            if isinstance(metric, Histogram):
+                tree.insert("", tk.END, text=label, values=(
+                    "", f"{metric.percentile(0.5) * 1000:.2f}", f"{metric.percentile(0.99) * 1000:.2f}",
+                    f"{metric.max * 1000:.2f}", metric.count))
+            else:
+                value = metric.value
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                tree.insert("", tk.END, text=label, values=(text, "", "", "", ""))
+        self.diagnostics_job = self.root.after(DIAGNOSTICS_REFRESH_MS, self.refresh_diagnostics)
+
+    def export_metrics(self):
+        """Ölçümleri Prometheus metin biçiminde dosyaya yazar."""
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self.diagnostics_window, defaultextension=".prom",
+                                            initialfile="domu.prom")
+        if not path:
+            return
+        try:
+            self.metrics.write_textfile(path)
+        except Exception as e:
+            messagebox.showerror("Hata", f"Ölçümler kaydedilemedi: {str(e)}")
+
+    def on_pot_value(self, pot_value):
+        """Arduino'dan gelen potansiyometre değerini arayüze yansıtır."""
+        self.pot_value.set(pot_value)
+        
+        # Sıcaklık ve HVAC durumunu güncelle
+        self.update_hvac_status(pot_to_temperature(pot_value))
+        self.draw_trend()
+    
+    def draw_trend(self):
+        """Son okumaları eğilim grafiğine çizer."""
+        values = self.pot_history.latest(TREND_POINTS)
+        if len(values) < 2:
+            return
+        width = max(self.trend_canvas.winfo_width(), 2)
+        height = max(self.trend_canvas.winfo_height(), 2)
+        step = (width - 1) / (TREND_POINTS - 1)
+        offset = (TREND_POINTS - len(values)) * step
+        coords = []
+        for i, value in enumerate(values):
+            coords.append(offset + i * step)
+            coords.append(height - 1 - (value / 1023) * (height - 2))
+        self.trend_canvas.coords(self.trend_line, *coords)
+    
+    def maintain_history(self):
+        """Sıcaklık geçmişini ve olay günlüğünü arayüzü bekletmeden bakıma alır."""
+        from domu_journal import KEEP_LIGHT_SECONDS
+        threading.Thread(target=self.pot_history.maintain, daemon=True).start()
+        # Eski ışık olaylarını günlükten at (ziyaretçi ve kapı kayıtları kalır)
+        older_than = datetime.datetime.now().timestamp() - KEEP_LIGHT_SECONDS
+        threading.Thread(target=self.journal.compact, args=(older_than,), daemon=True).start()
+        self.root.after(HISTORY_MAINTAIN_MS, self.maintain_history)
+    
+    def on_door_changed(self, is_open):
+        """Arduino'dan gelen kapı durumunu arayüze yansıtır."""
+        if is_open:
+            self.status_label.config(text="Durum: Kapı açıldı")
+        else:
+            self.status_label.config(text="Durum: Kapı kapandı")
+    
+    def start_camera(self):
+        """Kamerayı açar ve sürekli kare almaya başlar (arka plan thread'inde)."""
+        from domu_camera import Camera, OpenCVSource, SnapshotPipeline, SyntheticSource
+        try:
+            if self.camera_mode == "synthetic":
+                source = SyntheticSource()
+            else:
+                source = OpenCVSource()
+            camera = Camera(source)
+            camera.start()
+            self.camera = camera
+            self.snapshots = SnapshotPipeline(camera, metrics=self.metrics)
+        except Exception as e:
+            # "auto" modunda kamera olmaması hata sayılmaz: eski davranışa (harici uygulama) dönülür
+            if self.camera_mode != "auto":
+                self.ui_queue.post(messagebox.showwarning, "Kamera", f"Kamera başlatılamadı: {str(e)}")
+            else:
+                self.camera_viewer = True
+            print(f"Kamera başlatılamadı: {str(e)}")
+
+    def on_doorbell(self):
+        """Zil çalınca anlık görüntü alır ve kapı açma popup'ını gösterir."""
+        if self.replay:
+            # Kayıttaki zil: kamera ve kapı sorusu o anki kapıyla ilgili değildir
+            self.status_label.config(text="Durum: Zil çalındı (kayıt)")
+            return
+        future = self.snapshots.snapshot() if self.snapshots else None
+        if future:
+            # Görüntü işçi thread'lerinde kaydedilir; sonuç kuyruk üzerinden gelir
+            future.add_done_callback(lambda f: self.ui_queue.put("snapshot", self.show_snapshot, f))
+            self.status_label.config(text="Durum: Zil çalındı, kamera görüntüsü alınıyor")
+        elif self.camera_viewer:
+            self.open_camera_viewer()
+        else:
+            self.status_label.config(text="Durum: Zil çalındı")
+
+        # Popup göster
+        self.show_door_popup()
+
+    def open_camera_viewer(self):
+        """Görüntü alınamıyorsa kamerayı harici uygulamada (cheese) açar."""
+        import subprocess
         try:
-            # Cheese kamera uygulamasını başlat (arka planda)
             subprocess.Popen(["cheese"])
-            self.status_label.config(text="Durum: Kamera açıldı")
-            
-            # Popup göster
-            self.show_door_popup()
+            self.status_label.config(text="Durum: Zil çalındı, kamera açıldı")
         except Exception as e:
-            messagebox.showerror("Hata", f"Kamera açılırken hata oluştu: {str(e)}")
+            # Bir kez bildirilir; sonraki zillerde yalnızca kapı sorulur
+            self.camera_viewer = False
+            self.status_label.config(text="Durum: Zil çalındı (kamera kullanılamıyor)")
+            messagebox.showwarning("Kamera", f"Kamera açılamadı: {str(e)}")
+
+    def show_snapshot(self, future):
+        """Kaydedilen zil görüntüsünün küçük resmini ziyaretçi panelinde gösterir."""
+        try:
+            snapshot = future.result()
+        except Exception as e:
+            self.status_label.config(text=f"Durum: Kamera görüntüsü kaydedilemedi: {str(e)}")
+            return
+        if not self.started:
+            return
+        self.snapshot_image = tk.PhotoImage(data=base64.b64encode(snapshot.thumbnail_png))
+        time_text = datetime.datetime.fromtimestamp(snapshot.timestamp).strftime("%H:%M:%S")
+        self.snapshot_label.config(image=self.snapshot_image, text=time_text, compound=tk.TOP)
     
     def show_door_popup(self):
         """Kapı açma popup'ını gösterir."""
@@ -561,17 +850,14 @@ class ArduinoControlGUI:
             return
             
         try:
-            if not self.door_open:  # Kapı zaten açık değilse
-                command = "OPEN_DOOR\n"
-                self.serial_port.write(command.encode())
+            future = self.controller.open_door()
+            if future:  # Kapı zaten açık değilse
+                self.watch_command(future, "Kapı")
+                # Kapı, açıldığı bildirilince otomasyon kuralıyla 5 saniye sonra kapanır
                 self.status_label.config(text="Durum: Kapı açılıyor... (5 saniye sonra kapanacak)")
-                self.door_open = True
                 
                 # Ziyaretçi sayacını arttır
                 self.increment_visitor_count()
-                
-                # 5 saniye sonra kapıyı otomatik kapat
-                self.root.after(5000, self.auto_close_door)
             else:
                 self.status_label.config(text="Durum: Kapı zaten açık")
             
@@ -584,42 +870,37 @@ class ArduinoControlGUI:
             return
             
         try:
-            if self.door_open:  # Kapı açıksa
-                command = "CLOSE_DOOR\n"
-                self.serial_port.write(command.encode())
+            future = self.controller.close_door()
+            if future:  # Kapı açıksa
+                self.watch_command(future, "Kapı")
                 self.status_label.config(text="Durum: Kapı kapanıyor...")
-                self.door_open = False
             else:
                 self.status_label.config(text="Durum: Kapı zaten kapalı")
             
         except Exception as e:
             messagebox.showwarning("Hata", f"Kapı kapatılırken hata: {str(e)}")
     
-    def auto_close_door(self):
-        """Kapıyı otomatik olarak kapatır."""
-        if self.door_open:  # Kapı hala açıksa
-            try:
-                if self.serial_port and self.serial_port.is_open:
-                    command = "CLOSE_DOOR\n"
-                    self.serial_port.write(command.encode())
-                    self.status_label.config(text="Durum: Kapı otomatik kapanıyor...")
-                    self.door_open = False
-            except Exception as e:
-                print(f"Otomatik kapı kapatma hatası: {str(e)}")
-    
     def increment_visitor_count(self):
         """Ziyaretçi sayacını bir arttırır ve etiketi günceller."""
+        from domu_journal import VISITOR
+        if self.journal:
+            self.journal.append(VISITOR)
         self.visitor_count += 1
-        self.visitor_label.config(text=f"Toplam Ziyaretçi: {self.visitor_count}")
+        self.visitor_week_count += 1
+        self.update_visitor_labels()
         self.status_label.config(text=f"Durum: Yeni ziyaretçi geldi (Toplam: {self.visitor_count})")
     
+    def update_visitor_labels(self):
+        self.visitor_label.config(text=f"Toplam Ziyaretçi: {self.visitor_count}")
+        self.visitor_week_label.config(text=f"Bu hafta: {self.visitor_week_count}")
+
     def update_led_indicators_and_status(self, led_index):
         """Belirtilen LED'in buton rengini ve durum etiketini günceller."""
         # Bu metod sadece başka bir thread tarafından çağrıldığında
         # led_index değişkeninin doğru değeri alabilmesi için bir wrapper işlevi görür
         led_index_actual = led_index  # Yerel bir değişkene kopyala
         
-        if self.led_status[led_index_actual]:
+        if self.controller.led_status[led_index_actual]:
             # LED açıksa buton stilini değiştir
             self.led_buttons[led_index_actual].configure(style="LED.On.TButton")
             self.status_label.config(text=f"Durum: {self.led_names[led_index_actual]} açıldı")
@@ -629,99 +910,77 @@ class ArduinoControlGUI:
             self.status_label.config(text=f"Durum: {self.led_names[led_index_actual]} kapatıldı")
             
     def update_hvac_status(self, temperature):
-        """Sıcaklık değerine göre HVAC durumunu günceller."""
+        """Yeni hedef sıcaklığı gösterir ve HVAC denetleyicisine verir."""
+        if temperature == self.hvac.setpoint:
+            return
         self.temp_label.config(text=f"Hedef Sıcaklık: {temperature} °C")
-        
-        # Dışarıdaki hava sıcaklığını al (hava durumundan)
-        outside_temp = 0
-        try:
-            # Hava durumu sıcaklığı formattan çıkar (ör: "25.5 °C" -> 25.5)
-            outside_temp_str = self.temperature.get().replace(" °C", "")
-            outside_temp = float(outside_temp_str)
-        except:
-            outside_temp = temperature  # Hava durumu verisi yoksa sensör verisini kullan
-        
-        # Sıcaklığa göre HVAC durumunu belirle
-        if temperature < outside_temp:  # İstenilen oda sıcaklığı dışarıdan düşükse
-            status = "Soğutma Aktif"
-            status_text = f"Durum: {status} (Dış sıcaklık: {outside_temp}°C)"
-            hvac_mode = "Soğutma"
-            button_color = "#3498DB"  # Mavi
-        elif temperature > outside_temp:  # İstenilen oda sıcaklığı dışarıdan yüksekse
-            status = "Isıtma Aktif"
-            status_text = f"Durum: {status} (Dış sıcaklık: {outside_temp}°C)"
-            hvac_mode = "Isıtma"
-            button_color = "#E74C3C"  # Kırmızı
-        else:
-            status = "İdeal Sıcaklık"
-            status_text = f"Durum: {status} (Dış sıcaklık: {outside_temp}°C)"
-            hvac_mode = "Konfor"
-            button_color = "#2ECC71"  # Yeşil
-            
-        # HVAC durum etiketini güncelle
-        self.hvac_status.config(text=status_text)
-        
-        # HVAC modu butonunu güncelle - ttk.Button için özel stil tanımlama
-        self.hvac_mode_button.config(text=hvac_mode)
-        
-        # Buton stilini dinamik olarak ayarla
-        if hvac_mode == "Isıtma":
-            self.hvac_mode_button.configure(style="Heating.TButton")
-        elif hvac_mode == "Soğutma":
-            self.hvac_mode_button.configure(style="Cooling.TButton")
+        self.hvac.set_setpoint(temperature)
+
+    def show_hvac_mode(self, mode, setpoint, temperature):
+        """HVAC modu değişince durum etiketini ve mod butonunu günceller."""
+        from domu_hvac import COOL, HEAT
+        if mode == HEAT:
+            status, hvac_mode, style = "Isıtma Aktif", "Isıtma", "Heating.TButton"
+        elif mode == COOL:
+            status, hvac_mode, style = "Soğutma Aktif", "Soğutma", "Cooling.TButton"
         else:
-            self.hvac_mode_button.configure(style="Comfort.TButton")
+            status, hvac_mode, style = "İdeal Sıcaklık", "Konfor", "Comfort.TButton"
+        outside = f"{temperature}°C" if temperature is not None else "--"
+        self.hvac_status.config(text=f"Durum: {status} (Dış sıcaklık: {outside})")
+        self.hvac_mode_button.config(text=hvac_mode, style=style)
 
     def check_connection(self):
-        if not self.serial_port or not self.serial_port.is_open:
+        if not self.controller.connected:
             messagebox.showwarning("Bağlantı Hatası", "Arduino'ya bağlı değilsiniz.")
             return False
         return True
     
     def on_closing(self):
-        # Thread'i durdur
-        self.stop_thread = True
-        if self.reading_thread:
-            self.reading_thread.join(timeout=1.0)
-        
-        # Otomatik güncellemeyi durdur
-        if self.auto_update_job:
-            self.root.after_cancel(self.auto_update_job)
-        
-        # Bağlantıyı kapat
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        # Thread'i durdur ve bağlantıyı kapat (açılış bitmeden kapatılabilir)
+        if self.ui_pump:
+            self.ui_pump.stop()
+        if self.port_watcher:
+            self.port_watcher.stop()
+        if self.link_supervisor:
+            self.link_supervisor.cancel()
+        if self.weather:
+            self.weather.close()
+        if self.automation:
+            self.automation.stop()
+        if self.camera:
+            self.camera.stop()
+        if self.snapshots:
+            self.snapshots.close()
+        self.controller.disconnect()
+        if self.controller.recorder:
+            self.controller.recorder.close()
+        if self.pot_history:
+            self.pot_history.close()
+        if self.journal:
+            self.journal.close()
+        if self.replay_dir:
+            import shutil
+            shutil.rmtree(self.replay_dir, ignore_errors=True)
         
         # Uygulamayı kapat
         self.root.destroy()
 
     def update_weather_info(self):
-        """Hava durumu bilgilerini manuel olarak günceller."""
-        try:
-            # Manuel hava durumu bilgileri (API yerine sabit değerler kullanılıyor)
-            current_date = datetime.datetime.now()
-            
-            # Mevsimden bağımsız olarak 0-35 derece arası sıcaklık değerleri
-            temp = round(random.uniform(0.0, 35.0), 1)  # 0-35 derece arası rastgele
-            
-            # Mevsime göre farklı hava durumu koşulları
-            month = current_date.month
-            if month in [5, 6, 7, 8, 9]:  # Yaz ayları
-                conditions = ["Güneşli", "Parçalı bulutlu", "Az bulutlu", "Açık"]
-            else:  # Kış ayları
-                conditions = ["Bulutlu", "Yağmurlu", "Parçalı bulutlu", "Kapalı"]
-                
-            condition = random.choice(conditions)
-            
-            # Değişkenleri güncelle
-            self.temperature.set(f"{temp} °C")
-            self.weather_condition.set(condition)
-            self.weather_update_time.set(current_date.strftime("%H:%M"))
-            
-            self.status_label.config(text=f"Durum: Hava durumu bilgileri güncellendi ({self.weather_update_time.get()})")
-        except Exception as e:
-            print(f"Hava durumu güncellenirken hata: {str(e)}")
-    
+        """Hava durumunu arka planda yeniler; sonuç gelince show_weather çağrılır."""
+        if not self.weather:
+            return
+        self.weather.refresh()
+        self.status_label.config(text="Durum: Hava durumu güncelleniyor...")
+
+    def show_weather(self, weather):
+        """Yeni hava durumunu gösterir ve HVAC denetleyicisine verir."""
+        self.temperature.set(f"{weather.temperature} °C")
+        if self.hvac:
+            self.hvac.set_temperature(weather.temperature)  # Oda sensörü olmadığından dış sıcaklık ölçülen değerdir
+        self.weather_condition.set(weather.condition)
+        self.weather_update_time.set(datetime.datetime.fromtimestamp(weather.fetched_at).strftime("%H:%M"))
+        self.status_label.config(text=f"Durum: Hava durumu bilgileri güncellendi ({self.weather_update_time.get()})")
+
     def update_time(self):
         """Saat bilgisini periyodik olarak günceller."""
         try:
@@ -735,12 +994,96 @@ class ArduinoControlGUI:
             print(f"Saat güncellenirken hata: {str(e)}")
             # Hata olsa bile güncellemeye devam et
             self.root.after(1000, self.update_time)
-        
-        # Otomatik güncelleme kaldırıldı
-        # self.root.after(30 * 60 * 1000, self.update_weather_info)
 
 if __name__ == "__main__":
+    if "--async" in sys.argv:
+        # Thread'li okuyucu yerine tek bir asyncio olay döngüsü kullan
+        from domu_async import ThreadedAsyncController
+        controller = ThreadedAsyncController()
+    else:
+        # --baud [N]: bağlanınca kartla anlaşılacak hız (değer yoksa LINK_BAUDRATE;
+        # verilmezse denetleyici gibi 9600'de kalınır); --binary: ikili çerçeve.
+        # Eski firmware'de ikisi de yok sayılır.
+        link_baudrate = None
+        if "--baud" in sys.argv:
+            index = sys.argv.index("--baud") + 1
+            link_baudrate = (int(sys.argv[index]) if index < len(sys.argv) and sys.argv[index].isdigit()
+                             else LINK_BAUDRATE)
+        controller = DomuController(link_baudrate=link_baudrate, link_binary="--binary" in sys.argv)
+
+    if "--metrics-port" in sys.argv:
+        # Prometheus için http://127.0.0.1:<port>/metrics
+        index = sys.argv.index("--metrics-port") + 1
+        port = int(sys.argv[index]) if index < len(sys.argv) else METRICS_PORT
+        REGISTRY.serve(port)
+
+    # --camera auto|opencv|synthetic|none: zil görüntüsü kaynağı
+    camera = "auto"
+    if "--camera" in sys.argv:
+        index = sys.argv.index("--camera") + 1
+        camera = sys.argv[index] if index < len(sys.argv) else "synthetic"
+
+    # --weather random|file:<yol>|open-meteo:<enlem>,<boylam>: hava durumu kaynağı
+    weather = "random"
+    if "--weather" in sys.argv:
+        index = sys.argv.index("--weather") + 1
+        weather = sys.argv[index] if index < len(sys.argv) else weather
+
+    if "--record" in sys.argv:
+        # Ham seri trafiğini zaman damgalarıyla kaydet (domu_record.py dump/replay)
+        from domu_record import DEFAULT_RECORD_DIR, SessionRecorder
+        index = sys.argv.index("--record") + 1
+        path = (sys.argv[index] if index < len(sys.argv) else
+                os.path.join(DEFAULT_RECORD_DIR, datetime.datetime.now().strftime("domu-%Y%m%d-%H%M%S.rec")))
+        controller.recorder = SessionRecorder(path, metrics=REGISTRY)
+
     root = tk.Tk()
-    app = ArduinoControlGUI(root)
+    # --eager: bütün paneller ilk kareden önce kurulur (eski davranış)
+    app = ArduinoControlGUI(root, controller, lazy="--eager" not in sys.argv, camera=camera, weather=weather,
+                            replay="--replay" in sys.argv)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
+
+    if "--startup-bench" in sys.argv:
+        # domu_bench.py startup için: açılış anlarını (time.time) yazdır ve çık
+        import json
+        import resource
+        import time
+        marks = {}
+
+        def on_map(event):
+            if event.widget is root:
+                marks.setdefault("mapped", time.time())
+        root.bind("<Map>", on_map, add="+")
+
+        def first_iteration():
+            marks["first_iteration"] = time.time()
+            wait_started()
+
+        def wait_started():
+            if not app.started or "mapped" not in marks:
+                root.after(1, wait_started)
+                return
+            marks["ready"] = time.time()
+            marks["rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print("startup " + json.dumps(marks), flush=True)
+            app.on_closing()
+        root.after(0, first_iteration)
+
+    if "--replay" in sys.argv:
+        # Kaydı porta bağlanmadan çözücüye ve arayüze geri oynat:
+        # --speed N (N kat hızlı) ya da --fast (beklemeden)
+        from domu_record import replay
+        path = sys.argv[sys.argv.index("--replay") + 1]
+        speed = 1.0
+        if "--fast" in sys.argv:
+            speed = None
+        elif "--speed" in sys.argv:
+            speed = float(sys.argv[sys.argv.index("--speed") + 1])
+        feed = app.controller.feed
+        loop_thread = getattr(app.controller, "loop_thread", None)
+        if loop_thread is not None:
+            # asyncio arka ucunda çözücü ve Future'lar olay döngüsü thread'inde çalışmalı
+            feed = lambda data: loop_thread.loop.call_soon_threadsafe(app.controller.feed, bytes(data))
+        threading.Thread(target=replay, args=(path, feed, speed), daemon=True).start()
+
     root.mainloop()
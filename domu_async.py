@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""DOMU için asyncio tabanlı bağlantı.
+
+Port dosya tanıtıcısı olay döngüsüne (loop.add_reader) eklenir; okuma için
+thread açılmaz ve tek bir olay döngüsü birçok Arduino'ya hizmet verebilir.
+Durum, olaylar ve protokol DomuController ile ortaktır.
+
+Başsız kullanım:
+    async def main():
+        domu = AsyncDomuController()
+        await domu.connect("/dev/ttyACM0")
+        await domu.toggle_led(0)
+        print(await domu.get_pot())
+        async for name, args in domu.events():
+            print(name, args)
+
+Tk arayüzünden kullanım için ThreadedAsyncController, olay döngüsünü tek
+bir arka plan thread'inde çalıştırır ve DomuController ile aynı arayüzü sunar.
+
+Bağlantı koparsa link_lost_handler olay döngüsü thread'inden çağrılır
+(domu_link.LinkSupervisor yeniden bağlanır). Yanıtı beklenen güvenli
+komutlar (REPLAYABLE_COMMANDS) yeniden bağlanmayı replay_window kadar
+bekleyip aynı sıra numarasıyla tekrar gönderilir; diğerleri başarısız olur.
+"""
+
+import asyncio
+import os
+import random
+import threading
+
+import serial
+
+from domu_commands import (DEFAULT_RETRIES, DEFAULT_TIMEOUT, MAX_IN_FLIGHT, MAX_IN_FLIGHT_BYTES, MAX_SEQ,
+                           CommandStats, CommandTimeout, is_replayable, text_size)
+from domu_controller import BAUDRATE, HELLO_DELAY, READY_TIMEOUT, DomuController
+from domu_link import REPLAY_WINDOW
+
+EVENT_NAMES = ("pot", "led", "door", "button", "ready")
+EVENT_QUEUE_SIZE = 256  # events() kuyruğu dolarsa en eski olay atılır
+
+
+class AsyncCommandStats(CommandStats):
+    """AsyncDomuController'ın komut sayaçları (controller.commands).
+
+    Komutlar kendi görevlerinde bekler ve kopunca yeniden bağlanmayı kendileri
+    bekler; suspend/close/reopen yalnızca LinkSupervisor'la uyum içindir.
+    """
+
+    def __init__(self, metrics=None):
+        super().__init__(metrics)
+        self.in_flight = 0  # Penceredeki komutlar
+        self.queued = 0  # Pencerede yer bekleyen komutlar
+
+    def suspend(self, reason=None):
+        return 0
+
+    def close(self, reason=None):
+        pass
+
+    def reopen(self):
+        pass
+
+
+class AsyncDomuController(DomuController):
+    """Olay döngüsü üzerinde çalışan, thread'siz DOMU denetleyicisi.
+
+    Komut metotları (toggle_led, set_led, request_pot_value, request_state,
+    open_door, close_door) hemen gönderilmek üzere zamanlanmış bir asyncio.Future döndürür.
+    """
+
+    def __init__(self, baudrate=BAUDRATE, max_in_flight=MAX_IN_FLIGHT, metrics=None):
+        super().__init__(baudrate, metrics=metrics)
+        self.loop = None
+        self._fd = None
+        self._seq = random.randrange(MAX_SEQ)
+        self._acks = {}  # sıra -> asyncio.Future
+        self._window = asyncio.Semaphore(max_in_flight)
+        self._budget = asyncio.Condition()  # Yanıtsız satırların toplam baytı (her gönderim sayılır)
+        self._in_flight_bytes = 0
+        self.max_in_flight_bytes = MAX_IN_FLIGHT_BYTES
+        self._link_up = asyncio.Event()  # Bağlıyken kurulu; kopunca bekleyen komutlar bunu bekler
+        self.replay_window = REPLAY_WINDOW
+        self.codec.ack_handler = self._on_ack
+
+    def _create_commands(self):
+        # Gönderim _request'te yapılır; thread'li komut hattı kurulmaz, yalnızca sayaçlar tutulur
+        return AsyncCommandStats(self.metrics)
+
+    # Bağlantı
+
+    async def connect(self, port, ready_timeout=READY_TIMEOUT):
+        """Portu açar, olay döngüsüne ekler ve READY satırını bekler."""
+        self.loop = asyncio.get_running_loop()
+        self._link_up.clear()
+        self.serial_port = serial.Serial(port, self.baudrate, timeout=0)
+        self.port_name = port
+        self.protocol_version = None
+        self._ready.clear()
+        self._fd = self.serial_port.fileno()
+        self.loop.add_reader(self._fd, self._on_readable)
+        self._connecting = True
+        try:
+            if ready_timeout:
+                await self.wait_ready_async(ready_timeout)
+        finally:
+            self._connecting = False
+        self._link_up.set()  # Kopukken bekleyen komutlar durum eşitlemesinden önce gönderilir
+        future = self.sync_state()
+        if future is not None:
+            try:
+                await future
+            except Exception as e:
+                print(f"Cihaz durumu okunamadı: {str(e)}")
+
+    async def wait_ready_async(self, timeout=READY_TIMEOUT):
+        """DomuController.wait_ready'nin olay döngüsünü bloklamayan karşılığı."""
+        ready = self.loop.create_future()
+
+        def on_ready(version):
+            if not ready.done():
+                ready.set_result(version)
+        if self._ready.is_set():
+            return self.protocol_version
+        self.on("ready", on_ready)
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), min(HELLO_DELAY, timeout))
+        except asyncio.TimeoutError:
+            if timeout > HELLO_DELAY:
+                self.send("HELLO")
+                try:
+                    await asyncio.wait_for(ready, timeout - HELLO_DELAY)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.off("ready", on_ready)
+        return self.protocol_version
+
+    async def disconnect(self):
+        self._close("Bağlantı kapandı")
+        self.port_name = None
+        self._link_up.set()  # Yeniden bağlanmayı bekleyen komutlar uyansın ve başarısız olsun
+
+    def close_port(self):
+        """Portu kapatır; port adı yeniden bağlanma denemeleri için korunur."""
+        self._close("Bağlantı kapandı")
+
+    def _close(self, reason):
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._fd = None
+        if self.serial_port and self.serial_port.is_open:
+            self.serial_port.close()
+        self.serial_port = None
+        self._link_up.clear()
+        for future in self._acks.values():
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+        self._acks.clear()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except OSError as e:
+            print(f"Seri veri okuma hatası: {str(e)}")
+            data = b""
+        if not data:
+            # Port kapandı (ör. kablo çekildi)
+            self._on_link_lost(ConnectionError("Port kapandı"))
+            return
+        self.feed(data)
+
+    def _on_link_lost(self, error):
+        """Olay döngüsü thread'inden çağrılır: port kullanılamaz hale geldi."""
+        if self.serial_port is None:
+            return
+        print(f"Cihaz bağlantısı koptu: {str(error)}")
+        self._close("Cihaz bağlantısı koptu")  # Bekleyen yanıtlar ConnectionError ile biter
+        if self.link_lost_handler:
+            self.link_lost_handler(error)
+        else:
+            self.port_name = None
+
+    # Komutlar
+
+    def request(self, command, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        """Komutu sıra numarasıyla gönderir; yanıt satırını veren Future döndürür."""
+        future = asyncio.ensure_future(self._request(command, timeout, retries))
+        future.add_done_callback(lambda f: self._on_command_done(command, f))
+        return future
+
+    async def _request(self, command, timeout, retries):
+        stats = self.commands
+        stats.queued += 1
+        try:
+            await self._window.acquire()
+        finally:
+            stats.queued -= 1
+        stats.in_flight += 1
+        try:
+            self._seq = self._seq % MAX_SEQ + 1
+            seq = self._seq
+            future = self.loop.create_future()
+            self._acks[seq] = future
+            sent_at = self.loop.time()
+            try:
+                attempt = 0
+                while True:
+                    if not self.connected:
+                        await self._wait_link(command)
+                    line = f"{command}#{seq}"
+                    size = text_size(line)
+                    await self._reserve(size)
+                    if not self.connected:
+                        await self._release(size)  # Beklerken koptu
+                        continue
+                    try:
+                        self.send(line)
+                    except (serial.SerialException, OSError) as e:
+                        # Kablo çekilince yazma okumadan önce hata verebilir
+                        self._on_link_lost(e)
+                    else:
+                        stats.sent += 1  # Her yazım sayılır (thread'li hattaki gibi)
+                    try:
+                        # shield: zaman aşımı bekleyen yanıtı iptal etmesin
+                        reply = await asyncio.wait_for(asyncio.shield(future), timeout)
+                    except asyncio.TimeoutError:
+                        await self._release(size)  # Kart satırı ya işledi ya da attı
+                        if attempt == retries:
+                            stats.timed_out += 1
+                            raise CommandTimeout(f"{command} komutuna yanıt gelmedi")
+                        attempt += 1
+                        stats.retried += 1
+                        continue
+                    except ConnectionError:
+                        await self._release(size)
+                        # Bağlantı koptu: güvenli komut yeniden bağlanınca tekrar gönderilir
+                        # (kart reset olmuş olabilir; senkron hattaki gibi yeni sıra numarasıyla)
+                        await self._wait_link(command)
+                        self._acks.pop(seq, None)
+                        self._seq = self._seq % MAX_SEQ + 1
+                        seq = self._seq
+                        future = self._acks[seq] = self.loop.create_future()
+                        stats.replayed += 1
+                        continue
+                    await self._release(size)
+                    stats.acked += 1
+                    stats.record_latency(command, self.loop.time() - sent_at)
+                    return reply
+            finally:
+                self._acks.pop(seq, None)
+        finally:
+            stats.in_flight -= 1
+            self._window.release()
+
+    async def _reserve(self, size):
+        """Satır kartın alma tamponuna sığana kadar bekler (senkron hattaki bayt sınırı)."""
+        async with self._budget:
+            await self._budget.wait_for(
+                lambda: not self._in_flight_bytes or self._in_flight_bytes + size <= self.max_in_flight_bytes)
+            self._in_flight_bytes += size
+
+    async def _release(self, size):
+        async with self._budget:
+            self._in_flight_bytes -= size
+            self._budget.notify_all()
+
+    async def _wait_link(self, command):
+        """Kopuk bağlantının yeniden kurulmasını bekler; komut beklenemiyorsa ConnectionError."""
+        if self.link_lost_handler is None or self.port_name is None or not is_replayable(command):
+            raise ConnectionError("Bağlantı kapalı")
+        try:
+            await asyncio.wait_for(self._link_up.wait(), self.replay_window)
+        except asyncio.TimeoutError:
+            raise ConnectionError("Cihaza yeniden bağlanılamadı") from None
+        if not self.connected:
+            raise ConnectionError("Bağlantı kapalı")
+
+    def _on_ack(self, seq, reply):
+        future = self._acks.get(seq)
+        if future is not None and not future.done():
+            future.set_result(bytes(reply).decode('utf-8', 'replace'))
+
+    async def get_pot(self):
+        """Potansiyometre değerini ister ve döndürür."""
+        reply = await self.request_pot_value()
+        return int(reply[4:])
+
+    # Olay akışı
+
+    async def events(self, names=EVENT_NAMES):
+        """Cihaz olaylarını (ad, argümanlar) olarak veren asenkron akış."""
+        queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+
+        def push(name, args):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((name, args))
+
+        callbacks = {name: (lambda *args, name=name: push(name, args)) for name in names}
+        for name, callback in callbacks.items():
+            self.on(name, callback)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            for name, callback in callbacks.items():
+                self.off(name, callback)
+
+
+class LoopThread:
+    """Tek bir asyncio olay döngüsünü arka plan thread'inde çalıştırır."""
+
+    _shared = None
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def run(self, coro):
+        """Coroutine'i döngüde çalıştırır; concurrent.futures.Future döndürür."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, function, *args):
+        """Fonksiyonu döngü thread'inde çağırır ve sonucunu bekler."""
+        async def invoke():
+            return function(*args)
+        return self.run(invoke()).result()
+
+
+class ThreadedAsyncController:
+    """AsyncDomuController'ı başka bir thread'den (ör. Tk) kullanmak için
+    DomuController ile aynı arayüzü sunan sarmalayıcı."""
+
+    def __init__(self, loop_thread=None):
+        self.loop_thread = loop_thread or LoopThread.shared()
+        self.controller = self.loop_thread.call(AsyncDomuController)
+
+    def __getattr__(self, name):
+        # Durum (led_status, door_open, pot_value, connected) ve on/off
+        return getattr(self.controller, name)
+
+    @property
+    def recorder(self):
+        return self.controller.recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        self.controller.recorder = recorder
+
+    @property
+    def link_lost_handler(self):
+        return self.controller.link_lost_handler
+
+    @link_lost_handler.setter
+    def link_lost_handler(self, handler):
+        # Olay döngüsü thread'inden çağrılır; işleyici (LinkSupervisor) bloklamamalıdır
+        self.controller.link_lost_handler = handler
+
+    def connect(self, port):
+        self.loop_thread.run(self.controller.connect(port)).result()
+
+    def disconnect(self):
+        self.loop_thread.run(self.controller.disconnect()).result()
+
+    def close_port(self):
+        self.loop_thread.call(self.controller.close_port)
+
+    def _command(self, method, *args):
+        async def invoke():
+            future = method(*args)
+            return None if future is None else await future
+        return self.loop_thread.run(invoke())
+
+    def toggle_led(self, led_index):
+        return self._command(self.controller.toggle_led, led_index)
+
+    def set_led(self, led_index, on):
+        return self._command(self.controller.set_led, led_index, on)
+
+    def request_pot_value(self):
+        return self._command(self.controller.request_pot_value)
+
+    def request_state(self):
+        return self._command(self.controller.request_state)
+
+    def subscribe_pot(self, *args):
+        return self._command(self.controller.subscribe_pot, *args)
+
+    def unsubscribe_pot(self):
+        return self._command(self.controller.unsubscribe_pot)
+
+    def open_door(self):
+        if self.controller.door_open:
+            return None
+        return self._command(self.controller.open_door)
+
+    def close_door(self):
+        if not self.controller.door_open:
+            return None
+        return self._command(self.controller.close_door)
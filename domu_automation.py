@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""Sahneler ve otomasyon kuralları.
+
+Scheduler: ikili yığın (heapq) üzerinde çalışan tek bir zamanlayıcı
+thread'i. Zamanlama ve her tetikleme O(log n) sürer; iptal edilen
+zamanlayıcılar yığından hemen silinmez, sırası gelince atlanır. Bekleyen
+çağrı sayısı iptalde düşülür; iptal edilenler yığının yarısını aşınca yığın
+temizlenir (gecikmesi sürekli yeniden başlayan kurallar yığını büyütmez).
+
+Kurallar:
+    DailyRule  Her gün belirli saatte çalışır (ör. "hol ışığı 18:30'da açılsın")
+    EventRule  Denetleyici olayında çalışır, isteğe bağlı gecikmeyle
+               (ör. "kapı açılınca 5 saniye sonra kapansın")
+
+Kuralların eylemleri doğrudan gönderilmez. Kısa bir süre (BATCH_WINDOW)
+içinde tetiklenen bütün eylemler toplanır, aynı hedefe giden eylemlerden
+yalnızca sonuncusu tutulur ve durum önbelleği zaten istenen değerdeyse
+komut hiç gönderilmez. Aynı dakikaya kurulmuş yüzlerce kural bu yüzden
+yalnızca birkaç komuta dönüşür.
+
+Eylemler: ("led", <indeks>, true|false) ve ("door", null, true|false).
+
+Kural dosyası (JSON):
+    {"rules": [
+        {"name": "hol ışığı", "at": "18:30", "actions": [["led", 1, true]]},
+        {"name": "yatak odası", "at": "06:30", "days": [0, 1, 2, 3, 4], "actions": [["led", 3, true]]},
+        {"name": "kapıyı kapat", "event": "door", "when": [true], "delay": 5,
+         "actions": [["door", null, false]]}]}
+"""
+
+import datetime
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+BATCH_WINDOW = 0.02  # Eylemlerin tek seferde gönderilmek üzere toplandığı süre (saniye)
+DOOR_AUTO_CLOSE = 5.0  # Kapı açıldıktan sonra otomatik kapanma süresi (saniye)
+DEFAULT_RULES_PATH = os.path.join(os.path.expanduser("~"), ".domu", "automations.json")
+COMPACT_MIN = 64  # Yığın bu kadar iptal edilmiş çağrı birikmeden temizlenmez
+
+
+class TimerHandle:
+    """Zamanlanmış tek bir çağrı; cancel() ile iptal edilir."""
+
+    __slots__ = ("when", "callback", "args", "cancelled", "_scheduler")
+
+    def __init__(self, when, callback, args, scheduler=None):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler  # Yığında beklerken zamanlayıcı; çalışınca None
+
+    def cancel(self):
+        self.cancelled = True
+        scheduler = self._scheduler
+        if scheduler is not None:
+            scheduler._discard(self)
+
+
+class Scheduler:
+    """time.monotonic() zamanına göre çağrı yapan yığın tabanlı zamanlayıcı."""
+
+    def __init__(self, metrics=None):
+        self._heap = []  # (zaman, sıra, TimerHandle)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0  # Yığındaki iptal edilmemiş çağrılar
+        self._dead = 0  # Yığındaki iptal edilmiş çağrılar
+        self.fired = 0
+        self.jitter = None
+        if metrics is not None:
+            self.jitter = metrics.histogram("domu_scheduler_jitter_seconds",
+                                            "Zamanlanan çağrının planlanan andan gecikmesi")
+            metrics.callback("domu_scheduler_pending", "Zamanlayıcıda bekleyen çağrı",
+                             lambda s: len(s), owner=self)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        return self._pending
+
+    def call_at(self, when, callback, *args):
+        """callback(*args) çağrısını time.monotonic() == when anına zamanlar."""
+        handle = TimerHandle(when, callback, args, self)
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._counter), handle))
+            self._pending += 1
+            # Yalnızca en yakın zaman değiştiyse thread'i uyandır
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def _discard(self, handle):
+        """TimerHandle.cancel'dan: bekleyen sayısını düşer, gerekirse yığını temizler."""
+        with self._cond:
+            if handle._scheduler is not self:
+                return  # Çalıştı ya da zaten iptal edildi
+            handle._scheduler = None
+            self._pending -= 1
+            self._dead += 1
+            if self._dead > COMPACT_MIN and self._dead * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if entry[2]._scheduler is self]
+                heapq.heapify(self._heap)
+                self._dead = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    when, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        if handle._scheduler is None:
+                            self._dead -= 1
+                        else:
+                            # cancel() henüz _discard'a ulaşmadı: sayımı burada düş
+                            handle._scheduler = None
+                            self._pending -= 1
+                        continue
+                    delay = when - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        handle._scheduler = None
+                        self._pending -= 1
+                        break
+                    self._cond.wait(delay)
+                else:
+                    return
+            late = time.monotonic() - when
+            self.fired += 1
+            if self.jitter:
+                self.jitter.record(late)
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"Zamanlanmış görev çalışırken hata: {str(e)}")
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.thread.join(timeout=1.0)
+
+
+def _next_daily(hour, minute, days, now=None):
+    """Bir sonraki HH:MM anı (time.time()); days verilirse yalnızca o haftanın günleri (0 = pazartesi)."""
+    now = now or datetime.datetime.now()
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += datetime.timedelta(days=1)
+    while days is not None and candidate.weekday() not in days:
+        candidate += datetime.timedelta(days=1)
+    return candidate.timestamp()
+
+
+class DailyRule:
+    """Her gün (ya da seçili günlerde) belirli saatte çalışan kural."""
+
+    def __init__(self, name, at, actions, days=None):
+        self.name = name
+        hour, minute = at.split(":")
+        self.hour = int(hour)
+        self.minute = int(minute)
+        self.days = set(days) if days is not None else None
+        self.actions = [tuple(action) for action in actions]
+
+    def next_time(self, now=None):
+        return _next_daily(self.hour, self.minute, self.days, now)
+
+
+class EventRule:
+    """Denetleyici olayında (ör. "door", "led", "button") çalışan kural.
+
+    when verilirse olay argümanları bununla aynı olmalıdır (ör. door için
+    [true]: yalnızca kapı açılınca). delay > 0 ise eylemler gecikmeyle
+    çalışır; bu sürede olay tekrar gelirse süre baştan başlar.
+    """
+
+    def __init__(self, name, event, actions, when=None, delay=0.0):
+        self.name = name
+        self.event = event
+        self.actions = [tuple(action) for action in actions]
+        self.when = tuple(when) if when is not None else None
+        self.delay = delay
+
+    def matches(self, args):
+        return self.when is None or tuple(args) == self.when
+
+
+def rule_from_dict(entry):
+    if "at" in entry:
+        return DailyRule(entry["name"], entry["at"], entry["actions"], entry.get("days"))
+    return EventRule(entry["name"], entry["event"], entry["actions"], entry.get("when"), entry.get("delay", 0.0))
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """Kural dosyasını okur; dosya yoksa boş liste döner."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return [rule_from_dict(entry) for entry in config.get("rules", [])]
+
+
+class AutomationEngine:
+    """Kuralları zamanlar, eylemleri toplayıp denetleyiciye gönderir."""
+
+    def __init__(self, controller, scheduler=None, batch_window=BATCH_WINDOW, metrics=None):
+        self.controller = controller
+        self.scheduler = scheduler or Scheduler(metrics)
+        self.batch_window = batch_window
+        self._rules = {}        # ad -> kural
+        self._timers = {}       # ad -> TimerHandle
+        self._event_rules = {}  # olay adı -> [EventRule, ...]
+        self._listeners = {}    # olay adı -> denetleyici geri çağrısı
+        self._lock = threading.Lock()
+        self._batch = []
+        self._flush = None
+
+        # İstatistikler
+        self.fired = 0
+        self.actions = 0
+        self.sent = 0
+        if metrics is not None:
+            metrics.callback("domu_automation_rules_fired_total", "Tetiklenen otomasyon kuralı",
+                             lambda e: e.fired, kind="counter", owner=self)
+            metrics.callback("domu_automation_commands_total", "Kurallar sonucu gönderilen komut",
+                             lambda e: e.sent, kind="counter", owner=self)
+
+    # Kurallar
+
+    def add_rule(self, rule):
+        self.remove_rule(rule.name)
+        with self._lock:
+            self._rules[rule.name] = rule
+        if isinstance(rule, DailyRule):
+            self._schedule_daily(rule)
+        else:
+            rules = self._event_rules.setdefault(rule.event, [])
+            rules.append(rule)
+            if rule.event not in self._listeners:
+                listener = self._listeners[rule.event] = lambda *args, event=rule.event: self._on_event(event, args)
+                self.controller.on(rule.event, listener)
+
+    def remove_rule(self, name):
+        with self._lock:
+            rule = self._rules.pop(name, None)
+            timer = self._timers.pop(name, None)
+        if timer:
+            timer.cancel()
+        if isinstance(rule, EventRule):
+            self._event_rules[rule.event].remove(rule)
+
+    def rules(self):
+        with self._lock:
+            return list(self._rules.values())
+
+    def _schedule_daily(self, rule):
+        # Saat duvar saatine göre hesaplanır, zamanlayıcı monotonik saatle bekler
+        delay = rule.next_time() - time.time()
+        with self._lock:
+            if self._rules.get(rule.name) is rule:
+                self._timers[rule.name] = self.scheduler.call_later(delay, self._fire_daily, rule)
+
+    def _fire_daily(self, rule):
+        self._fire(rule)
+        self._schedule_daily(rule)
+
+    def _on_event(self, event, args):
+        # Denetleyici thread'inden çağrılır; yalnızca bu olayın kuralları denenir
+        for rule in list(self._event_rules.get(event, ())):
+            if not rule.matches(args):
+                continue
+            if rule.delay:
+                with self._lock:
+                    timer = self._timers.pop(rule.name, None)
+                    if timer:
+                        timer.cancel()
+                    self._timers[rule.name] = self.scheduler.call_later(rule.delay, self._fire, rule)
+            else:
+                self._fire(rule)
+
+    def _fire(self, rule):
+        with self._lock:
+            self.fired += 1
+            self._batch.extend(rule.actions)
+            if self._flush is None:
+                self._flush = self.scheduler.call_later(self.batch_window, self.flush)
+
+    # Eylemler
+
+    def flush(self):
+        """Toplanan eylemleri tekilleştirip gönderir (zamanlayıcı thread'inde)."""
+        with self._lock:
+            batch, self._batch = self._batch, []
+            self._flush = None
+        # Aynı hedefe giden eylemlerden sonuncusu geçerlidir
+        latest = {}
+        for kind, target, value in batch:
+            latest[(kind, target)] = bool(value)
+        self.actions += len(batch)
+        if not self.controller.connected:
+            return 0
+        sent = 0
+        for (kind, target), value in latest.items():
+            try:
+                if self._apply(kind, target, value):
+                    sent += 1
+            except Exception as e:
+                print(f"Otomasyon eylemi uygulanamadı ({kind}): {str(e)}")
+        self.sent += sent
+        return sent
+
+    def _apply(self, kind, target, value):
+        """Tek eylemi uygular; durum zaten istenen değerdeyse komut göndermez."""
+        controller = self.controller
+        if kind == "led":
+            if controller.led_status[target] == value:
+                return False
+            if controller.supports_state:
+                controller.set_led(target, value)
+            else:
+                controller.toggle_led(target)
+            return True
+        if kind == "door":
+            return (controller.open_door() if value else controller.close_door()) is not None
+        raise ValueError(f"Bilinmeyen eylem: {kind}")
+
+    def stop(self):
+        for event, listener in self._listeners.items():
+            self.controller.off(event, listener)
+        self._listeners.clear()
+        self.scheduler.stop()
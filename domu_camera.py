@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Kapı kamerası: sürekli açık görüntü kaynağı ve zil anlık görüntüleri.
+
+Her zilde masaüstü kamera uygulaması başlatmak yerine kamera bir kez açılır
+ve Camera thread'i son kareleri sabit boyutlu bir halka tamponda tutar.
+Zil çalınca SnapshotPipeline son kareyi alır; PNG'ye çevirme, küçük resim
+üretme ve diske yazma işçi thread'lerinde yapılır, arayüz beklemez.
+
+Görüntü kaynağı değiştirilebilir: read() ile Frame döndüren ve close()
+metodu olan her nesne kullanılabilir.
+    SyntheticSource  Kamerasız test ve ölçüm için yapay kareler
+    OpenCVSource     USB kamera (isteğe bağlı OpenCV, pip install opencv-python)
+
+PNG kodlayıcı yalnızca zlib kullanır; ek görüntü kütüphanesi gerekmez.
+"""
+
+import collections
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+FRAME_RATE = 10          # Halka tampona alınan saniyedeki kare sayısı
+RING_FRAMES = 30         # Bellekte tutulan son kare sayısı (~3 saniye)
+SNAPSHOT_WORKERS = 2
+MAX_PENDING = 4          # Bundan fazla anlık görüntü beklerken gelen ziller atlanır
+THUMBNAIL_WIDTH = 160
+KEEP_SNAPSHOTS = 200     # Diskte tutulan en fazla anlık görüntü sayısı
+PNG_LEVEL = 3            # zlib sıkıştırma düzeyi (hız/boyut dengesi)
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".domu", "snapshots")
+
+
+class Frame:
+    """Tek bir RGB kare (satır satır, piksel başına 3 bayt)."""
+
+    __slots__ = ("timestamp", "width", "height", "data")
+
+    def __init__(self, timestamp, width, height, data):
+        self.timestamp = timestamp
+        self.width = width
+        self.height = height
+        self.data = data
+
+
+class Snapshot:
+    """Kaydedilmiş bir zil görüntüsü."""
+
+    __slots__ = ("path", "timestamp", "thumbnail_png")
+
+    def __init__(self, path, timestamp, thumbnail_png):
+        self.path = path
+        self.timestamp = timestamp
+        self.thumbnail_png = thumbnail_png
+
+
+class SyntheticSource:
+    """Kamera olmadan kullanılabilen, kayan renk geçişli yapay görüntü kaynağı."""
+
+    def __init__(self, width=640, height=480):
+        self.width = width
+        self.height = height
+        # İki kat genişlikte bir satır; her karede kaydırılarak kullanılır
+        self._pattern = bytes(value for x in range(2 * width)
+                              for value in (x * 255 // width % 256, 96, 255 - x * 255 // width % 256))
+        self._offset = 0
+
+    def read(self):
+        start = self._offset * 3
+        row = self._pattern[start:start + self.width * 3]
+        self._offset = (self._offset + 8) % self.width
+        return Frame(time.time(), self.width, self.height, row * self.height)
+
+    def close(self):
+        pass
+
+
+class OpenCVSource:
+    """OpenCV ile açılan USB kamera."""
+
+    def __init__(self, device=0, width=640, height=480):
+        try:
+            import cv2
+        except ImportError:
+            raise RuntimeError("OpenCV (cv2) kurulu değil: pip install opencv-python")
+        self._cv2 = cv2
+        self.capture = cv2.VideoCapture(device)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Kamera açılamadı: {device}")
+
+    def read(self):
+        ok, image = self.capture.read()
+        if not ok:
+            return None
+        image = self._cv2.cvtColor(image, self._cv2.COLOR_BGR2RGB)
+        height, width = image.shape[:2]
+        return Frame(time.time(), width, height, image.tobytes())
+
+    def close(self):
+        self.capture.release()
+
+
+class FrameRing:
+    """Son kareleri tutan sabit kapasiteli tampon."""
+
+    def __init__(self, capacity=RING_FRAMES):
+        self._frames = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def append(self, frame):
+        with self._lock:
+            self._frames.append(frame)
+
+    def latest(self):
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def recent(self, count):
+        """Son count kare, eskiden yeniye."""
+        with self._lock:
+            return list(self._frames)[-count:]
+
+
+class Camera:
+    """Kaynaktan sabit hızda kare okuyup halka tampona koyan arka plan thread'i."""
+
+    def __init__(self, source, capacity=RING_FRAMES, fps=FRAME_RATE):
+        self.source = source
+        self.ring = FrameRing(capacity)
+        self.interval = 1.0 / fps
+        self.frames = 0
+        self.errors = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.source.close()
+
+    def _run(self):
+        next_frame = time.monotonic()
+        while self.running:
+            try:
+                frame = self.source.read()
+            except Exception as e:
+                self.errors += 1
+                print(f"Kameradan kare okunamadı: {str(e)}")
+                frame = None
+            if frame is not None:
+                self.ring.append(frame)
+                self.frames += 1
+            next_frame += self.interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.monotonic()  # Geride kaldıysak yetişmeye çalışma
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def encode_png(frame, level=PNG_LEVEL):
+    """RGB kareyi PNG baytlarına çevirir (filtresiz satırlar + zlib)."""
+    stride = frame.width * 3
+    data = memoryview(frame.data)
+    raw = b"".join(b"\x00" + data[i:i + stride] for i in range(0, stride * frame.height, stride))
+    header = struct.pack(">IIBBBBB", frame.width, frame.height, 8, 2, 0, 0, 0)  # 8 bit RGB
+    return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(raw, level)) + _png_chunk(b"IEND", b""))
+
+
+def thumbnail(frame, width=THUMBNAIL_WIDTH):
+    """Tam sayı adımla küçültülmüş kare (en yakın komşu)."""
+    step = max(1, -(-frame.width // width))
+    if step == 1:
+        return frame
+    stride = frame.width * 3
+    out_width = len(range(0, frame.width, step))
+    rows = []
+    for y in range(0, frame.height, step):
+        row = frame.data[y * stride:(y + 1) * stride]
+        out = bytearray(out_width * 3)
+        # Her renk kanalını ayrı ayrı adımla seç ve yeniden birleştir
+        out[0::3] = row[0::3 * step]
+        out[1::3] = row[1::3 * step]
+        out[2::3] = row[2::3 * step]
+        rows.append(out)
+    return Frame(frame.timestamp, out_width, len(rows), b"".join(rows))
+
+
+class SnapshotPipeline:
+    """Zil anında son kareyi işçi thread'lerinde kaydeder."""
+
+    def __init__(self, camera, directory=DEFAULT_SNAPSHOT_DIR, workers=SNAPSHOT_WORKERS,
+                 max_pending=MAX_PENDING, keep=KEEP_SNAPSHOTS, metrics=None):
+        self.camera = camera
+        self.directory = directory
+        self.max_pending = max_pending
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="domu-snapshot")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.saved = 0
+        self.dropped = 0
+        self.duration = None
+        if metrics is not None:
+            self.duration = metrics.histogram("domu_camera_snapshot_seconds",
+                                              "Zilden görüntünün diske yazılmasına kadar geçen süre")
+            metrics.callback("domu_camera_snapshots_dropped_total", "Yoğunluk nedeniyle atlanan zil görüntüsü",
+                             lambda p: p.dropped, kind="counter", owner=self)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def snapshot(self, label="zil"):
+        """Son kareyi kaydetmek üzere sıraya koyar.
+
+        Snapshot veren bir Future döndürür; henüz kare yoksa ya da çok
+        fazla görüntü bekliyorsa None döner. Arayüz thread'inden çağrılabilir.
+        """
+        frame = self.camera.ring.latest()
+        if frame is None:
+            return None
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self.pending += 1
+        future = self._executor.submit(self._process, frame, label, time.perf_counter())
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def _process(self, frame, label, requested_at):
+        png = encode_png(frame)
+        path = None
+        if self.directory:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(frame.timestamp))
+            path = os.path.join(self.directory, f"{stamp}-{int(frame.timestamp * 1000) % 1000:03d}-{label}.png")
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(png)
+            os.replace(temp_path, path)
+            self._prune()
+        small = encode_png(thumbnail(frame))
+        self.saved += 1
+        if self.duration:
+            self.duration.record(time.perf_counter() - requested_at)
+        return Snapshot(path, frame.timestamp, small)
+
+    def _prune(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".png"))
+        for name in names[:max(0, len(names) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def close(self):
+        self._executor.shutdown(wait=True)
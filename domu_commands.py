@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""Sıra numaralı, ardışık (pipelined) komut katmanı.
+
+Her komut "KOMUT#<sıra>" olarak gönderilir; Arduino yanıtın sonuna aynı
+numarayı ekler. Böylece aynı anda bağlantıda birden fazla komut olabilir
+ve her yanıt kendi isteğiyle eşleşir. Çağıran bir Future alır; yanıt
+gelmezse komut süre aşımıyla yeniden denenir ya da CommandTimeout ile
+başarısız olur.
+
+Arduino son birkaç sıra numarasını hatırlar; aynı numara ikinci kez gelirse
+komutu tekrar çalıştırmaz, önceki yanıtı yeniden gönderir; bu yüzden LED gibi aç/kapa komutlarını yeniden
+denemek de güvenlidir.
+
+Porta yalnızca tek bir yazıcı thread'i yazar; submit() hiçbir zaman porta
+yazmayı beklemez (takılan bir USB-seri dönüştürücü arayüzü dondurmaz).
+Bekleyen komutlar önceliğe göre gönderilir: önce kapı, sonra ışıklar ve
+diğer ayarlar, en son sorgular (GET_POT, STATE). Henüz gönderilmemiş aynı
+sorgu varsa yenisi kuyruğa eklenmez, bekleyenin Future'ı döner. Kuyruk
+derinliği, kuyrukta bekleme süresi (önceliğe göre) ve porta yazma süresi
+ölçülür; port yavaşladığında ilk bunlar büyür.
+
+Yanıtı beklenen komutlar Arduino'nun 64 baytlık alma tamponuna sığacak
+kadar (MAX_IN_FLIGHT_BYTES) gönderilir; uzun sıra numaralı dört satır
+tamponu taşırıp yeniden denemeye yol açmaz. Yeniden denemeler de bu
+bütçeden düşülür: süresi dolan kopyanın baytları bırakılır, yeni kopya
+tamponda yer açılınca (yeni komutlardan önce) gönderilir.
+
+Bağlantı koparsa (ör. kablo çekildi) suspend() çağrılır: yanıtı beklenen
+komutlardan tekrar çalıştırılması güvenli olanlar (REPLAYABLE_COMMANDS:
+mutlak değerli ayarlar ve sorgular) yeni sıra numarasıyla gönderilmek üzere
+kuyruğa geri konur, diğerleri (ör. eski firmware'in LED:<n> aç/kapası)
+başarısız olur. Yeni komutlar kuyrukta bekler; reopen() ile gönderim
+kaldığı yerden sürer, close() ile hepsi başarısız olur.
+"""
+
+import collections
+import heapq
+import itertools
+import random
+import threading
+import time
+
+MAX_IN_FLIGHT = 4     # Aynı anda yanıt bekleyebilecek en fazla komut
+MAX_IN_FLIGHT_BYTES = 64  # Arduino'nun alma tamponu: yanıtsız komutlar buna sığmalı
+DEFAULT_TIMEOUT = 1.0  # Yanıt bekleme süresi (saniye)
+DEFAULT_RETRIES = 2
+MAX_SEQ = 9999
+
+# Öncelikler (küçük olan önce gönderilir)
+PRIORITY_DOOR = 0
+PRIORITY_CONTROL = 1  # Işıklar ve diğer ayar komutları
+PRIORITY_POLL = 2
+PRIORITIES = {"OPEN_DOOR": PRIORITY_DOOR, "CLOSE_DOOR": PRIORITY_DOOR,
+              "GET_POT": PRIORITY_POLL, "STATE": PRIORITY_POLL}
+PRIORITY_NAMES = {PRIORITY_DOOR: "door", PRIORITY_CONTROL: "control", PRIORITY_POLL: "poll"}
+COALESCED_COMMANDS = {"GET_POT", "STATE"}  # Gönderilmeyi bekleyen aynı sorgu tek komuta iner
+# Bağlantı kopunca yeniden gönderilebilen komutlar: iki kez çalışmaları sonucu değiştirmez
+REPLAYABLE_COMMANDS = {"LED_SET", "OPEN_DOOR", "CLOSE_DOOR", "GET_POT", "STATE", "SUB_POT", "UNSUB_POT", "HELLO"}
+
+
+def command_priority(command):
+    return PRIORITIES.get(command.split(":", 1)[0], PRIORITY_CONTROL)
+
+
+def text_size(line):
+    """Satırın porta yazılan bayt sayısı (satır sonu dahil)."""
+    return len(line) + 1
+
+
+def is_replayable(command):
+    return command.split(":", 1)[0] in REPLAYABLE_COMMANDS
+
+
+class CommandTimeout(Exception):
+    """Komuta belirlenen sürede yanıt gelmedi."""
+
+
+class PendingCommand:
+    """Yanıt bekleyen tek bir komut."""
+
+    def __init__(self, command, timeout, retries):
+        self.command = command
+        self.timeout = timeout
+        self.retries_left = retries
+        # concurrent.futures logging'i de yükler; ilk komuta kadar ertelenir (açılış süresi)
+        from concurrent.futures import Future
+        self.future = Future()
+        self.priority = PRIORITY_CONTROL
+        self.order = None  # Kuyruktaki eklenme sırası (yeniden kuyruğa konunca korunur)
+        self.queued_at = None
+        self.seq = None
+        self.size = 0  # Porta yazılan son kopyanın bayt sayısı (satır sonu dahil)
+        self.sent_at = None
+        self.deadline = None  # Yeniden denemeyi beklerken de None
+
+
+class CommandStats:
+    """Komut sayaçları ve gidiş-dönüş histogramları (thread'li ve asyncio hatlarında ortak).
+
+    sent porta yazılan her sıra numaralı satırı sayar: yeniden denemeler ve
+    bağlantı kopunca yeniden gönderilenler dahil.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._latency = {}  # komut türü -> gidiş-dönüş histogramı
+        self.sent = 0
+        self.acked = 0
+        self.retried = 0
+        self.timed_out = 0
+        self.coalesced = 0
+        self.replayed = 0
+
+    def record_latency(self, command, seconds):
+        """Gönderimden yanıta geçen süreyi komut türüne göre kaydeder (ör. "LED")."""
+        if self.metrics is None:
+            return
+        kind = command.split(":", 1)[0]
+        histogram = self._latency.get(kind)
+        if histogram is None:
+            histogram = self._latency[kind] = self.metrics.histogram(
+                "domu_command_rtt_seconds", "Komut gönderiminden yanıta kadar geçen süre", command=kind)
+        histogram.record(seconds)
+
+
+class CommandPipeline(CommandStats):
+    """Komutları sıra numarasıyla gönderir ve yanıtları eşleştirir."""
+
+    def __init__(self, write, max_in_flight=MAX_IN_FLIGHT, max_in_flight_bytes=MAX_IN_FLIGHT_BYTES, metrics=None):
+        super().__init__(metrics)
+        self._write = write  # str -> None, satırı porta yazar (yalnızca yazıcı thread'inden çağrılır)
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self._in_flight_bytes = 0
+        self.priority = command_priority  # komut -> öncelik
+        self.coalesce = COALESCED_COMMANDS
+        self.line_size = text_size  # satır -> porta yazılan bayt (ikili çerçevede daha kısa)
+        self._lock = threading.Condition()
+        self._in_flight = {}  # sıra -> PendingCommand
+        self._waiting = []  # (öncelik, sıra, PendingCommand) yığını
+        self._order = itertools.count()
+        self._queued_polls = {}  # komut -> gönderilmeyi bekleyen PendingCommand
+        self._outbox = collections.deque()  # Hemen yazılacak sırasız satırlar (HELLO)
+        self._retries = collections.deque()  # Tamponda yer açılınca yeniden gönderilecek PendingCommand'ler
+        # Rastgele başla: yeniden bağlanınca Arduino'nun hatırladığı eski
+        # numaralarla çakışma olasılığını azaltır
+        self._next_seq = random.randrange(MAX_SEQ)
+        self._timer = None
+        self._writer = None
+        self._closed = False
+        self._suspended = False  # Bağlantı koptu: yalnızca sırasız satırlar (HELLO) yazılır
+
+        # İstatistikler (sayaçlar CommandStats'ta)
+        self._queue_wait = {}
+        self._write_time = None
+        if metrics is not None:
+            self._queue_wait = {
+                priority: metrics.histogram("domu_command_queue_wait_seconds",
+                                            "Komutun gönderilmeden önce kuyrukta beklediği süre", priority=name)
+                for priority, name in PRIORITY_NAMES.items()}
+            self._write_time = metrics.histogram("domu_serial_write_seconds", "Porta tek satır yazma süresi")
+
+    def submit(self, command, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, callback=None):
+        """Komutu kuyruğa ekler ve bir Future döndürür (porta yazmayı beklemez).
+
+        Future'ın sonucu yanıt satırıdır (sıra numarası olmadan, ör. "POT:512").
+        """
+        with self._lock:
+            pending = self._queued_polls.get(command)
+            if pending is not None:
+                # Aynı sorgu zaten gönderilmeyi bekliyor: onun yanıtı yeterli
+                self.coalesced += 1
+            else:
+                pending = PendingCommand(command, timeout, retries)
+                if self._closed:
+                    pending.future.set_exception(ConnectionError("Bağlantı kapalı"))
+                else:
+                    pending.priority = self.priority(command)
+                    pending.queued_at = time.monotonic()
+                    pending.order = next(self._order)
+                    heapq.heappush(self._waiting, (pending.priority, pending.order, pending))
+                    if command in self.coalesce:
+                        self._queued_polls[command] = pending
+                    self._start_threads()
+        if callback:
+            pending.future.add_done_callback(callback)
+        return pending.future
+
+    def post(self, line):
+        """Sıra numarasız bir satırı (ör. HELLO) yazıcı thread'i üzerinden gönderir."""
+        with self._lock:
+            self._outbox.append((line, None, False))
+            self._start_threads()
+
+    def acknowledge(self, seq, reply):
+        """Sıra numaralı bir yanıt geldiğinde çağrılır (okuma thread'inden)."""
+        with self._lock:
+            pending = self._in_flight.pop(seq, None)
+            if pending is None:
+                return  # Geç gelen ya da tekrar eden yanıt
+            self._in_flight_bytes -= pending.size
+            self.acked += 1
+            self._lock.notify_all()  # Pencerede yer açıldı
+        self.record_latency(pending.command, time.monotonic() - pending.sent_at)
+        if not pending.future.done():
+            pending.future.set_result(bytes(reply).decode('utf-8', 'replace'))
+
+    def close(self, reason="Bağlantı kapandı"):
+        """Bekleyen bütün komutları başarısız sayar."""
+        with self._lock:
+            self._closed = True
+            self._suspended = False
+            failed = list(self._in_flight.values()) + [pending for _, _, pending in self._waiting]
+            self._in_flight.clear()
+            self._in_flight_bytes = 0
+            self._waiting.clear()
+            self._queued_polls.clear()
+            self._outbox.clear()
+            self._retries.clear()
+            self._lock.notify_all()
+        for pending in failed:
+            if not pending.future.done():
+                pending.future.set_exception(ConnectionError(reason))
+
+    def suspend(self, reason="Bağlantı koptu"):
+        """Bağlantı kopunca çağrılır: güvenli komutları yeniden gönderilmek üzere kuyruğa koyar.
+
+        Tekrar çalıştırılması güvenli olmayan yanıtsız komutlar başarısız
+        olur; yeniden gönderilecek komut sayısını döndürür.
+        """
+        failed = []
+        with self._lock:
+            self._suspended = True
+            replayed = 0
+            for pending in self._in_flight.values():
+                if pending.future.done():
+                    continue
+                if not is_replayable(pending.command):
+                    failed.append(pending)
+                    continue
+                # Kart reset olmuş olabilir: eski sıra numarası yerine yenisiyle, ilk sırasında gönderilir
+                pending.seq = None
+                pending.deadline = None
+                heapq.heappush(self._waiting, (pending.priority, pending.order, pending))
+                replayed += 1
+            self._in_flight.clear()
+            self._in_flight_bytes = 0
+            self._outbox.clear()
+            self._retries.clear()
+            self.replayed += replayed
+            self._lock.notify_all()
+        for pending in failed:
+            pending.future.set_exception(ConnectionError(reason))
+        return replayed
+
+    def reopen(self):
+        with self._lock:
+            self._closed = False
+            self._suspended = False
+            if self._waiting or self._outbox:
+                self._start_threads()
+
+    @property
+    def in_flight(self):
+        return len(self._in_flight)
+
+    @property
+    def queued(self):
+        """Porta yazılmayı bekleyen komut ve satır sayısı."""
+        return len(self._waiting) + len(self._outbox) + len(self._retries)
+
+    def _start_threads(self):
+        """Yazıcı ve süre izleyici thread'lerini gerekirse başlatır (kilit altında)."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="domu-writer", daemon=True)
+            self._writer.start()
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._watch_deadlines, daemon=True)
+            self._timer.start()
+        self._lock.notify_all()
+
+    def _next_line(self):
+        """Yazılacak sıradaki (satır, komut, ilk_gönderim_mi) üçlüsünü seçer (kilit altında); yoksa None."""
+        if self._outbox:
+            return self._outbox.popleft()
+        if self._suspended:
+            return None
+        while self._retries:
+            pending = self._retries[0]
+            if self._in_flight.get(pending.seq) is not pending:
+                self._retries.popleft()  # Beklerken yanıtı geldi
+                continue
+            line = f"{pending.command}#{pending.seq}"
+            size = self.line_size(line)
+            if self._in_flight_bytes and self._in_flight_bytes + size > self.max_in_flight_bytes:
+                return None  # Yeniden deneme de tampona sığmalı; yeni komutlar da arkasında bekler
+            self._retries.popleft()
+            pending.size = size
+            pending.deadline = time.monotonic() + pending.timeout
+            self._in_flight_bytes += size
+            self._lock.notify_all()  # Süre izleyici yeni son tarihi görsün
+            return line, pending, False
+        if not self._waiting or len(self._in_flight) >= self.max_in_flight:
+            return None
+        pending = self._waiting[0][2]
+        seq = self._next_seq % MAX_SEQ + 1
+        line = f"{pending.command}#{seq}"
+        size = self.line_size(line)
+        if self._in_flight and self._in_flight_bytes + size > self.max_in_flight_bytes:
+            return None  # Tampon taşmasın: önceki yanıtları bekle
+        heapq.heappop(self._waiting)
+        if self._queued_polls.get(pending.command) is pending:
+            del self._queued_polls[pending.command]
+        self._next_seq = seq
+        pending.seq = seq
+        pending.size = size
+        now = time.monotonic()
+        pending.sent_at = now
+        pending.deadline = now + pending.timeout
+        self._in_flight[seq] = pending
+        self._in_flight_bytes += size
+        self._lock.notify_all()  # Süre izleyici yeni son tarihi görsün
+        return line, pending, True
+
+    def _write_loop(self):
+        """Porta yazan tek thread: kuyruktan önceliğe göre satır alır ve yazar."""
+        while True:
+            with self._lock:
+                item = self._next_line()
+                while item is None:
+                    if self._closed:
+                        self._writer = None
+                        return
+                    self._lock.wait()
+                    item = self._next_line()
+            line, pending, first = item
+            if first and self._queue_wait:
+                self._queue_wait[pending.priority].record(pending.sent_at - pending.queued_at)
+            start = time.perf_counter()
+            try:
+                self._write(line)
+            except Exception as e:
+                if not first:
+                    # Yeniden deneme ya da sırasız satır: komut süre aşımıyla sonuçlanır
+                    print(f"Satır gönderilemedi: {str(e)}")
+                    continue
+                if is_replayable(pending.command):
+                    # Yanıtı kaybolmuş gibi: süre aşımıyla yeniden denenir, bağlantı koptuysa suspend() kuyruğa geri koyar
+                    print(f"Komut gönderilemedi, yeniden denenecek: {str(e)}")
+                    continue
+                with self._lock:
+                    if self._in_flight.get(pending.seq) is pending:
+                        del self._in_flight[pending.seq]
+                        self._in_flight_bytes -= pending.size
+                    self._lock.notify_all()
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+                continue
+            if self._write_time:
+                self._write_time.record(time.perf_counter() - start)
+            if pending is not None:  # Sırasız satırlar (HELLO) sayılmaz
+                self.sent += 1
+
+    def _watch_deadlines(self):
+        """Süresi dolan komutları yeniden gönderir ya da başarısız sayar."""
+        while True:
+            expired = []
+            with self._lock:
+                if self._closed and not self._in_flight:
+                    self._timer = None
+                    return
+                now = time.monotonic()
+                for pending in list(self._in_flight.values()):
+                    if pending.deadline is None or pending.deadline > now:
+                        continue
+                    if pending.retries_left > 0:
+                        # Aynı sıra numarasıyla, yeni komutlardan önce yeniden dene. Eski kopya
+                        # artık tamponda değil (işlendi ya da düştü): baytları bırakılır,
+                        # yeni kopya gönderilirken yeniden düşülür
+                        pending.retries_left -= 1
+                        pending.deadline = None
+                        self._in_flight_bytes -= pending.size
+                        pending.size = 0
+                        self._retries.append(pending)
+                        self.retried += 1
+                    else:
+                        del self._in_flight[pending.seq]
+                        self._in_flight_bytes -= pending.size
+                        expired.append(pending)
+                if self._retries or expired:
+                    self._lock.notify_all()
+                if not expired:
+                    deadlines = [p.deadline for p in self._in_flight.values() if p.deadline is not None]
+                    self._lock.wait(timeout=(min(deadlines) - now) if deadlines else None)
+                    continue
+
+            for pending in expired:
+                self.timed_out += 1
+                if not pending.future.done():
+                    pending.future.set_exception(CommandTimeout(f"{pending.command} komutuna yanıt gelmedi"))
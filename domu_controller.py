@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""DOMU cihaz denetleyicisi.
+
+Seri bağlantıyı, Arduino protokolünü ve cihaz durumunu (LED'ler, kapı,
+potansiyometre) yönetir. Tkinter'a bağımlı değildir; arayüz ya da başsız
+(headless) betikler olaylara abone olarak durumu izler.
+
+Olaylar ve geri çağrı argümanları:
+    "pot"     -> (ham_değer,)
+    "led"     -> (led_index, açık_mı)
+    "door"    -> (açık_mı,)
+    "button"  -> ()
+    "ready"   -> (protokol_sürümü,)  Arduino açılışını bitirdiğinde
+
+Bağlanırken sabit bir süre beklenmez: firmware setup() bitince
+"READY:<sürüm>" gönderir ve connect() bu satır gelir gelmez döner. READY
+gelmezse (kart port açılınca reset olmadıysa) HELLO gönderilir; yine de
+gelmezse eski firmware varsayılır ve bağlantı sürümsüz kullanılır.
+
+Komut metotları (toggle_led, set_led, request_pot_value, request_state,
+open_door, close_door) sıra numaralı gönderilir ve yanıtı bekleyen bir
+Future döndürür. Komutlar porta çağıran thread'de yazılmaz: tek bir yazıcı
+thread'i kuyruktan önceliğe göre (kapı, ışıklar, sorgular) alır, bu yüzden
+arayüz thread'i hiçbir zaman seri port yazmasını beklemez.
+
+Protokol 3 ve sonrasında LED komutları mutlak değerle gönderilir
+(LED_SET:<n>:<0|1>) ve yanıtlar mutlak durum taşır; durum DeviceState
+önbelleğinde tutulur, olaylar yalnızca değer değişince yayınlanır.
+Bağlanınca, kart reset olunca ve bir komut yanıtsız kalınca STATE ile
+bütün durum tek seferde uzlaştırılır.
+
+Protokol 4'te bağlantı 9600 baud ASCII ile başlar; link_baudrate ya da
+link_binary verilirse bağlanınca "LINK:<baud>:<0|1>" ile daha yüksek hız ve
+isteğe bağlı ikili çerçeve (domu_protocol.BinaryCodec) istenir. Kart
+LINK_OK ile yanıt verip geçer, istemci yeni ayarla HELLO gönderip doğrular.
+Doğrulama başarısızsa iki taraf da 9600 ASCII'ye döner (kart bir saniye
+içinde geçerli komut almazsa kendiliğinden döner).
+
+Bağlantı koparsa (kablo çekildi, kart reset oldu) okuma thread'i biter ve
+link_lost_handler çağrılır; atanmamışsa bekleyen komutlar başarısız olur.
+Yeniden bağlanmayı domu_link.LinkSupervisor üstlenir.
+
+recorder'a domu_record.SessionRecorder atanırsa porttan okunan ve porta
+yazılan ham baytlar zaman damgalarıyla kaydedilir.
+
+Port "unix:<yol>" ise seri port yerine kartı paylaştıran yerel sunucuya
+(domu_daemon.py) bağlanılır.
+
+Başsız kullanım:
+    python3 domu_controller.py /dev/ttyACM0 LED:0 GET_POT
+"""
+
+import sys
+import threading
+import time
+
+import serial
+
+from domu_commands import DEFAULT_TIMEOUT, CommandPipeline, CommandTimeout, text_size
+from domu_metrics import REGISTRY
+from domu_protocol import BinaryCodec, LineCodec, encode_frame, frame_size
+from domu_serial import poll_lines, read_chunks
+from domu_state import STATE_PROTOCOL, DeviceState, parse_state
+
+LED_COUNT = 4
+BAUDRATE = 9600
+READY_TIMEOUT = 3.0  # READY satırı için en uzun bekleme (saniye)
+WRITE_TIMEOUT = 2.0  # Takılan bir dönüştürücüde yazıcı thread'inin en uzun bekleme süresi (saniye)
+HELLO_DELAY = 2.0    # Bu süre içinde READY gelmezse HELLO ile sorulur (saniye)
+POT_DEADBAND = 4          # Abonelikte bu kadar ya da daha az değişim gönderilmez
+POT_MIN_INTERVAL_MS = 100  # Abonelikte iki POT: arasındaki en kısa süre
+LINK_PROTOCOL = 4  # LINK (hız ve ikili çerçeve anlaşması) destekleyen en eski protokol sürümü
+LINK_BAUDRATE = 115200  # Değersiz --baud ile istenen hız (varsayılan: baudrate'te kalınır)
+BAUDRATES = (9600, 19200, 38400, 57600, 115200, 230400, 250000, 500000, 1000000)  # Firmware'in kabul ettikleri
+LINK_CONFIRM_TIMEOUT = 0.5  # Geçişten sonra HELLO yanıtı için bekleme (saniye)
+LINK_REVERT_DELAY = 1.2     # Firmware doğrulanmayan geçişi 1 saniyede geri alır (saniye)
+
+
+def pot_to_temperature(pot_value):
+    """Potansiyometre değerini istenen oda sıcaklığına dönüştürür (15-30°C)."""
+    return round(15 + (pot_value / 1023) * 15, 1)
+
+
+class DomuController:
+    """Arduino ile konuşan, Tk'siz denetleyici."""
+
+    def __init__(self, baudrate=BAUDRATE, reader_mode="event", metrics=None, link_baudrate=None, link_binary=False):
+        self.baudrate = baudrate
+        self.link_baudrate = link_baudrate  # Bağlanınca istenecek hız (None: baudrate'te kal)
+        self.link_binary = link_binary      # Bağlanınca ikili çerçeve istensin mi
+        self.binary = False                 # Şu an ikili çerçeve kullanılıyor mu
+        self.reader_mode = reader_mode  # "event": bloklayan okuma, "poll": eski 100 ms yoklama
+        self.serial_port = None
+        self.port_name = None
+        self.reading_thread = None
+        self.stop_thread = False
+        self.link_lost_handler = None  # callback(hata): bağlantı beklenmedik biçimde koptuğunda
+        self.recorder = None  # domu_record.SessionRecorder: ham trafiğin kaydı
+
+        # Cihaz durumu (led_status, door_open ve pot_value bu önbelleğe bakar)
+        self.state = DeviceState(LED_COUNT)
+        self.pot_updated_at = None  # Son POT: satırının geldiği an (time.monotonic)
+        self.protocol_version = None  # READY ile bildirilir; eski firmware'de None
+        self._ready = threading.Event()
+        self._connecting = False
+
+        self._listeners = {}
+
+        # Gelen mesajlar önek tablosu üzerinden işleyicilere dağıtılır
+        self.codec = LineCodec()
+        self.codec.register("POT:", self._on_pot)
+        self.codec.register("LED_OK:", self._on_led_ok)
+        self.codec.register("BUTTON_PRESSED", self._on_button, exact=True)
+        self.codec.register("DOOR_OPENED", self._on_door_opened, exact=True)
+        self.codec.register("DOOR_CLOSED", self._on_door_closed, exact=True)
+        self.codec.register("READY:", self._on_ready)
+        self.codec.register("STATE:", self._on_state)
+        self.codec.register("LINK_OK:", self._on_link_ok)
+        self.framer = self.codec  # Porttan gelen baytları çözen nesne (LineCodec ya da BinaryCodec)
+
+        # Ölçümler (domu_metrics); varsayılan olarak uygulama geneli kayıt defteri
+        self.metrics = metrics or REGISTRY
+        self._register_metrics()
+
+        # Sıra numaralı komutlar; yanıtlar codec üzerinden eşleştirilir
+        self.commands = self._create_commands()
+
+    def _create_commands(self):
+        """Komut hattını kurar (AsyncDomuController yalnızca sayaçları kullanır)."""
+        commands = CommandPipeline(self.send, metrics=self.metrics)
+        self.codec.ack_handler = commands.acknowledge
+        return commands
+
+    def _register_metrics(self):
+        metrics = self.metrics
+        self.bytes_in = metrics.counter("domu_serial_received_bytes_total", "Porttan okunan bayt")
+        self.bytes_out = metrics.counter("domu_serial_sent_bytes_total", "Porta yazılan bayt")
+        self.handler_errors = metrics.counter("domu_handler_errors_total", "Olay dinleyicilerinde oluşan hata")
+        # Zaten tutulan sayılar yalnızca dışa aktarılırken okunur
+        counters = (
+            ("domu_lines_total", "Çözülen satır", lambda c: c.codec.lines),
+            ("domu_parse_errors_total", "Çözülemeyen satır ya da sıra numarası", lambda c: c.codec.errors),
+            ("domu_commands_sent_total", "Sıra numarasıyla porta yazılan satır (yeniden denemeler dahil)", lambda c: c.commands.sent),
+            ("domu_commands_acked_total", "Yanıtı gelen komut", lambda c: c.commands.acked),
+            ("domu_command_retries_total", "Yeniden gönderilen komut", lambda c: c.commands.retried),
+            ("domu_command_timeouts_total", "Yanıtsız kalan komut", lambda c: c.commands.timed_out),
+            ("domu_commands_coalesced_total", "Bekleyen aynı sorguyla birleştirilen komut",
+             lambda c: c.commands.coalesced),
+            ("domu_commands_replayed_total", "Bağlantı kopunca yeniden gönderilmek üzere kuyruğa konan komut",
+             lambda c: c.commands.replayed),
+        )
+        for name, help_text, function in counters:
+            metrics.callback(name, help_text, function, kind="counter", owner=self)
+        metrics.callback("domu_state_syncs_total", "STATE ile yapılan durum uzlaştırması",
+                         lambda c: c.state.syncs, kind="counter", owner=self)
+        metrics.callback("domu_state_corrections_total", "STATE ile düzeltilen LED/kapı durumu",
+                         lambda c: c.state.corrections, kind="counter", owner=self)
+        metrics.callback("domu_commands_in_flight", "Yanıt bekleyen komut", lambda c: c.commands.in_flight,
+                         owner=self)
+        metrics.callback("domu_commands_queued", "Porta yazılmayı bekleyen komut", lambda c: c.commands.queued,
+                         owner=self)
+        metrics.callback("domu_pot_age_seconds", "Son POT: değerinin yaşı",
+                         lambda c: time.monotonic() - c.pot_updated_at if c.pot_updated_at else None,
+                         aggregate=max, owner=self)
+
+    # Durum
+
+    @property
+    def led_status(self):
+        return self.state.leds
+
+    @property
+    def door_open(self):
+        return self.state.door_open
+
+    @door_open.setter
+    def door_open(self, is_open):
+        self.state.set_door(is_open)
+
+    @property
+    def pot_value(self):
+        return self.state.pot
+
+    @property
+    def supports_link(self):
+        """Firmware hız ve ikili çerçeve anlaşmasını (LINK) biliyor mu?"""
+        return self.protocol_version is not None and self.protocol_version >= LINK_PROTOCOL
+
+    @property
+    def supports_state(self):
+        """Firmware STATE ve LED_SET komutlarını biliyor mu?"""
+        return self.protocol_version is not None and self.protocol_version >= STATE_PROTOCOL
+
+    # Olaylar
+
+    def on(self, event, callback):
+        """Bir olaya geri çağrı ekler."""
+        self._listeners.setdefault(event, []).append(callback)
+
+    def off(self, event, callback):
+        """Daha önce eklenen geri çağrıyı kaldırır."""
+        if callback in self._listeners.get(event, []):
+            self._listeners[event].remove(callback)
+
+    def _emit(self, event, *args):
+        for callback in list(self._listeners.get(event, [])):
+            try:
+                callback(*args)
+            except Exception as e:
+                self.handler_errors.inc()
+                print(f"'{event}' olayı işlenirken hata: {str(e)}")
+
+    # Bağlantı
+
+    @property
+    def connected(self):
+        return bool(self.serial_port and self.serial_port.is_open)
+
+    def connect(self, port, ready_timeout=READY_TIMEOUT):
+        """Porta bağlanır, okuma thread'ini başlatır ve READY satırını bekler.
+
+        ready_timeout=0 ise beklenmez. Bloklayan bir çağrıdır; arayüzden
+        ayrı bir thread'de çağrılmalıdır.
+        """
+        if port.startswith("unix:"):
+            # Kartı paylaştıran yerel sunucu (domu_daemon.py) aynı protokolü konuşur
+            from domu_daemon import SocketPort
+            self.serial_port = SocketPort(port[len("unix:"):], timeout=1)
+        else:
+            self.serial_port = serial.Serial(port, self.baudrate, timeout=1, write_timeout=WRITE_TIMEOUT)
+        self.port_name = port
+        self.protocol_version = None
+        self._reset_link()
+        self._ready.clear()
+        self._connecting = True
+
+        self.stop_thread = False
+        self.reading_thread = threading.Thread(target=self.read_serial_data)
+        self.reading_thread.daemon = True
+        self.reading_thread.start()
+
+        try:
+            if ready_timeout:
+                self.wait_ready(ready_timeout)
+            self.commands.reopen()
+            # Yerel sunucu (unix:) kartla hızı kendisi anlaşır
+            if ((self.link_baudrate not in (None, self.baudrate) or self.link_binary) and self.supports_link
+                    and self.reader_mode == "event" and not port.startswith("unix:")):
+                self.negotiate_link(self.link_baudrate or self.baudrate, self.link_binary)
+        finally:
+            self._connecting = False
+
+        # Arayüzün gösterdiği durum kartınkiyle tek sorguda eşitlenir
+        future = self.sync_state()
+        if future is not None:
+            try:
+                future.result(DEFAULT_TIMEOUT * 3)
+            except Exception as e:
+                print(f"Cihaz durumu okunamadı: {str(e)}")
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """READY gelene kadar bekler; protokol sürümünü (eski firmware'de None) döndürür."""
+        if not self._ready.wait(min(HELLO_DELAY, timeout)) and timeout > HELLO_DELAY:
+            # Kart port açılınca reset olmamış olabilir: READY'yi tekrar iste
+            self.commands.post("HELLO")
+            self._ready.wait(timeout - HELLO_DELAY)
+        return self.protocol_version
+
+    def negotiate_link(self, baudrate, binary=False):
+        """Kartla yeni hız ve çerçeve üzerinde anlaşır; başarısızsa başlangıç ayarına döner.
+
+        Bağlantı sırasında (connect içinden) çağrılır; anlaşma olduysa True döner.
+        """
+        if baudrate not in BAUDRATES:
+            raise ValueError(f"Desteklenmeyen baud hızı: {baudrate}")
+        commands = self.commands
+        try:
+            # Yanıt eski ayarla gelir; _on_link_ok portu ve çözücüyü hemen değiştirir
+            commands.submit(f"LINK:{baudrate}:{int(binary)}").result(DEFAULT_TIMEOUT * 3)
+            # Kart yeni ayarla geçerli bir komut alınca geçişi kalıcı sayar
+            commands.submit("HELLO", timeout=LINK_CONFIRM_TIMEOUT, retries=1).result(LINK_CONFIRM_TIMEOUT * 3)
+            return True
+        except Exception as e:
+            print(f"Bağlantı hızı değiştirilemedi ({baudrate} baud): {str(e)}")
+        self._reset_link()
+        time.sleep(LINK_REVERT_DELAY)  # Kart da başlangıç ayarına dönsün
+        commands.post("")  # Hatalı hızda gelen baytlardan kalan yarım satırı bitir
+        try:
+            commands.submit("HELLO").result(DEFAULT_TIMEOUT * 3)
+        except Exception as e:
+            print(f"Kart başlangıç hızında yanıt vermedi: {str(e)}")
+        return False
+
+    def _switch_link(self, baudrate, binary):
+        """Port hızını ve çerçevelemeyi değiştirir (okuma thread'inden ya da geri dönüşte)."""
+        if self.serial_port is not None:  # Kayıt tekrar oynatılırken port yoktur
+            self.serial_port.baudrate = baudrate
+        if binary == self.binary:
+            return
+        self.binary = binary
+        if binary:
+            self.framer = BinaryCodec(self.codec)
+            self.codec.successor = self.framer  # LINK_OK satırından sonraki baytlar çerçevedir
+            self.commands.line_size = frame_size
+        else:
+            self.framer = self.codec
+            self.codec.successor = None
+            self.commands.line_size = text_size
+
+    def _reset_link(self):
+        self._switch_link(self.baudrate, False)
+
+    def close_port(self):
+        """Portu ve okuma thread'ini kapatır; port adı yeniden bağlanma denemeleri için korunur."""
+        self.stop_thread = True
+        if self.reading_thread:
+            self.reading_thread.join(timeout=1.0)
+            self.reading_thread = None
+        port = self.serial_port
+        self.serial_port = None
+        if port is not None:
+            try:
+                port.close()
+            except Exception:
+                pass  # Yarım açılmış portu kapatırken oluşan hata önemsiz
+
+    def disconnect(self):
+        """Okuma thread'ini durdurur ve portu kapatır."""
+        self.commands.close()
+        self.stop_thread = True
+        if self.reading_thread:
+            self.reading_thread.join(timeout=1.0)
+            self.reading_thread = None
+
+        if self.serial_port and self.serial_port.is_open:
+            self.serial_port.close()
+        self.serial_port = None
+        self.port_name = None
+
+    def read_serial_data(self):
+        if self.reader_mode == "poll":
+            # Eski yoklama döngüsü (karşılaştırma için saklandı)
+            poll_lines(self.serial_port, self.handle_line, lambda: self.stop_thread)
+        else:
+            read_chunks(self.serial_port, self.feed, lambda: self.stop_thread, on_lost=self._on_link_lost)
+
+    def _on_link_lost(self, error):
+        """Okuma thread'inden çağrılır: port kullanılamaz hale geldi."""
+        if self.stop_thread:
+            return  # disconnect() portu kapatıyor
+        print(f"Cihaz bağlantısı koptu: {str(error)}")
+        port = self.serial_port
+        self.serial_port = None
+        self.reading_thread = None
+        try:
+            port.close()
+        except Exception:
+            pass  # Kopmuş portu kapatırken oluşan hata önemsiz
+        if self.link_lost_handler:
+            self.link_lost_handler(error)
+        else:
+            self.commands.close("Cihaz bağlantısı koptu")
+
+    def feed(self, data):
+        """Porttan okunan baytları işler."""
+        self.bytes_in.inc(len(data))
+        if self.recorder:
+            self.recorder.rx(data)
+        self.framer.feed(data)
+
+    # Komutlar
+
+    def send(self, command):
+        """Arduino'ya tek satırlık bir komut yazar (yanıt beklenmez).
+
+        Porta doğrudan yazar ve bloklayabilir; komut hattı bunu yalnızca
+        yazıcı thread'inden çağırır. Diğer thread'ler commands.post() kullanır.
+        """
+        data = encode_frame(command) if self.binary else f"{command}\n".encode()
+        self.serial_port.write(data)
+        self.bytes_out.inc(len(data))
+        if self.recorder:
+            self.recorder.tx(data)
+
+    def request(self, command, **kwargs):
+        """Komutu sıra numarasıyla gönderir; yanıtı bekleyen Future döndürür."""
+        future = self.commands.submit(command, **kwargs)
+        future.add_done_callback(lambda f: self._on_command_done(command, f))
+        return future
+
+    def _on_command_done(self, command, future):
+        # Yanıtı kaybolan bir komuttan sonra kartın durumu bilinmez: yeniden oku
+        if future.cancelled() or command == "STATE":
+            return
+        if isinstance(future.exception(), CommandTimeout):
+            self.sync_state()
+
+    def toggle_led(self, led_index):
+        """LED'i aç/kapa; yeni firmware'de bilinen durumun tersi mutlak değerle gönderilir."""
+        if self.supports_state:
+            return self.set_led(led_index, not self.state.leds[led_index])
+        return self.request(f"LED:{led_index}")
+
+    def set_led(self, led_index, on):
+        """LED'i açık ya da kapalı yapar; tekrar gönderilmesi sonucu değiştirmez (protokol 3)."""
+        return self.request(f"LED_SET:{led_index}:{int(bool(on))}")
+
+    def request_state(self):
+        """Bütün LED, kapı ve pot durumunu tek yanıtta ister (protokol 3)."""
+        return self.request("STATE")
+
+    def sync_state(self):
+        """Firmware destekliyorsa durumu STATE ile uzlaştırır; Future ya da None döner."""
+        if not self.supports_state or not self.connected:
+            return None
+        return self.request_state()
+
+    def request_pot_value(self):
+        return self.request("GET_POT")
+
+    def subscribe_pot(self, deadband=POT_DEADBAND, min_interval_ms=POT_MIN_INTERVAL_MS):
+        """Arduino'dan pot değeri değiştikçe POT: göndermesini ister (yoklama yerine)."""
+        return self.request(f"SUB_POT:{deadband}:{min_interval_ms}")
+
+    def unsubscribe_pot(self):
+        return self.request("UNSUB_POT")
+
+    def open_door(self):
+        """Kapı kapalıysa açar; komut gönderildiyse Future, değilse None döner."""
+        if self.door_open:
+            return None
+        future = self.request("OPEN_DOOR")
+        self.door_open = True
+        return future
+
+    def close_door(self):
+        """Kapı açıksa kapatır; komut gönderildiyse Future, değilse None döner."""
+        if not self.door_open:
+            return None
+        future = self.request("CLOSE_DOOR")
+        self.door_open = False
+        return future
+
+    # Protokol
+
+    def handle_line(self, data):
+        """Arduino'dan gelen tek bir satırı işler."""
+        self.bytes_in.inc(len(data) + 1)
+        if self.recorder:
+            self.recorder.rx((data.encode() if isinstance(data, str) else bytes(data)) + b"\n")
+        self.codec.feed_line(data)
+
+    def _on_pot(self, payload):
+        self.state.set_pot(int(payload))
+        self.pot_updated_at = time.monotonic()
+        self._emit("pot", self.pot_value)
+
+    def _on_led_ok(self, payload): # Arduino'dan LED durum onayı geldiğinde
+        index, _, value = bytes(payload).partition(b":")
+        led_index = int(index)
+        if value:
+            # Protokol 3: yanıt mutlak durumu taşır, tekrar gelmesi zararsızdır
+            if self.state.set_led(led_index, value == b"1"):
+                self._emit("led", led_index, self.state.leds[led_index])
+            return
+        # Eski firmware yalnızca LED numarasını bildirir: durumu tersine çevir
+        self.state.set_led(led_index, not self.state.leds[led_index])
+        self._emit("led", led_index, self.state.leds[led_index])
+
+    def _on_button(self, payload):
+        self._emit("button")
+
+    def _on_door_opened(self, payload):
+        self.state.set_door(True)
+        self._emit("door", True)
+
+    def _on_door_closed(self, payload):
+        self.state.set_door(False)
+        self._emit("door", False)
+
+    def _on_state(self, payload):
+        for event, args in self.state.apply_snapshot(*parse_state(payload)):
+            self._emit(event, *args)
+
+    def _on_link_ok(self, payload):
+        baudrate, _, binary = bytes(payload).decode("ascii").partition(":")
+        self._switch_link(int(baudrate), binary == "1")
+
+    def _on_ready(self, payload):
+        self.protocol_version = int(payload)
+        self._ready.set()
+        self._emit("ready", self.protocol_version)
+        if not self._connecting:
+            # Bağlıyken gelirse kart kendiliğinden reset olmuştur: durumu yeniden oku
+            self.sync_state()
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+
+    controller = DomuController()
+    controller.on("pot", lambda value: print(f"POT: {value} ({pot_to_temperature(value)} °C)"))
+    controller.on("led", lambda index, on: print(f"LED {index}: {'açık' if on else 'kapalı'}"))
+    controller.on("door", lambda is_open: print(f"Kapı: {'açık' if is_open else 'kapalı'}"))
+    controller.on("button", lambda: print("Zil çalındı"))
+
+    controller.connect(argv[1])
+    try:
+        version, leds, door_open, pot = controller.state.snapshot()
+        print(f"Durum (sürüm {version}): LED {''.join('1' if on else '0' for on in leds)}, "
+              f"kapı {'açık' if door_open else 'kapalı'}, pot {pot}")
+        for command in argv[2:]:
+            controller.commands.post(command)
+        time.sleep(1)  # Yanıtların gelmesi için kısa bekleme
+    finally:
+        controller.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
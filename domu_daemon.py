@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Seri bağlantıyı paylaştıran yerel DOMU sunucusu.
+
+Seri port yalnızca tek bir süreç tarafından açılabilir. Bu sunucu Arduino
+bağlantısının sahibidir ve bir Unix soketi üzerinden istemcilere hizmet
+eder; duvar paneli, dizüstü bilgisayar ve betikler aynı durumu görür.
+
+İstemciler Arduino ile aynı satır protokolünü konuşur, bu yüzden
+DomuController "unix:<yol>" portuna seri port gibi bağlanabilir:
+    - Bağlanınca READY:<sürüm> ve tam durum (LED_OK:<n>:<0|1>, DOOR_*, POT:)
+      gönderilir.
+    - Kart olayları (LED_OK, DOOR_OPENED/DOOR_CLOSED, POT:, BUTTON_PRESSED,
+      READY) bütün istemcilere dağıtılır. LED durumu her zaman mutlak
+      değerle gönderilir.
+    - "KOMUT#<sıra>" satırları tek seri bağlantının komut hattına eklenir,
+      yanıt istemcinin kendi sıra numarasıyla döner. Son yanıtlar
+      hatırlanır; yeniden gönderilen komut ikinci kez çalıştırılmaz.
+    - STATE, GET_POT, HELLO, SUB_POT ve UNSUB_POT kartı beklemeden sunucunun
+      önbelleğinden yanıtlanır (sunucu pot değişikliklerine zaten abonedir).
+    - Bilinmeyen, argümanları sayı olmayan ya da aralık dışında kalan
+      komutlar (ör. "LED:9") karta iletilmez; yanıtsız kalır ve günlüğe yazılır.
+
+Kartla bağlantı koparsa domu_link.LinkSupervisor yeniden bağlanır;
+istemciler bağlı kalır, bekleyen güvenli komutları yeniden bağlanınca yanıtlanır.
+
+Her istemcinin gönderim tamponu CLIENT_BUFFER satırla sınırlıdır. Yavaş bir
+istemcinin tamponu dolarsa bekleyen satırları atılır ve tampon boşalınca
+yalnızca güncel tam durum gönderilir; diğer istemciler etkilenmez.
+
+Kullanım:
+    python3 domu_daemon.py /dev/ttyACM0 [--socket ~/.domu/domu.sock] [--metrics-port 9464] [--baud [B]] [--binary]
+    python3 arduino_gui_tkinter.py   # Port olarak unix:~/.domu/domu.sock seçilir
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import select
+import socket
+import struct
+import sys
+
+from domu_commands import CommandTimeout
+from domu_controller import LINK_BAUDRATE, DomuController
+from domu_link import LinkSupervisor
+from domu_metrics import REGISTRY
+from domu_protocol import COMMAND_OPCODES
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser("~"), ".domu", "domu.sock")
+SOCKET_PREFIX = "unix:"  # DomuController.connect için port öneki
+CLIENT_BUFFER = 256  # İstemci başına bekleyebilecek en fazla satır
+RECENT_REPLIES = 8   # İstemci başına hatırlanan son yanıt (yeniden gönderimler için)
+_PENDING = object()
+
+
+class SocketPort:
+    """Unix soketini seri port gibi kullanmak için DomuController'a verilen nesne.
+
+    read() en az bir bayt gelene ya da zaman aşımına kadar bekler ve o an
+    gelmiş olan her şeyi döndürür (istenen boyuttan fazla olabilir).
+    """
+
+    def __init__(self, path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(os.path.expanduser(path))
+        self.timeout = timeout
+        self.is_open = True
+        self.in_waiting = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read(self, size=1):
+        readable, _, _ = select.select([self.sock], [], [], self.timeout)
+        if not readable:
+            return b""
+        data = self.sock.recv(max(size, 4096))
+        if not data:
+            self.is_open = False  # Sunucu bağlantıyı kapattı
+        return data
+
+    def write(self, data):
+        self.sock.sendall(data)
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Client:
+    """Bağlı tek bir istemci: sınırlı gönderim kuyruğu (kodlanmış satırlar) ve son yanıtlar."""
+
+    def __init__(self, writer, buffer):
+        self.writer = writer
+        self.lines = collections.deque()
+        self.buffer = buffer
+        self.wake = asyncio.Event()
+        self.resync = False  # Tampon taştı: bekleyenler yerine tam durum gönderilecek
+        self.recent = collections.OrderedDict()  # sıra -> yanıt (ya da _PENDING)
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, data):
+        if self.resync:
+            self.dropped += 1
+            return
+        if len(self.lines) >= self.buffer:
+            self.dropped += len(self.lines) + 1
+            self.lines.clear()
+            self.resync = True
+        else:
+            self.lines.append(data)
+        self.wake.set()
+
+    def remember(self, seq, reply):
+        self.recent[seq] = reply
+        self.recent.move_to_end(seq)
+        while len(self.recent) > RECENT_REPLIES:
+            self.recent.popitem(last=False)
+
+
+class DomuDaemon:
+    """Tek DomuController'ı birçok soket istemcisiyle paylaştırır."""
+
+    def __init__(self, controller, path=DEFAULT_SOCKET_PATH, buffer=CLIENT_BUFFER, metrics=None):
+        self.controller = controller
+        self.path = path
+        self.buffer = buffer
+        self.loop = None
+        self.server = None
+        self.clients = set()
+        self.pot_streaming = False  # SUB_POT kabul edildiyse GET_POT önbellekten yanıtlanır
+
+        # İstatistikler
+        self.broadcasts = 0
+        self.forwarded = 0
+        self.local_replies = 0
+        self.rejected = 0
+        self.dropped = 0  # Kapanmış istemcilerin attığı satırlar dahil
+        self.resyncs = 0
+        if metrics is not None:
+            metrics.callback("domu_daemon_clients", "Bağlı istemci", lambda d: len(d.clients), owner=self)
+            metrics.callback("domu_daemon_broadcasts_total", "İstemcilere dağıtılan kart olayı",
+                             lambda d: d.broadcasts, kind="counter", owner=self)
+            metrics.callback("domu_daemon_forwarded_total", "İstemciden karta iletilen komut",
+                             lambda d: d.forwarded, kind="counter", owner=self)
+            metrics.callback("domu_daemon_local_replies_total", "Önbellekten yanıtlanan istemci komutu",
+                             lambda d: d.local_replies, kind="counter", owner=self)
+            metrics.callback("domu_daemon_rejected_total", "Geçersiz olduğu için iletilmeyen istemci komutu",
+                             lambda d: d.rejected, kind="counter", owner=self)
+            metrics.callback("domu_daemon_dropped_lines_total", "Yavaş istemci nedeniyle atılan satır",
+                             lambda d: d.dropped + sum(c.dropped for c in d.clients), kind="counter", owner=self)
+            metrics.callback("domu_daemon_queued_lines", "İstemci tamponlarında bekleyen satır",
+                             lambda d: sum(len(c.lines) for c in d.clients), owner=self)
+
+        self._listeners = {
+            "led": lambda index, on: self._post(f"LED_OK:{index}:{int(on)}"),
+            "door": lambda is_open: self._post("DOOR_OPENED" if is_open else "DOOR_CLOSED"),
+            "pot": lambda value: self._post(f"POT:{value}"),
+            "button": lambda: self._post("BUTTON_PRESSED"),
+            "ready": lambda version: self._post(f"READY:{version}"),
+        }
+
+    # Sunucu
+
+    async def start(self):
+        """Soketi dinlemeye başlar (olay döngüsünde çağrılır)."""
+        self.loop = asyncio.get_running_loop()
+        for event, listener in self._listeners.items():
+            self.controller.on(event, listener)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Önceki çalışmadan kalan soket dosyası
+        self.server = await asyncio.start_unix_server(self._serve_client, self.path)
+
+    async def subscribe(self):
+        """Pot değişikliklerine abone olur; istemcilerin GET_POT'u önbellekten yanıtlanır."""
+        future = self.controller.subscribe_pot()
+        try:
+            await asyncio.wrap_future(future)
+            self.pot_streaming = True
+        except Exception as e:
+            print(f"Pot aboneliği başlatılamadı: {str(e)}")
+
+    async def close(self):
+        for event, listener in self._listeners.items():
+            self.controller.off(event, listener)
+        if self.server:
+            self.server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        if self.server:
+            await self.server.wait_closed()  # Python 3.12+: açık bağlantıların kapanmasını da bekler
+            self.server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _post(self, line):
+        # Denetleyicinin okuma thread'inden çağrılır
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.broadcast, line)
+
+    def broadcast(self, line):
+        """Satırı bütün istemcilerin kuyruğuna ekler (olay döngüsünde)."""
+        self.broadcasts += 1
+        data = f"{line}\n".encode()  # Bir kez kodlanır, bütün istemcilere aynı bayt dizisi gider
+        for client in self.clients:
+            client.push(data)
+
+    def snapshot(self):
+        """Önbellekteki tam durum satırları; yeni ve tamponu taşan istemcilere gönderilir."""
+        _, leds, door_open, pot = self.controller.state.snapshot()
+        lines = [f"LED_OK:{index}:{int(on)}" for index, on in enumerate(leds)]
+        lines.append("DOOR_OPENED" if door_open else "DOOR_CLOSED")
+        lines.append(f"POT:{pot}")
+        return "".join(f"{line}\n" for line in lines).encode()
+
+    async def _serve_client(self, reader, writer):
+        client = Client(writer, self.buffer)
+        self.clients.add(client)
+        if self.controller.protocol_version is not None:
+            client.lines.append(f"READY:{self.controller.protocol_version}\n".encode())
+        client.lines.append(self.snapshot())
+        client.wake.set()
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            while True:
+                try:
+                    data = await reader.readline()
+                except ValueError as e:
+                    # Satır akış sınırını (64 KiB) aştı; okunan kısım atıldı, oturum sürer
+                    self.rejected += 1
+                    print(f"İstemciden gelen satır çok uzun: {str(e)}")
+                    continue
+                if not data:
+                    break
+                line = data.decode("ascii", "replace").strip()
+                if line:
+                    self._handle_command(client, line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            client.closed = True
+            client.wake.set()
+            self.clients.discard(client)
+            self.dropped += client.dropped
+            await sender
+            writer.close()
+
+    async def _send_loop(self, client):
+        writer = client.writer
+        while True:
+            await client.wake.wait()
+            client.wake.clear()
+            if client.closed:
+                return
+            if client.resync:
+                # Atılan olayların yerine güncel durumun tamamı
+                client.resync = False
+                client.lines.clear()
+                data = self.snapshot()
+                self.resyncs += 1
+            else:
+                data = b"".join(client.lines)
+                client.lines.clear()
+            if not data:
+                continue
+            try:
+                writer.write(data)
+                await writer.drain()
+            except (ConnectionError, OSError):
+                client.closed = True
+                return
+
+    # Komutlar
+
+    def _handle_command(self, client, line):
+        command, _, seq = line.partition("#")
+        if seq:
+            cached = client.recent.get(seq)
+            if cached is _PENDING:
+                return  # Yanıt bekleniyor; geldiğinde gönderilecek
+            if cached is not None:
+                client.push(f"{cached}#{seq}\n".encode())
+                return
+        if command.startswith("LINK:"):
+            return  # Kartla hız ve çerçeve anlaşması sunucuya aittir; istemci isteği iletilmez
+        try:
+            self._validate(command)
+        except ValueError as e:
+            self.rejected += 1
+            print(f"Geçersiz istemci komutu ({command}): {str(e)}")
+            return
+        reply = self._local_reply(command)
+        if reply is not None:
+            self.local_replies += 1
+            self._reply(client, seq, reply)
+            return
+        future = self._submit(command)
+        if future is None:
+            # Kapı zaten istenen durumda: kart beklenmeden yanıtlanır
+            self.local_replies += 1
+            self._reply(client, seq, "DOOR_OPENED" if self.controller.door_open else "DOOR_CLOSED")
+            return
+        self.forwarded += 1
+        if seq:
+            client.remember(seq, _PENDING)
+        future.add_done_callback(
+            lambda f: self.loop.call_soon_threadsafe(self._on_reply, client, command, seq, f))
+
+    def _validate(self, command):
+        """Komut kartın bildiği biçimde değilse ValueError (ikili çerçeveye de sığmalı)."""
+        name, _, args = command.partition(":")
+        if name not in COMMAND_OPCODES:
+            raise ValueError("bilinmeyen komut")
+        layout = COMMAND_OPCODES[name][1]
+        values = [int(value) for value in args.split(":")] if args else []
+        if len(values) != len(layout):
+            raise ValueError(f"{len(layout)} argüman bekleniyordu")
+        for value, kind in zip(values, layout):
+            if not 0 <= value < 1 << 8 * struct.calcsize(kind):
+                raise ValueError(f"argüman aralık dışında: {value}")
+        if name in ("LED", "LED_SET") and values[0] >= len(self.controller.led_status):
+            raise ValueError(f"LED numarası geçersiz: {values[0]}")
+
+    def _local_reply(self, command):
+        controller = self.controller
+        if command == "HELLO" and controller.protocol_version is not None:
+            return f"READY:{controller.protocol_version}"
+        if command == "STATE" and controller.supports_state:
+            _, leds, door_open, pot = controller.state.snapshot()
+            bits = "".join("1" if on else "0" for on in leds)
+            return f"STATE:{bits}:{90 if door_open else 0}:{pot}"
+        if command == "GET_POT" and self.pot_streaming:
+            return f"POT:{controller.pot_value}"
+        if command.startswith("SUB_POT") and self.pot_streaming:
+            return "SUB_OK"  # Sunucu her zaman abonedir; POT: satırları zaten dağıtılıyor
+        if command == "UNSUB_POT" and self.pot_streaming:
+            return "UNSUB_OK"  # Diğer istemciler için abonelik sürer
+        return None
+
+    def _submit(self, command):
+        controller = self.controller
+        if command == "OPEN_DOOR":
+            return controller.open_door()
+        if command == "CLOSE_DOOR":
+            return controller.close_door()
+        if command.startswith("LED:"):
+            return controller.toggle_led(int(command[4:]))
+        return controller.request(command)
+
+    def _on_reply(self, client, command, seq, future):
+        # İptal edilmiş Future'da exception() CancelledError fırlatır: önce ona bakılır
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            if error is not None and not isinstance(error, CommandTimeout):
+                print(f"İstemci komutu başarısız ({command}): {str(error)}")
+            client.recent.pop(seq, None)  # İstemci yeniden denerse komut tekrar iletilsin
+            return
+        reply = future.result()
+        if reply.startswith("LED_OK:") and reply.count(":") == 1:
+            # Eski firmware yalnızca LED numarasını bildirir; istemciye mutlak durum gider
+            index = int(reply[7:])
+            reply = f"{reply}:{int(self.controller.led_status[index])}"
+        self._reply(client, seq, reply)
+
+    def _reply(self, client, seq, reply):
+        if seq:
+            client.remember(seq, reply)
+            client.push(f"{reply}#{seq}\n".encode())
+        else:
+            client.push(f"{reply}\n".encode())
+
+
+async def serve(port, path, metrics=None, link_baudrate=None, link_binary=False):
+    controller = DomuController(metrics=metrics, link_baudrate=link_baudrate, link_binary=link_binary)
+    loop = asyncio.get_running_loop()
+    # connect() bloklar (READY ve durum uzlaştırması); olay döngüsünü tutmasın
+    await loop.run_in_executor(None, controller.connect, port)
+    daemon = DomuDaemon(controller, path, metrics=metrics)
+    await daemon.start()
+    await daemon.subscribe()
+
+    def on_link_changed(connected, seconds):
+        # Gözetmen thread'inden çağrılır
+        if connected:
+            print(f"Karta yeniden bağlanıldı ({seconds:.1f} s)")
+            # Kart reset olduysa pot aboneliği de gitmiştir
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(daemon.subscribe()))
+        else:
+            daemon.pot_streaming = False  # Önbellekteki pot değeri eskiyebilir: GET_POT kuyruğa girsin
+    supervisor = LinkSupervisor(controller, metrics=metrics)
+    supervisor.on(on_link_changed)
+
+    print(f"DOMU sunucusu hazır: {SOCKET_PREFIX}{path} (kart {port}, protokol {controller.protocol_version})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        supervisor.cancel()
+        await daemon.close()
+        controller.disconnect()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="DOMU seri bağlantısını yerel istemcilerle paylaştırır")
+    parser.add_argument("port", help="Arduino seri portu (ör. /dev/ttyACM0)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix soket yolu")
+    parser.add_argument("--metrics-port", type=int, help="Prometheus ölçümleri için HTTP portu")
+    parser.add_argument("--baud", type=int, nargs="?", const=LINK_BAUDRATE,
+                        help=f"kartla anlaşılacak baud hızı (protokol 4; değersiz: {LINK_BAUDRATE}, verilmezse 9600)")
+    parser.add_argument("--binary", action="store_true", help="kartla ikili çerçeve kullan (protokol 4)")
+    args = parser.parse_args(argv[1:])
+    if args.metrics_port:
+        REGISTRY.serve(args.metrics_port)
+    try:
+        asyncio.run(serve(args.port, os.path.expanduser(args.socket), REGISTRY, args.baud, args.binary))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
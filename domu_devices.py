@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Birden fazla Arduino'yu tek süreçten yöneten cihaz kayıt defteri.
+
+Her kart bir cihaz kimliğiyle (ör. "salon", "kat2") kaydedilir. Bütün
+kartlar aynı asyncio olay döngüsünde çalışır; kart başına thread açılmaz.
+Komutlar kimliğe göre doğru karta yönlendirilir, olaylar ise dinleyicilere
+cihaz kimliğiyle birlikte iletilir.
+
+Yapılandırma dosyası (JSON):
+    {"devices": [{"id": "salon", "port": "/dev/ttyACM0"},
+                 {"id": "kat2", "port": "/dev/ttyUSB0", "baudrate": 9600}]}
+
+Başsız kullanım:
+    python3 domu_devices.py devices.json
+"""
+
+import asyncio
+import json
+import sys
+
+from domu_async import EVENT_NAMES, AsyncDomuController
+from domu_controller import BAUDRATE, READY_TIMEOUT
+
+
+def load_config(path):
+    """Yapılandırma dosyasını okur; [(kimlik, port, baudrate), ...] döndürür."""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return [(entry["id"], entry["port"], entry.get("baudrate", BAUDRATE))
+            for entry in config.get("devices", [])]
+
+
+class DeviceRegistry:
+    """Cihaz kimliği -> AsyncDomuController eşlemesi ve olay yönlendirme."""
+
+    def __init__(self):
+        self.devices = {}
+        self._listeners = {}
+
+    def __getitem__(self, device_id):
+        return self.devices[device_id]
+
+    def __contains__(self, device_id):
+        return device_id in self.devices
+
+    def __len__(self):
+        return len(self.devices)
+
+    # Olaylar
+
+    def on(self, event, callback):
+        """Bütün cihazların olayına geri çağrı ekler: callback(cihaz_kimliği, *argümanlar)."""
+        self._listeners.setdefault(event, []).append(callback)
+
+    def _emit(self, event, device_id, *args):
+        for callback in list(self._listeners.get(event, [])):
+            try:
+                callback(device_id, *args)
+            except Exception as e:
+                print(f"'{device_id}' cihazının '{event}' olayı işlenirken hata: {str(e)}")
+
+    # Bağlantı
+
+    async def open(self, device_id, port, baudrate=BAUDRATE, ready_timeout=READY_TIMEOUT):
+        """Bir kartı açar ve kayıt defterine ekler."""
+        if device_id in self.devices:
+            raise ValueError(f"'{device_id}' zaten kayıtlı")
+        controller = AsyncDomuController(baudrate)
+        for event in EVENT_NAMES:
+            controller.on(event, lambda *args, event=event: self._emit(event, device_id, *args))
+        await controller.connect(port, ready_timeout=ready_timeout)
+        self.devices[device_id] = controller
+        return controller
+
+    async def open_all(self, entries, ready_timeout=READY_TIMEOUT):
+        """Kartları paralel açar; açılamayanlar için (kimlik, hata) listesi döndürür.
+
+        entries: [(kimlik, port), ...] ya da load_config() çıktısı. Arayüzdeki
+        port listesinden açmak için kimlik olarak port adı kullanılabilir.
+        """
+        entries = [entry if len(entry) > 2 else (entry[0], entry[1], BAUDRATE) for entry in entries]
+        results = await asyncio.gather(
+            *(self.open(device_id, port, baudrate, ready_timeout) for device_id, port, baudrate in entries),
+            return_exceptions=True)
+        return [(entry[0], result) for entry, result in zip(entries, results)
+                if isinstance(result, Exception)]
+
+    async def close(self, device_id):
+        controller = self.devices.pop(device_id)
+        await controller.disconnect()
+
+    async def close_all(self):
+        for device_id in list(self.devices):
+            await self.close(device_id)
+
+    # Komut yönlendirme
+
+    def request(self, device_id, command, **kwargs):
+        """Komutu ilgili karta gönderir; yanıtı bekleyen Future döndürür."""
+        return self.devices[device_id].request(command, **kwargs)
+
+    def toggle_led(self, device_id, led_index):
+        return self.devices[device_id].toggle_led(led_index)
+
+    def set_led(self, device_id, led_index, on):
+        return self.devices[device_id].set_led(led_index, on)
+
+    def open_door(self, device_id):
+        return self.devices[device_id].open_door()
+
+    def close_door(self, device_id):
+        return self.devices[device_id].close_door()
+
+    async def get_pot(self, device_id):
+        return await self.devices[device_id].get_pot()
+
+
+async def run(path):
+    registry = DeviceRegistry()
+    registry.on("pot", lambda device_id, value: print(f"[{device_id}] POT: {value}"))
+    registry.on("led", lambda device_id, index, on: print(f"[{device_id}] LED {index}: {'açık' if on else 'kapalı'}"))
+    registry.on("door", lambda device_id, is_open: print(f"[{device_id}] Kapı: {'açık' if is_open else 'kapalı'}"))
+    registry.on("button", lambda device_id: print(f"[{device_id}] Zil çalındı"))
+
+    for device_id, error in await registry.open_all(load_config(path)):
+        print(f"[{device_id}] bağlanılamadı: {error}")
+    try:
+        await asyncio.Event().wait()  # Ctrl+C ile çıkılana kadar olayları yazdır
+    finally:
+        await registry.close_all()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    try:
+        asyncio.run(run(sys.argv[1]))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Histerezisli HVAC (ısıtma/soğutma) denetleyicisi.
+
+Girdiler sayısaldır: hedef sıcaklık (potansiyometreden) ve ölçülen
+sıcaklık (odada sensör olmadığından dış sıcaklık kullanılır). Mod yalnızca
+fark bant genişliğini aşınca değişir ve açılan mod hedefe ulaşılana kadar
+sürer; eşitlik çevresindeki gürültü modu sürekli değiştirmez:
+
+    ölçülen <= hedef - band  -> ısıtma (ölçülen >= hedef olunca biter)
+    ölçülen >= hedef + band  -> soğutma (ölçülen <= hedef olunca biter)
+
+Cihazı korumak için bir mod en az min_on saniye açık, bekleme modunda da
+en az min_off saniye kalır. Bu sürede istenen değişiklik bekletilir ve
+süre dolunca (scheduler verildiyse kendiliğinden) uygulanır.
+
+Dinleyiciler yalnızca mod değişince çağrılır: callback(mod, hedef, ölçülen).
+"""
+
+import threading
+import time
+
+HEAT = "heat"
+COOL = "cool"
+IDLE = "idle"
+
+HYSTERESIS = 0.5        # Bant genişliği (°C)
+MIN_ON_SECONDS = 120.0  # Isıtma/soğutmanın en kısa açık kalma süresi
+MIN_OFF_SECONDS = 60.0  # Beklemede en kısa kalma süresi
+
+
+class HvacController:
+    """Hedef ve ölçülen sıcaklığa göre ısıtma/soğutma modunu seçer."""
+
+    def __init__(self, band=HYSTERESIS, min_on=MIN_ON_SECONDS, min_off=MIN_OFF_SECONDS,
+                 clock=time.monotonic, scheduler=None):
+        self.band = band
+        self.min_on = min_on
+        self.min_off = min_off
+        self.clock = clock
+        self.scheduler = scheduler  # domu_automation.Scheduler: bekletilen değişiklik için
+        self.setpoint = None
+        self.temperature = None
+        self.mode = IDLE
+        self.changed_at = None  # Son mod değişikliği (clock)
+        self.pending = None     # En kısa süre nedeniyle bekletilen mod
+        self.switches = 0
+        self._timer = None
+        self._lock = threading.Lock()  # Girdiler ve bekletme zamanlayıcısı farklı thread'lerden gelebilir
+        self._listeners = []
+
+    def on(self, callback):
+        self._listeners.append(callback)
+
+    def set_setpoint(self, value, now=None):
+        """Hedef sıcaklığı günceller; mod değiştiyse yeni modu döndürür."""
+        if value == self.setpoint:
+            return None
+        self.setpoint = value
+        return self.update(now)
+
+    def set_temperature(self, value, now=None):
+        """Ölçülen sıcaklığı günceller; mod değiştiyse yeni modu döndürür."""
+        if value == self.temperature:
+            return None
+        self.temperature = value
+        return self.update(now)
+
+    def desired_mode(self):
+        """Histerezise göre olması gereken mod (en kısa süreler hariç)."""
+        if self.setpoint is None or self.temperature is None:
+            return IDLE
+        error = self.temperature - self.setpoint  # Artı: hedeften sıcak
+        if self.mode == HEAT:
+            return HEAT if error < 0 else IDLE if error < self.band else COOL
+        if self.mode == COOL:
+            return COOL if error > 0 else IDLE if error > -self.band else HEAT
+        if error <= -self.band:
+            return HEAT
+        if error >= self.band:
+            return COOL
+        return IDLE
+
+    def update(self, now=None):
+        """Modu yeniden değerlendirir; değiştiyse yeni modu, değişmediyse None döndürür."""
+        with self._lock:
+            now = self.clock() if now is None else now
+            desired = self.desired_mode()
+            if desired == self.mode:
+                self.pending = None
+                return None
+            hold_until = self._hold_until()
+            if hold_until is not None and now < hold_until:
+                self.pending = desired
+                if self.scheduler and self._timer is None:
+                    self._timer = self.scheduler.call_later(hold_until - now, self._on_hold_expired)
+                return None
+            self.pending = None
+            self.mode = desired
+            self.changed_at = now
+            self.switches += 1
+        for callback in list(self._listeners):
+            try:
+                callback(self.mode, self.setpoint, self.temperature)
+            except Exception as e:
+                print(f"HVAC modu işlenirken hata: {str(e)}")
+        return self.mode
+
+    def _hold_until(self):
+        if self.changed_at is None:
+            return None
+        return self.changed_at + (self.min_off if self.mode == IDLE else self.min_on)
+
+    def _on_hold_expired(self):
+        with self._lock:
+            self._timer = None
+        self.update()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Olay günlüğü: zil, ziyaretçi, kapı ve ışık olaylarının kalıcı kaydı.
+
+Kayıtlar sabit uzunlukludur (12 bayt: zaman, tür, aygıt, değer) ve yalnızca
+sona eklenir. append() kaydı bellekteki tampona koyup hemen döner; yazıcı
+thread'i kısa bir süre (COMMIT_INTERVAL) biriken kayıtları tek write + fsync
+ile diske işler (group commit). Böylece Tk thread'i diski hiç beklemez.
+
+Günlük bölümlere (segment) ayrılır: events-<ilk kayıt zamanı ms>.log. Etkin
+bölüm SEGMENT_BYTES'ı geçince kapatılır ve yanına tür başına kayıt
+sayılarını içeren bir özet (.sum) yazılır. Zaman indeksi iki katmanlıdır:
+bölüm adlarındaki başlangıç zamanları ve bölüm içinde mmap üzerinde ikili
+arama. Açılışta sayaçlar (ör. toplam ziyaretçi) kapalı bölümlerin
+özetlerinden ve yalnızca etkin bölüm okunarak hesaplanır.
+
+compact() eski bölümlerden ışık olaylarını atar; zil, ziyaretçi ve kapı
+kayıtları saklanır.
+"""
+
+import os
+import struct
+import threading
+import time
+
+from domu_telemetry import _read_range
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".domu", "journal")
+SEGMENT_BYTES = 1024 * 1024   # Etkin bölümün kapatılacağı boyut (~87 000 kayıt)
+COMMIT_INTERVAL = 0.05        # Bir grup yazmadan önce kayıt biriktirme süresi (saniye)
+KEEP_LIGHT_SECONDS = 30 * 24 * 3600  # Bundan eski ışık olayları compact() ile atılır
+
+# Olay türleri
+RING = 1       # Zil çaldı
+VISITOR = 2    # Ziyaretçi içeri alındı (kapı arayüzden açıldı)
+DOOR = 3       # Kapı durumu (değer: 1 açık, 0 kapalı)
+LIGHT = 4      # Işık durumu (aygıt: LED indeksi, değer: 1 açık, 0 kapalı)
+EVENT_NAMES = {RING: "ring", VISITOR: "visitor", DOOR: "door", LIGHT: "light"}
+COMPACT_KEEP = (RING, VISITOR, DOOR)
+
+RECORD = struct.Struct("<dBBh")          # zaman, tür, aygıt, değer
+SUMMARY = struct.Struct("<dd%dI" % len(EVENT_NAMES))  # ilk zaman, son zaman, tür başına sayı
+
+
+def _segment_name(start_ms):
+    return "events-%015d.log" % start_ms
+
+
+def _segment_start(name):
+    """Bölüm adındaki başlangıç zamanı (ms)."""
+    return int(name[len("events-"):-len(".log")])
+
+
+def _summarize(path):
+    """Bölüm dosyasını baştan okuyarak özet çıkarır: (ilk, son, {tür: sayı})."""
+    counts = dict.fromkeys(EVENT_NAMES, 0)
+    first = last = None
+    with open(path, "rb") as f:
+        data = f.read()
+    for timestamp, kind, _, _ in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+        if first is None:
+            first = timestamp
+        last = timestamp
+        if kind in counts:
+            counts[kind] += 1
+    return first, last, counts
+
+
+def _write_summary(path, summary):
+    first, last, counts = summary
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(SUMMARY.pack(first or 0.0, last or 0.0, *(counts[kind] for kind in EVENT_NAMES)))
+    os.replace(temp_path, path)
+
+
+def _read_summary(path):
+    with open(path, "rb") as f:
+        values = SUMMARY.unpack(f.read(SUMMARY.size))
+    return values[0], values[1], dict(zip(EVENT_NAMES, values[2:]))
+
+
+class EventJournal:
+    """Bölümlü, grup halinde diske işlenen olay günlüğü."""
+
+    def __init__(self, directory=DEFAULT_JOURNAL_DIR, segment_bytes=SEGMENT_BYTES,
+                 commit_interval=COMMIT_INTERVAL, metrics=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._pending = bytearray()
+        self._appended = 0    # append() ile eklenen kayıt sayısı
+        self._committed = 0   # Diske işlenen kayıt sayısı
+        self._urgent = False  # flush() beklerken biriktirme yapılmaz
+        self._last_time = 0.0
+        self.commits = 0
+
+        # Kapalı bölümlerin özetleri: ad -> (ilk, son, {tür: sayı})
+        self._sealed = {}
+        self._active = None   # Etkin bölümün adı (henüz yoksa None)
+        self._active_first = None
+        self._active_counts = dict.fromkeys(EVENT_NAMES, 0)
+        self._active_size = 0
+        self._open_segments()
+
+        # Tür başına toplam (henüz diske yazılmamışlar dahil)
+        self._totals = dict(self._active_counts)
+        for _, _, counts in self._sealed.values():
+            for kind in EVENT_NAMES:
+                self._totals[kind] += counts[kind]
+
+        self.commit_time = None
+        if metrics is not None:
+            self.commit_time = metrics.histogram("domu_journal_commit_seconds", "Bir grup yazma + fsync süresi")
+            metrics.callback("domu_journal_records_total", "Diske işlenen olay kaydı",
+                             lambda j: j._committed, kind="counter", owner=self)
+            metrics.callback("domu_journal_commits_total", "Grup halinde diske yazma",
+                             lambda j: j.commits, kind="counter", owner=self)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith("events-") and name.endswith(".log"))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open_segments(self):
+        """Bölümleri tanır; yalnızca etkin (son, özetsiz) bölüm okunur."""
+        names = self._segments()
+        for name in names:
+            summary_path = self._path(name[:-4] + ".sum")
+            if os.path.exists(summary_path):
+                self._sealed[name] = _read_summary(summary_path)
+            elif name != names[-1]:
+                # Kapatılırken yarıda kalmış bölüm: özeti şimdi çıkar
+                self._sealed[name] = _summarize(self._path(name))
+                _write_summary(summary_path, self._sealed[name])
+        if names and names[-1] not in self._sealed:
+            self._active = names[-1]
+            path = self._path(self._active)
+            size = os.path.getsize(path)
+            if size % RECORD.size:
+                # Yarım yazılmış son kaydı at
+                with open(path, "r+b") as f:
+                    f.truncate(size - size % RECORD.size)
+            self._active_first, last, self._active_counts = _summarize(path)
+            self._active_size = size - size % RECORD.size
+            self._last_time = last or 0.0
+        elif self._sealed:
+            self._last_time = self._sealed[names[-1]][1]
+
+    def append(self, kind, device=0, value=0, timestamp=None):
+        """Olayı günlüğe ekler; diske yazılmasını beklemez (her thread'den çağrılabilir)."""
+        with self._cond:
+            # Saat geri alınsa da bölüm içindeki sıralama bozulmasın
+            timestamp = max(time.time() if timestamp is None else timestamp, self._last_time)
+            self._last_time = timestamp
+            self._pending += RECORD.pack(timestamp, kind, device, value)
+            self._appended += 1
+            if kind in self._totals:
+                self._totals[kind] += 1
+            if len(self._pending) == RECORD.size:
+                self._cond.notify_all()  # Yazıcıyı yalnızca grubun ilk kaydında uyandır
+
+    def flush(self, timeout=None):
+        """Şimdiye kadar eklenen olaylar diske işlenene kadar bekler."""
+        with self._cond:
+            target = self._appended
+            self._urgent = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(lambda: self._committed >= target or not self.thread.is_alive(), timeout)
+            self._urgent = False
+            return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self.running)
+                if not self._pending:
+                    return
+                # Aynı fsync'e daha çok kayıt girsin diye kısa süre bekle
+                self._cond.wait_for(lambda: self._urgent or not self.running, self.commit_interval)
+                batch, self._pending = self._pending, bytearray()
+                target = self._appended
+            start = time.perf_counter()
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Olay günlüğü yazılamadı: {str(e)}")
+            if self.commit_time:
+                self.commit_time.record(time.perf_counter() - start)
+            with self._cond:
+                self._committed = target
+                self.commits += 1
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        """Kayıtları etkin bölüme yazar; bölüm dolunca kapatır (yazıcı thread'i)."""
+        offset = 0
+        while offset < len(batch):
+            if self._active is None:
+                first = RECORD.unpack_from(batch, offset)[0]
+                start_ms = int(first * 1000)
+                with self._cond:
+                    if self._sealed:
+                        # Aynı milisaniyede açılan bölüm öncekinin üstüne yazmasın
+                        start_ms = max(start_ms, _segment_start(max(self._sealed)) + 1)
+                    self._active = _segment_name(start_ms)
+                    self._active_first = first
+                self._active_counts = dict.fromkeys(EVENT_NAMES, 0)
+                self._active_size = 0
+            room = max(RECORD.size, (self.segment_bytes - self._active_size) // RECORD.size * RECORD.size)
+            chunk = batch[offset:offset + room]
+            with open(self._path(self._active), "ab") as f:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            for _, kind, _, _ in RECORD.iter_unpack(chunk):
+                if kind in self._active_counts:
+                    self._active_counts[kind] += 1
+            self._active_size += len(chunk)
+            offset += len(chunk)
+            if self._active_size >= self.segment_bytes:
+                self._seal()
+
+    def _seal(self):
+        name = self._active
+        first, last, counts = _summarize(self._path(name))
+        _write_summary(self._path(name[:-4] + ".sum"), (first, last, counts))
+        with self._cond:
+            self._sealed[name] = (first, last, counts)
+            self._active = None
+
+    def _segment_spans(self):
+        """[(ad, ilk kayıt zamanı, sonraki bölümün ilk kayıt zamanı)].
+
+        Zamanlar artarak yazıldığından bir bölümün bütün kayıtları bu iki
+        değer arasındadır.
+        """
+        with self._cond:
+            segments = [(name, summary[0]) for name, summary in sorted(self._sealed.items())]
+            if self._active and self._active_first is not None:
+                segments.append((self._active, self._active_first))
+        return [(name, first, segments[i + 1][1] if i + 1 < len(segments) else float("inf"))
+                for i, (name, first) in enumerate(segments)]
+
+    def range(self, start, end, kind=None):
+        """[start, end) aralığındaki olaylar: [(zaman, tür, aygıt, değer), ...]."""
+        self.flush()
+        events = []
+        for name, first, following in self._segment_spans():
+            if first >= end or following < start:
+                continue
+            for record in _read_range(self._path(name), RECORD, start, end):
+                if kind is None or record[1] == kind:
+                    events.append(record)
+        return events
+
+    def count(self, kind, start=None, end=None):
+        """Türdeki olay sayısı; tamamen aralıktaki kapalı bölümler özetlerinden sayılır."""
+        if start is None and end is None:
+            with self._cond:
+                return self._totals[kind]
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        self.flush()
+        total = 0
+        for name, first, following in self._segment_spans():
+            if first >= end or following < start:
+                continue
+            summary = self._sealed.get(name)
+            if summary and start <= summary[0] and summary[1] < end:
+                total += summary[2][kind]
+            else:
+                total += sum(1 for record in _read_range(self._path(name), RECORD, start, end)
+                             if record[1] == kind)
+        return total
+
+    def compact(self, older_than, keep=COMPACT_KEEP):
+        """older_than'dan önce biten kapalı bölümlerden keep dışındaki olayları atar.
+
+        Boşalan bölüm silinir; atılan kayıt sayısını döndürür.
+        """
+        removed = 0
+        with self._cond:
+            candidates = [(name, summary) for name, summary in sorted(self._sealed.items())
+                          if summary[1] < older_than]
+        for name, (_, _, counts) in candidates:
+            if all(counts[kind] == 0 for kind in EVENT_NAMES if kind not in keep):
+                continue
+            path = self._path(name)
+            summary_path = self._path(name[:-4] + ".sum")
+            with open(path, "rb") as f:
+                data = f.read()
+            kept = b"".join(data[i:i + RECORD.size] for i in range(0, len(data) - RECORD.size + 1, RECORD.size)
+                            if data[i + 8] in keep)
+            removed += (len(data) - len(kept)) // RECORD.size
+            with self._cond:
+                for kind in EVENT_NAMES:
+                    if kind not in keep:
+                        self._totals[kind] -= counts[kind]
+            if not kept:
+                with self._cond:
+                    del self._sealed[name]
+                os.remove(summary_path)
+                os.remove(path)
+                continue
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            summary = _summarize(path)
+            _write_summary(summary_path, summary)
+            with self._cond:
+                self._sealed[name] = summary
+        return removed
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self.thread.join(timeout=1.0)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Kopan seri bağlantıyı kendiliğinden yeniden kuran gözetmen.
+
+Kablo çekilince ya da kart reset olunca okuma thread'i hatayla biter ve
+denetleyici link_lost_handler'ı çağırır (asyncio arka ucunda olay döngüsü
+thread'inden). LinkSupervisor bu anda:
+
+- Komut hattını askıya alır (CommandPipeline.suspend): yanıtı beklenen
+  güvenli komutlar kuyruğa geri konur, yeni komutlar kuyrukta bekler.
+- Aynı porta hemen bir kez, sonra artan ve rastgele saçılmış aralıklarla
+  (BACKOFF_INITIAL'dan BACKOFF_MAX'a) yeniden bağlanmayı dener.
+- Port izleyici yeni bir port bildirirse (ports_added) beklemeyi keser ve
+  hemen dener; kart takılır takılmaz bağlanılır.
+
+Bağlanınca komut hattı yeniden açılır, bekleyen komutlar sırayla gönderilir
+ve durum STATE ile kartınkiyle eşitlenir (protokol 3; eski firmware'de
+eşitleme yapılamaz). REPLAY_WINDOW içinde bağlanılamazsa bekleyen komutlar
+başarısız olur, denemeler ise kullanıcı vazgeçene (cancel) kadar sürer.
+
+Dinleyiciler: callback(bağlı_mı, kopukluk_süresi_saniye) — kopunca
+(False, 0.0), yeniden bağlanınca (True, süre).
+"""
+
+import random
+import threading
+import time
+
+BACKOFF_INITIAL = 0.05  # İlk başarısız denemeden sonraki bekleme (saniye)
+BACKOFF_MAX = 5.0       # Denemeler arasındaki en uzun bekleme (saniye)
+REPLAY_WINDOW = 10.0    # Bekleyen komutların yeniden bağlanmayı bekleyeceği en uzun süre (saniye)
+
+
+class LinkSupervisor:
+    """Denetleyicinin bağlantısı koparsa yeniden bağlanır ve komutları sürdürür."""
+
+    def __init__(self, controller, initial=BACKOFF_INITIAL, maximum=BACKOFF_MAX,
+                 replay_window=REPLAY_WINDOW, metrics=None):
+        self.controller = controller
+        self.initial = initial
+        self.maximum = maximum
+        self.replay_window = replay_window
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._cancelled = False
+        self._listeners = []
+        controller.link_lost_handler = self._on_lost
+
+        # İstatistikler
+        self.losses = 0
+        self.reconnects = 0
+        self.attempts = 0
+        self.recovery = None
+        if metrics is not None:
+            self.recovery = metrics.histogram("domu_link_recovery_seconds",
+                                              "Bağlantı kopmasından yeniden bağlanmaya geçen süre")
+            metrics.callback("domu_link_losses_total", "Kopan bağlantı", lambda s: s.losses,
+                             kind="counter", owner=self)
+            metrics.callback("domu_link_reconnects_total", "Kendiliğinden yeniden kurulan bağlantı",
+                             lambda s: s.reconnects, kind="counter", owner=self)
+            metrics.callback("domu_link_attempts_total", "Yeniden bağlanma denemesi", lambda s: s.attempts,
+                             kind="counter", owner=self)
+
+    def on(self, callback):
+        self._listeners.append(callback)
+
+    @property
+    def reconnecting(self):
+        return self._thread is not None and not self._cancelled
+
+    def ports_added(self, ports):
+        """Port izleyicisinden: yeni port takıldı, beklemeden yeniden dene."""
+        if ports and self._thread is not None:
+            self._wake.set()
+
+    def cancel(self):
+        """Yeniden bağlanmaktan vazgeçer (kullanıcı bağlantıyı kesti ya da uygulama kapanıyor).
+
+        Beklenmez: Tk thread'inden çağrılır. Bekleyen thread hemen uyanıp çıkar;
+        sürmekte olan bir deneme bağlanırsa bağlantıyı kendisi kapatır.
+        """
+        with self._lock:
+            self._cancelled = True
+        self._wake.set()
+
+    def _on_lost(self, error):
+        # Okuma thread'inden çağrılır
+        port = self.controller.port_name
+        self.controller.commands.suspend(f"Cihaz bağlantısı koptu: {str(error)}")
+        with self._lock:
+            self.losses += 1
+            self._cancelled = False
+            if self._thread is not None:
+                self._wake.set()
+                return
+            self._thread = threading.Thread(target=self._run, args=(port, time.monotonic()),
+                                            name="domu-link", daemon=True)
+            self._thread.start()
+        self._notify(False, 0.0)
+
+    def _run(self, port, lost_at):
+        controller = self.controller
+        delay = self.initial
+        replaying = True
+        try:
+            while True:
+                with self._lock:
+                    if self._cancelled or controller.port_name != port:
+                        break
+                self.attempts += 1
+                try:
+                    controller.connect(port)
+                except Exception as e:
+                    print(f"Yeniden bağlanılamadı ({port}): {str(e)}")
+                    controller.close_port()  # Başarısız denemenin açtığı port kapanır, port adı korunur
+                else:
+                    seconds = time.monotonic() - lost_at
+                    with self._lock:
+                        cancelled = self._cancelled
+                        # Bağlanır bağlanmaz yine koptuysa _on_lost bu thread'i uyandırmıştır: denemeye devam
+                        connected = controller.connected
+                        if connected and not cancelled:
+                            self._thread = None
+                    if cancelled:
+                        controller.disconnect()
+                        return
+                    if connected:
+                        self.reconnects += 1
+                        if self.recovery:
+                            self.recovery.record(seconds)
+                        self._notify(True, seconds)
+                        return
+
+                if replaying and time.monotonic() - lost_at >= self.replay_window:
+                    # Kuyruktaki komutlar daha fazla bekletilmez; denemeler sürer
+                    controller.commands.close("Cihaza yeniden bağlanılamadı")
+                    replaying = False
+                # Eşzamanlı kopan birçok istemci aynı anda denemesin diye saçılır
+                self._wake.wait(random.uniform(delay / 2, delay))
+                self._wake.clear()
+                delay = min(delay * 2, self.maximum)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _notify(self, connected, seconds):
+        for callback in list(self._listeners):
+            try:
+                callback(connected, seconds)
+            except Exception as e:
+                print(f"Bağlantı durumu işlenirken hata: {str(e)}")
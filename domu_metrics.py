@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""DOMU ölçüm katmanı: sayaçlar, gecikme histogramları ve Prometheus çıktısı.
+
+Sayaç ve histogramlar sıcak yolda yalnızca birkaç toplama yapar. Zaten
+başka bir nesnede tutulan değerler (ör. LineCodec.errors) kopyalanmaz;
+callback() ile kaydedilir ve yalnızca dışa aktarılırken okunur.
+
+Histogramlar HDR tarzıdır: değerler mikrosaniyeye çevrilir, her ikinin
+kuvveti aralığı 16 eşit alt kovaya bölünür. Böylece 1 µs ile saatler
+arasındaki her değer ~%6 hassasiyetle, sabit bellekle tutulur.
+
+Dışa aktarma (Prometheus metin biçimi):
+    REGISTRY.write_textfile("/var/lib/node_exporter/domu.prom")
+    REGISTRY.serve(9464)   # http://127.0.0.1:9464/metrics
+"""
+
+import os
+import threading
+import weakref
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_EXPONENT = 40  # 2^40 µs ≈ 12 gün; daha büyük değerler son kovaya yazılır
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+METRICS_PORT = 9464
+
+
+def _bucket_index(value):
+    """Mikrosaniye cinsinden tam sayı değerin kova indeksi."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_upper(index):
+    """Kovadaki en büyük değer (mikrosaniye)."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+class Counter:
+    """Yalnızca artan sayaç."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Saniye cinsinden süreler için HDR tarzı histogram."""
+
+    def __init__(self):
+        self._counts = [0] * ((MAX_EXPONENT + 2) * SUB_BUCKETS)
+        self._last = len(self._counts) - 1
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = _bucket_index(max(0, int(seconds * 1e6)))
+        with self._lock:
+            self._counts[min(index, self._last)] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        """fraction (0-1) yüzdeliğindeki değer (saniye); kayıt yoksa 0."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(fraction * self.count)))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= target:
+                    return min(_bucket_upper(index) / 1e6, self.max)
+        return self.max
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+
+class _Callback:
+    """Değeri dışa aktarılırken okunan ölçüm; birden çok kaynak birleştirilir."""
+
+    def __init__(self, aggregate):
+        self.sources = []  # (fonksiyon, sahibin zayıf referansı ya da None)
+        self.aggregate = aggregate
+
+    @property
+    def value(self):
+        values = []
+        for source in list(self.sources):
+            function, owner = source
+            try:
+                if owner is None:
+                    value = function()
+                else:
+                    target = owner()
+                    if target is None:
+                        # Sahibi silinmiş (ör. kapatılan denetleyici)
+                        self.sources.remove(source)
+                        continue
+                    value = function(target)
+            except Exception as e:
+                print(f"Ölçüm okunurken hata: {str(e)}")
+                continue
+            if value is not None:
+                values.append(value)
+        return self.aggregate(values) if values else 0
+
+
+def _label_text(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Ad ve etiketlere göre ölçüm nesnelerini tutar ve dışa aktarır."""
+
+    def __init__(self):
+        self._metrics = {}  # (ad, etiketler) -> ölçüm
+        self._meta = {}     # ad -> (tür, açıklama)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _get(self, name, kind, help_text, labels, factory):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = factory()
+                self._meta.setdefault(name, (kind, help_text))
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        """Sayaç döndürür; aynı ad ve etiketlerle tekrar çağrılırsa aynı sayaç."""
+        return self._get(name, "counter", help_text, labels, Counter)
+
+    def histogram(self, name, help_text="", **labels):
+        return self._get(name, "summary", help_text, labels, Histogram)
+
+    def callback(self, name, help_text, function, kind="gauge", aggregate=sum, owner=None, **labels):
+        """Değeri dışa aktarırken function() ile okur.
+
+        owner verilirse function(owner) çağrılır ve owner'a yalnızca zayıf
+        referans tutulur; owner silinince kaynak kendiliğinden düşer. Aynı
+        ada eklenen kaynakların değerleri aggregate ile birleştirilir
+        (None dönenler atlanır).
+        """
+        metric = self._get(name, kind, help_text, labels, lambda: _Callback(aggregate))
+        metric.sources.append((function, weakref.ref(owner) if owner is not None else None))
+        return metric
+
+    def collect(self):
+        """[(ad, tür, etiketler, ölçüm), ...] ada göre sıralı."""
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda item: item[0])
+        return [(name, self._meta[name][0], labels, metric) for (name, labels), metric in items]
+
+    def to_prometheus(self):
+        """Prometheus metin biçiminde bütün ölçümler."""
+        lines = []
+        previous = None
+        for name, kind, labels, metric in self.collect():
+            if name != previous:
+                lines.append(f"# HELP {name} {self._meta[name][1]}")
+                lines.append(f"# TYPE {name} {kind}")
+                previous = name
+            if isinstance(metric, Histogram):
+                for quantile in QUANTILES:
+                    lines.append(f"{name}{_label_text(labels, ('quantile', quantile))} "
+                                 f"{metric.percentile(quantile):.6f}")
+                lines.append(f"{name}_sum{_label_text(labels)} {metric.sum:.6f}")
+                lines.append(f"{name}_count{_label_text(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_label_text(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Ölçümleri dosyaya yazar (node_exporter textfile toplayıcısı için)."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """/metrics adresini arka plan thread'inde HTTP ile sunar."""
+        # http.server yalnızca dışa aktarma açıldığında yüklenir (başlangıç süresi)
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Uygulama genelindeki varsayılan kayıt defteri
+REGISTRY = MetricsRegistry()
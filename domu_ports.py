@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Seri port takılıp çıkarılmasını arka planda izler.
+
+comports() her çağrıda sysfs'i baştan tarar; çok tty aygıtı olan
+makinelerde bu, arayüz thread'inde kısa donmalara yol açar. PortWatcher
+taramayı kendi thread'inde yapar ve yalnızca gerektiğinde tarar:
+
+- Linux'ta /dev dizini inotify ile izlenir; tty düğümü eklenip silinince
+  kısa bir beklemeden sonra (udev'in işini bitirmesi için) yeniden taranır.
+- inotify yoksa (ör. macOS, Windows) belirli aralıklarla taranır.
+
+Son envanter saklanır ve öncekiyle karşılaştırılır; dinleyiciye yalnızca
+eklenen ve çıkarılan portlar bildirilir.
+"""
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import serial.tools.list_ports
+
+POLL_INTERVAL = 2.0  # inotify yoksa tarama aralığı (saniye)
+SETTLE_DELAY = 0.3   # /dev değişikliğinden sonra taramadan önce beklenen süre (saniye)
+DEV_DIR = "/dev"
+PORT_PREFIXES = ("tty", "cu.", "rfcomm")  # İzlenen düğüm adları
+
+# inotify sabitleri (linux/inotify.h)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def list_ports():
+    """Bağlı seri portların aygıt yolları."""
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
+def _open_inotify(path):
+    """path için inotify tanıtıcısı açar; desteklenmiyorsa None döner."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _port_events(data):
+    """inotify olaylarından izlenen port adlarıyla ilgili olan var mı?"""
+    offset = 0
+    while offset + IN_EVENT.size <= len(data):
+        _, _, _, length = IN_EVENT.unpack_from(data, offset)
+        name = data[offset + IN_EVENT.size:offset + IN_EVENT.size + length].rstrip(b"\0")
+        offset += IN_EVENT.size + length
+        if name.decode("utf-8", "replace").startswith(PORT_PREFIXES):
+            return True
+    return False
+
+
+class PortWatcher:
+    """Port envanterini arka planda güncel tutar.
+
+    on_change(eklenenler, çıkarılanlar) watcher thread'inden çağrılır;
+    arayüz bunu kendi thread'ine aktarmalıdır. İlk taramada bütün portlar
+    "eklendi" olarak bildirilir.
+    """
+
+    def __init__(self, on_change, interval=POLL_INTERVAL, dev_dir=DEV_DIR, scan=list_ports):
+        self.on_change = on_change
+        self.interval = interval
+        self.dev_dir = dev_dir
+        self.scan = scan
+        self.ports = []  # Son envanter (sıralı)
+        self.scans = 0
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        self._inotify = _open_inotify(dev_dir)
+        self.mode = "inotify" if self._inotify is not None else "poll"
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        os.write(self._wakeup_write, b"\0")
+        self.thread.join(timeout=1.0)
+        for fd in (self._inotify, self._wakeup_read, self._wakeup_write):
+            if fd is not None:
+                os.close(fd)
+        self._inotify = None
+
+    def rescan(self):
+        """Portları tarar; envanter değiştiyse dinleyiciye bildirir."""
+        try:
+            current = sorted(self.scan())
+        except Exception as e:
+            print(f"Portlar taranırken hata: {str(e)}")
+            return
+        self.scans += 1
+        added = [port for port in current if port not in self.ports]
+        removed = [port for port in self.ports if port not in current]
+        self.ports = current
+        if added or removed:
+            try:
+                self.on_change(added, removed)
+            except Exception as e:
+                print(f"Port değişikliği işlenirken hata: {str(e)}")
+
+    def _run(self):
+        self.rescan()
+        watched = [self._wakeup_read] + ([self._inotify] if self._inotify is not None else [])
+        due = None  # /dev değiştiyse taramanın yapılacağı an
+        while self.running:
+            if self._inotify is None:
+                timeout = self.interval
+            elif due is not None:
+                timeout = max(0.0, due - time.monotonic())
+            else:
+                timeout = None
+            readable, _, _ = select.select(watched, [], [], timeout)
+            if not self.running:
+                return
+            if self._inotify is not None and self._inotify in readable:
+                try:
+                    changed = _port_events(os.read(self._inotify, 64 * 1024))
+                except BlockingIOError:
+                    changed = False
+                if changed and due is None:
+                    # udev düğümü oluşturup izinleri ayarlayana kadar bekle
+                    due = time.monotonic() + SETTLE_DELAY
+            if self._inotify is None or (due is not None and time.monotonic() >= due):
+                due = None
+                self.rescan()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Seri oturum kaydı ve hızlandırılmış tekrar oynatma.
+
+SessionRecorder porttan okunan ve porta yazılan ham baytları monotonik
+zamanla ikili bir dosyaya kaydeder. rx()/tx() okuma ve yazıcı
+thread'lerinden çağrılır; kaydı bellekteki tampona ekleyip hemen döner,
+diske kısa aralıklarla (FLUSH_INTERVAL) kendi thread'i yazar. Böylece
+okuma thread'i diski hiç beklemez.
+
+Dosya biçimi (küçük uçlu):
+    başlık  "DOMUREC1" + kayıt başlangıcı (time.time(), double)
+    kayıt   yön (1 bayt: 0 karttan, 1 karta) + önceki kayıttan bu yana
+            geçen mikrosaniye (uint32) + uzunluk (uint16) + baytlar
+
+replay() kaydı denetleyicinin çözücüsüne (feed) geri verir; olaylar ve
+arayüz canlı bağlantıdaki gibi çalışır. speed=1 gerçek zamanlı, speed=N N
+kat hızlı, speed=None beklemeden oynatır; gerçek bir günün trafiği böylece
+tekrarlanabilir bir verim ve regresyon ölçümüne dönüşür.
+
+Kullanım:
+    python3 domu_record.py dump <dosya>
+    python3 domu_record.py replay <dosya> [--speed N | --fast]
+    python3 arduino_gui_tkinter.py --record [dosya]
+    python3 arduino_gui_tkinter.py --replay <dosya> [--speed N | --fast]
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"DOMUREC1"
+HEADER = struct.Struct("<8sd")   # sihirli sayı, başlangıç zamanı (time.time)
+RECORD = struct.Struct("<BIH")   # yön, önceki kayıttan bu yana µs, uzunluk
+RX = 0  # Karttan gelen
+TX = 1  # Karta giden
+MAX_DELTA = 0xFFFFFFFF  # Tek kayıtta gösterilebilen en uzun ara (~71 dakika)
+MAX_CHUNK = 0xFFFF
+FLUSH_INTERVAL = 0.5  # Tamponun diske yazılma aralığı (saniye)
+MAX_PENDING = 4 * 1024 * 1024  # Disk takılırsa bellekte tutulacak en fazla bayt; fazlası atılır
+DEFAULT_RECORD_DIR = os.path.join(os.path.expanduser("~"), ".domu", "sessions")
+
+
+class SessionRecorder:
+    """Ham seri trafiğini zaman damgalarıyla dosyaya kaydeder."""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, clock=time.monotonic, metrics=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, time.time()))
+        self._cond = threading.Condition()
+        self._pending = bytearray()
+        self._last = clock()
+
+        # İstatistikler
+        self.records = 0
+        self.recorded_bytes = 0
+        self.dropped = 0
+        if metrics is not None:
+            metrics.callback("domu_record_bytes_total", "Oturum kaydına yazılan seri bayt",
+                             lambda r: r.recorded_bytes, kind="counter", owner=self)
+            metrics.callback("domu_record_dropped_total", "Disk yetişemediği için kaydedilemeyen parça",
+                             lambda r: r.dropped, kind="counter", owner=self)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="domu-record", daemon=True)
+        self.thread.start()
+
+    def rx(self, data):
+        """Porttan okunan baytlar (okuma thread'inden)."""
+        self._append(RX, data)
+
+    def tx(self, data):
+        """Porta yazılan baytlar (yazıcı thread'inden)."""
+        self._append(TX, data)
+
+    def _append(self, direction, data):
+        now = self.clock()
+        with self._cond:
+            delta = int((now - self._last) * 1e6)
+            pending = self._pending
+            if delta <= MAX_DELTA and len(data) <= MAX_CHUNK and len(pending) <= MAX_PENDING:
+                # Sıcak yol: tek başlık ve baytlar, okuma thread'i başka hiçbir şey beklemez
+                self._last = now
+                pending += RECORD.pack(direction, max(delta, 0), len(data))
+                pending += data
+                self.records += 1
+                self.recorded_bytes += len(data)
+                return
+            if len(pending) > MAX_PENDING:
+                self.dropped += 1
+                return
+            self._last = now
+            while delta > MAX_DELTA:
+                # Çok uzun sessizlik: boş kayıtlarla zaman ilerletilir
+                self._pending += RECORD.pack(direction, MAX_DELTA, 0)
+                delta -= MAX_DELTA
+            for offset in range(0, len(data), MAX_CHUNK):
+                chunk = data[offset:offset + MAX_CHUNK]
+                self._pending += RECORD.pack(direction, max(delta, 0), len(chunk))
+                self._pending += chunk
+                delta = 0
+            self.records += 1
+            self.recorded_bytes += len(data)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self.running, self.flush_interval)
+                batch, self._pending = self._pending, bytearray()
+                running = self.running
+            if batch:
+                try:
+                    self._file.write(batch)
+                    self._file.flush()
+                except Exception as e:
+                    print(f"Oturum kaydı yazılamadı: {str(e)}")
+            if not running:
+                return
+
+    def close(self):
+        """Kalan kayıtları yazar ve dosyayı kapatır."""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self.thread.join(timeout=5.0)
+        self._file.close()
+
+
+def read_records(path):
+    """Kayıtları (başlangıçtan bu yana saniye, yön, baytlar) olarak verir.
+
+    Yarım kalmış son kayıt (ör. uygulama çöktü) sessizce atlanır.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Oturum kaydı değil: {path}")
+    offset = HEADER.size
+    elapsed = 0
+    view = memoryview(data)
+    while offset + RECORD.size <= len(data):
+        direction, delta, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            return
+        elapsed += delta
+        if length:
+            yield elapsed / 1e6, direction, view[offset:offset + length]
+        offset += length
+
+
+def recording_start(path):
+    """Kaydın başladığı an (time.time())."""
+    with open(path, "rb") as f:
+        magic, started = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"Oturum kaydı değil: {path}")
+    return started
+
+
+def replay(path, feed, speed=1.0, on_tx=None, should_stop=lambda: False):
+    """Kaydı feed(baytlar) ile geri oynatır; (parça, bayt, süre) döndürür.
+
+    speed=None ya da 0 ise beklenmez. on_tx verilirse karta giden baytlar
+    da aynı zamanlamayla ona verilir (ör. gönderilen komutları karşılaştırmak için).
+    """
+    chunks = total = 0
+    start = time.perf_counter()
+    for seconds, direction, data in read_records(path):
+        if should_stop():
+            break
+        if speed:
+            delay = start + seconds / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if direction == RX:
+            feed(data)
+            chunks += 1
+            total += len(data)
+        elif on_tx:
+            on_tx(data)
+    return chunks, total, time.perf_counter() - start
+
+
+def main(argv):
+    if len(argv) < 3 or argv[1] not in ("dump", "replay"):
+        print(__doc__)
+        return 1
+    path = argv[2]
+
+    if argv[1] == "dump":
+        started = recording_start(path)
+        for seconds, direction, data in read_records(path):
+            moment = started + seconds
+            stamp = time.strftime("%H:%M:%S", time.localtime(moment))
+            arrow = "<-" if direction == RX else "->"
+            print(f"{stamp}.{int(moment * 1000) % 1000:03d} {arrow} {bytes(data)!r}")
+        return 0
+
+    speed = 1.0
+    if "--fast" in argv:
+        speed = None
+    elif "--speed" in argv:
+        speed = float(argv[argv.index("--speed") + 1])
+
+    # Denetleyici porta bağlanmadan yalnızca çözücü ve olaylar için kullanılır
+    from domu_controller import DomuController
+    controller = DomuController()
+    events = {}
+    for event in ("pot", "led", "door", "button", "ready"):
+        controller.on(event, lambda *args, event=event: events.__setitem__(event, events.get(event, 0) + 1))
+    chunks, total, elapsed = replay(path, controller.feed, speed)
+    print(f"{chunks} parça, {total} bayt, {controller.codec.lines} satır {elapsed:.2f} s içinde "
+          f"({controller.codec.lines / elapsed if elapsed else 0:.0f} satır/s)")
+    print("Olaylar: " + ", ".join(f"{event} {count}" for event, count in sorted(events.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""DOMU seri port okuma döngüleri."""
+
+import time
+
+READ_TIMEOUT = 0.1   # Bloklayan okumada durdurma bayrağının kontrol aralığı (saniye)
+POLL_INTERVAL = 0.1  # Eski yoklama döngüsündeki bekleme süresi (saniye)
+
+
+def poll_lines(serial_port, handle_line, should_stop, interval=POLL_INTERVAL):
+    """Eski yöntem: in_waiting kontrol edilir, tek satır okunur, sonra beklenir."""
+    while not should_stop():
+        if not serial_port or not serial_port.is_open:
+            time.sleep(interval)
+            continue
+
+        try:
+            if serial_port.in_waiting:
+                handle_line(serial_port.readline().decode('utf-8').strip())
+        except Exception as e:
+            print(f"Seri veri okuma hatası: {str(e)}")
+
+        time.sleep(interval)  # CPU kullanımını azaltmak için kısa bekleme
+
+
+def read_chunks(serial_port, handle_chunk, should_stop, timeout=READ_TIMEOUT, on_lost=None):
+    """Olay güdümlü okuma: port üzerinde zaman aşımıyla bloklanır ve
+    gelen baytları beklemeden işleyiciye verir.
+
+    on_lost verilirse okuma hatasında (ör. kablo çekildi) ya da port
+    kapandığında on_lost(hata) çağrılır ve döngü biter; verilmezse hata
+    yazdırılıp okumaya devam edilir."""
+    serial_port.timeout = timeout
+
+    while not should_stop():
+        if not serial_port.is_open:
+            if on_lost:
+                on_lost(ConnectionError("Port kapandı"))
+                return
+            time.sleep(timeout)
+            continue
+
+        try:
+            # En az bir bayt gelene kadar (ya da zaman aşımına kadar) bekle,
+            # sonra tamponda birikmiş her şeyi tek seferde al
+            chunk = serial_port.read(serial_port.in_waiting or 1)
+        except Exception as e:
+            if on_lost:
+                on_lost(e)
+                return
+            print(f"Seri veri okuma hatası: {str(e)}")
+            time.sleep(timeout)
+            continue
+
+        if chunk:
+            handle_chunk(chunk)
+
+
+def read_lines(serial_port, handle_line, should_stop, timeout=READ_TIMEOUT):
+    """read_chunks üzerinde çalışır; gelen bütün tam satırları str olarak işler."""
+    buffer = bytearray()
+
+    def handle_chunk(chunk):
+        buffer.extend(chunk)
+
+        # Tampondaki tüm tam satırları sırayla işle
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = buffer[start:end]
+            start = end + 1
+            try:
+                handle_line(line.decode('utf-8').strip())
+            except Exception as e:
+                print(f"Seri veri okuma hatası: {str(e)}")
+        del buffer[:start]
+
+    read_chunks(serial_port, handle_chunk, should_stop, timeout)
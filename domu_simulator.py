@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""sketch_jun01a.ino için yazılım taklidi (sanal DOMU Arduino'su).
+
+Bir sözde terminal (pty) açar ve Arduino gibi davranır: LED:, LED_SET:,
+OPEN_DOOR, CLOSE_DOOR, GET_POT ve STATE komutlarına firmware ile aynı
+yanıtları verir,
+sıra numaralarını ("KOMUT#17") geri yollar ve tekrar gelen numaralara
+önceki yanıtı gönderir. İstenirse belirli aralıklarla BUTTON_PRESSED
+üretir; firmware'deki gibi zil sırasında 1 saniye komut işlemez.
+SUB_POT aboneliği açıkken pot değeri ölü banttan fazla değişince POT:
+satırını kendiliğinden gönderir. Açılışta (boot_delay sonra) ve HELLO
+komutuna READY:<protokol sürümü> satırını gönderir. protocol=2 ile eski
+firmware taklit edilir (LED_OK:<n>, STATE ve LED_SET yok); reply_loss ile
+yanıtların bir kısmı hatta kaybolur.
+
+Baud hızı modellenir: her bayt hatta 10 bit sürer, Arduino'nun 64 baytlık
+alma tamponu taşarsa fazla baytlar atılır.
+
+Protokol 4: "LINK:<baud>:<0|1>" komutuna LINK_OK ile yanıt verilir, yanıt
+hattan çıkınca yeni hıza ve istenirse ikili çerçeveye geçilir. Bir saniye
+içinde geçerli bir komut gelmezse 9600 ASCII'ye dönülür. strict_baud=True
+ise istemcinin port hızı (termios) simülatörünkinden farklıyken iki yöndeki
+baytlar bozulur; max_baudrate üstündeki hızlarda da bozulur (hızı
+taşıyamayan bir kablo ya da dönüştürücü gibi).
+
+Kullanım:
+    python3 domu_simulator.py [--baudrate 9600] [--button-interval SANIYE] [--boot-delay SANIYE]
+
+İlk satırda istemcinin bağlanacağı port yolu yazdırılır.
+"""
+
+import argparse
+import collections
+import os
+import pty
+import random
+import select
+import sys
+import termios
+import threading
+import time
+import tty
+
+from domu_protocol import COMMAND_TABLE, REPLY_OPCODES, encode_frame, split_frames
+
+LED_COUNT = 4
+RX_BUFFER_SIZE = 64   # Arduino donanım alma tamponu (bayt)
+TX_BUFFER_SIZE = 64   # Arduino gönderme tamponu; doluysa Serial.print bekler
+RECENT_COUNT = 4      # Firmware'in hatırladığı son yanıt sayısı
+BUTTON_BUSY = 1.0     # Zil çalarken firmware'in delay() ile beklediği süre (saniye)
+PROTOCOL_VERSION = 4
+LINK_BAUDRATES = (9600, 19200, 38400, 57600, 115200, 230400, 250000, 500000, 1000000)
+LINK_CONFIRM = 1.0    # Geçişten sonra geçerli komut beklenen süre; gelmezse 9600 ASCII'ye dönülür
+GARBAGE = 0xF0        # Yanlış hızda okunan baytların yerine geçen değer
+
+
+def _to_int(text):
+    """Arduino String.toInt() gibi: baştaki sayıyı okur, yoksa 0 döner."""
+    digits = ""
+    for char in text.strip():
+        if char.isdigit() or (char == "-" and not digits):
+            digits += char
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+class VirtualDomu:
+    """pty üzerinde çalışan sanal DOMU Arduino'su."""
+
+    def __init__(self, baudrate=9600, latency=0.0, button_interval=None, pot=512, boot_delay=0.0,
+                 protocol=PROTOCOL_VERSION, reply_loss=0.0, max_baudrate=None, strict_baud=False):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.baudrate = baudrate
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0  # 8N1: bayt başına 10 bit
+        self.latency = latency  # USB/işlem gecikmesi (saniye)
+        self.button_interval = button_interval
+        self.protocol = protocol
+        self.reply_loss = reply_loss  # Kaybolan yanıt oranı (0-1)
+        self.base_baudrate = baudrate
+        self.max_baudrate = max_baudrate  # Hattın taşıyabildiği en yüksek hız (None: sınırsız)
+        self.strict_baud = strict_baud
+        self.binary = False
+        self._link_request = None  # LINK yanıtı gönderilince uygulanacak (baud, ikili)
+        self._link_switch = None   # (geçiş anı, baud, ikili)
+        self._link_deadline = None  # Bu ana kadar geçerli komut gelmezse geri dönülür
+
+        # Firmware durumu
+        self.leds = [False] * LED_COUNT
+        self.servo = 0
+        self.pot = pot  # Dışarıdan (başka thread'den) değiştirilebilir
+        self.pot_subscribed = False
+        self.pot_deadband = 4
+        self.pot_min_interval = 0.1
+        self._last_pot_sent = -1
+        self._last_pot_sent_at = 0.0
+        self.recent = collections.deque(maxlen=RECENT_COUNT)  # (sıra, yanıt)
+
+        # Hat modeli
+        self._incoming = collections.deque()  # (varış zamanı, baytlar)
+        self._rx = bytearray()                # Arduino alma tamponu
+        self._rx_wire_free = 0.0
+        self._outgoing = collections.deque()  # (gönderim zamanı, baytlar)
+        self._tx_wire_free = 0.0
+        # Açılış: setup() bitene kadar komut işlenmez, sonra READY gönderilir
+        self._busy_until = time.perf_counter() + boot_delay
+        self._booted = False
+        self._pending_button = None
+        self._next_button = time.perf_counter() + button_interval if button_interval else None
+
+        # İstatistikler
+        self.commands = 0
+        self.lost_replies = 0
+        self.rx_overflow = 0
+        self.frame_errors = 0
+        self.garbled = 0
+        self.link_switches = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def press_button(self):
+        """Zil butonuna basılmış gibi davranır."""
+        self._pending_button = time.perf_counter()
+
+    # Firmware
+
+    def execute(self, line):
+        """Tek bir komutu firmware gibi işler; gönderilecek yanıtı döndürür."""
+        command, _, seq = line.partition("#")
+        command = command.strip()
+        seq = int(seq) if seq.strip().lstrip("-").isdigit() else -1
+
+        if seq >= 0:
+            for recent_seq, recent_reply in self.recent:
+                if recent_seq == seq:
+                    return recent_reply
+
+        if command.startswith("LED:"):
+            led = _to_int(command[4:])
+            if not 0 <= led < LED_COUNT:
+                return None
+            self.leds[led] = not self.leds[led]
+            reply = f"LED_OK:{led}:{int(self.leds[led])}" if self.protocol >= 3 else f"LED_OK:{led}"
+        elif command.startswith("LED_SET:") and self.protocol >= 3:
+            led, _, value = command[8:].partition(":")
+            led = _to_int(led)
+            if not 0 <= led < LED_COUNT:
+                return None
+            self.leds[led] = _to_int(value) != 0
+            reply = f"LED_OK:{led}:{int(self.leds[led])}"
+        elif command.startswith("OPEN_DOOR"):
+            self.servo = 90
+            reply = "DOOR_OPENED"
+        elif command.startswith("CLOSE_DOOR"):
+            self.servo = 0
+            reply = "DOOR_CLOSED"
+        elif command.startswith("SUB_POT"):
+            parts = command.split(":")
+            if len(parts) > 1:
+                self.pot_deadband = _to_int(parts[1])
+            if len(parts) > 2:
+                self.pot_min_interval = _to_int(parts[2]) / 1000.0
+            self.pot_subscribed = True
+            self._last_pot_sent = -1
+            reply = "SUB_OK"
+        elif command == "UNSUB_POT":
+            self.pot_subscribed = False
+            reply = "UNSUB_OK"
+        elif command == "GET_POT":
+            reply = f"POT:{int(self.pot)}"
+        elif command == "STATE" and self.protocol >= 3:
+            leds = "".join("1" if on else "0" for on in self.leds)
+            reply = f"STATE:{leds}:{self.servo}:{int(self.pot)}"
+        elif command == "HELLO":
+            reply = f"READY:{self.protocol}"
+        elif command.startswith("LINK:") and self.protocol >= 4:
+            baudrate, _, binary = command[5:].partition(":")
+            if _to_int(baudrate) not in LINK_BAUDRATES:
+                return None
+            self._link_request = (_to_int(baudrate), _to_int(binary) != 0)
+            reply = f"LINK_OK:{_to_int(baudrate)}:{int(_to_int(binary) != 0)}"
+        else:
+            return None
+
+        if seq >= 0:
+            reply = f"{reply}#{seq}"
+            self.recent.append((seq, reply))
+        return reply
+
+    def _send(self, now, text, delay=0.0):
+        data = encode_frame(text, REPLY_OPCODES) if self.binary else (text + "\r\n").encode()
+        start = max(now + delay, self._tx_wire_free)
+        self._tx_wire_free = start + len(data) * self.byte_time
+        self._outgoing.append((self._tx_wire_free, data))
+
+    def _run(self):
+        while self.running:
+            now = time.perf_counter()
+            deadlines = [now + 0.05]
+            if self._incoming:
+                deadlines.append(self._incoming[0][0])
+            if self._outgoing:
+                deadlines.append(self._outgoing[0][0])
+            if self._next_button:
+                deadlines.append(self._next_button)
+            if self._busy_until > now or not self._booted:
+                deadlines.append(self._busy_until)
+            if self._link_switch:
+                deadlines.append(self._link_switch[0])
+            if self._link_deadline:
+                deadlines.append(self._link_deadline)
+            if self._has_command():
+                deadlines.append(now)  # Tamponda işlenmeyi bekleyen komut var
+            if self.pot_subscribed:
+                # analogRead her loop() turunda yapılır
+                deadlines.append(now + min(0.002, max(self.pot_min_interval, 0.0002)))
+            timeout = max(0.0, min(deadlines) - now)
+
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            now = time.perf_counter()
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError:
+                    return
+                # Baytlar hatta sırayla, baud hızında ilerler
+                if not self._line_ok():
+                    self.garbled += len(data)
+                    data = bytes([GARBAGE]) * len(data)
+                self._rx_wire_free = max(now, self._rx_wire_free) + len(data) * self.byte_time
+                self._incoming.append((self._rx_wire_free, data))
+                self.bytes_in += len(data)
+
+            # Hattan gelen baytları alma tamponuna koy (taşan baytlar kaybolur)
+            while self._incoming and self._incoming[0][0] <= now:
+                data = self._incoming.popleft()[1]
+                room = RX_BUFFER_SIZE - len(self._rx)
+                self._rx += data[:room]
+                self.rx_overflow += max(0, len(data) - room)
+
+            self._firmware_loop(now)
+
+            while self._outgoing and self._outgoing[0][0] <= now:
+                data = self._outgoing.popleft()[1]
+                if not self._line_ok():
+                    self.garbled += len(data)
+                    data = bytes([GARBAGE]) * len(data)
+                os.write(self.master, data)
+                self.bytes_out += len(data)
+
+    def _line_ok(self):
+        """Hat bu hızda sağlam mı? (istemcinin port hızı ve max_baudrate)"""
+        if self.max_baudrate and self.baudrate > self.max_baudrate:
+            return False
+        # İlk geçişten önce istemci portu henüz açmamış olabilir (pty varsayılan hızda)
+        if self.strict_baud and self.baudrate and self.link_switches:
+            expected = getattr(termios, f"B{self.baudrate}", None)
+            if expected is not None and termios.tcgetattr(self.slave)[4] != expected:
+                return False
+        return True
+
+    def _set_link(self, baudrate, binary):
+        self.baudrate = baudrate
+        if self.byte_time:
+            self.byte_time = 10.0 / baudrate
+        self.binary = binary
+        self.link_switches += 1
+
+    def _has_command(self):
+        if self.binary:
+            return bool(split_frames(self._rx, COMMAND_TABLE, limit=1)[0])
+        return b"\n" in self._rx
+
+    def _next_command(self):
+        """Alma tamponundan sıradaki komut satırını alır; yoksa None."""
+        if self.binary:
+            lines, consumed, errors = split_frames(self._rx, COMMAND_TABLE, limit=1)
+            del self._rx[:consumed]
+            self.frame_errors += errors
+            if not lines:
+                return None
+            line, seq = lines[0]
+            return line.decode("ascii") + (f"#{seq}" if seq is not None else "")
+        end = self._rx.find(b"\n")
+        if end < 0:
+            return None
+        line = self._rx[:end].decode("ascii", "replace")
+        del self._rx[:end + 1]
+        return line
+
+    def _firmware_loop(self, now):
+        """Arduino loop(): önce pot aboneliği ve buton, sonra en fazla bir komut."""
+        if self._link_switch and now >= self._link_switch[0] and not self._outgoing:
+            # Serial.flush() gönderilecek her şeyi bekler; sonra Serial.begin(yeni hız)
+            _, baudrate, binary = self._link_switch
+            self._link_switch = None
+            self._set_link(baudrate, binary)
+            self._link_deadline = now + LINK_CONFIRM
+        elif self._link_deadline and now >= self._link_deadline:
+            # Yeni ayarla geçerli komut gelmedi: başlangıç ayarına dön
+            self._link_deadline = None
+            self._set_link(self.base_baudrate, False)
+        if now < self._busy_until:
+            return
+        if not self._booted:
+            self._booted = True
+            self._send(now, f"READY:{self.protocol}")
+
+        # Gönderme tamponu doluyken akış hattın hızına iner
+        if (self.pot_subscribed and now - self._last_pot_sent_at >= self.pot_min_interval
+                and self._tx_wire_free - now <= TX_BUFFER_SIZE * self.byte_time):
+            value = int(self.pot)
+            if self._last_pot_sent < 0 or abs(value - self._last_pot_sent) > self.pot_deadband:
+                self._send(now, f"POT:{value}")
+                self._last_pot_sent = value
+                self._last_pot_sent_at = now
+
+        if self._next_button and now >= self._next_button:
+            self._pending_button = now
+            self._next_button += self.button_interval
+        if self._pending_button is not None:
+            # tone + delay(500), println, delay(500)
+            self._pending_button = None
+            self._send(now, "BUTTON_PRESSED", delay=BUTTON_BUSY / 2)
+            self._busy_until = now + BUTTON_BUSY
+            return
+
+        line = self._next_command()
+        if line is None:
+            return
+        self.commands += 1
+        reply = self.execute(line)
+        if reply is not None and self._link_deadline and not line.startswith("LINK:"):
+            self._link_deadline = None  # Yeni ayar doğrulandı
+        if reply is not None and self.reply_loss and random.random() < self.reply_loss:
+            self.lost_replies += 1  # Firmware gönderdi ama hatta kayboldu
+        elif reply is not None:
+            self._send(now, reply, delay=self.latency)
+        if self._link_request:
+            # LINK_OK hattan çıkınca geçilir
+            baudrate, binary = self._link_request
+            self._link_request = None
+            self._link_switch = (max(self._tx_wire_free, now), baudrate, binary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sanal DOMU Arduino'su")
+    parser.add_argument("--baudrate", type=int, default=9600, help="modellenen baud hızı (0: sınırsız)")
+    parser.add_argument("--latency", type=float, default=0.0, help="yanıt başına ek gecikme (saniye)")
+    parser.add_argument("--button-interval", type=float, default=None, help="BUTTON_PRESSED aralığı (saniye)")
+    parser.add_argument("--pot", type=int, default=512, help="potansiyometre değeri (0-1023)")
+    parser.add_argument("--boot-delay", type=float, default=0.0, help="READY gönderilene kadar geçen süre (saniye)")
+    parser.add_argument("--protocol", type=int, default=PROTOCOL_VERSION, help="taklit edilen protokol sürümü")
+    parser.add_argument("--reply-loss", type=float, default=0.0, help="kaybolan yanıt oranı (0-1)")
+    args = parser.parse_args()
+
+    device = VirtualDomu(args.baudrate, args.latency, args.button_interval, args.pot, args.boot_delay,
+                         args.protocol, args.reply_loss)
+    print(device.port, flush=True)
+    try:
+        # Standart giriş kapanana kadar çalış (bench betikleri için)
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+    device.close()
+
+
+if __name__ == "__main__":
+    main()
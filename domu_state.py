@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Cihaz durumunun sürümlü önbelleği.
+
+Firmware (protokol 3 ve sonrası) her yanıtta mutlak durum bildirir:
+    LED_OK:<led>:<0|1>            LED:<n> (aç/kapa) ve LED_SET:<n>:<0|1> yanıtı
+    STATE:<LED bitleri>:<servo açısı>:<pot>   STATE sorgusunun yanıtı, ör. STATE:0101:90:512
+
+Bu değerler önbelleğe uygulanır. Değer zaten aynıysa hiçbir şey olmaz; bu
+yüzden yinelenen ya da yeniden gönderilen yanıtlar durumu bozmaz. Değer
+değiştiyse sürüm artar. STATE anlık görüntüsü bütün alanları tek
+seferde uzlaştırır ve yalnızca farklı olan alanları döndürür.
+"""
+
+import threading
+
+STATE_PROTOCOL = 3  # STATE ve LED_SET'i destekleyen en eski protokol sürümü
+
+
+def parse_state(payload):
+    """"0101:90:512" -> ([False, True, False, True], True, 512)."""
+    leds, servo, pot = bytes(payload).decode("ascii").split(":")
+    return [bit == "1" for bit in leds], int(servo) != 0, int(pot)
+
+
+class DeviceState:
+    """LED, kapı ve potansiyometre durumu; her değişiklikte sürüm artar."""
+
+    def __init__(self, led_count):
+        self.leds = [False] * led_count
+        self.door_open = False
+        self.pot = 0
+        self.version = 0
+        self.synced_version = None  # Son STATE uzlaştırmasındaki sürüm
+        self.syncs = 0
+        self.corrections = 0  # STATE ile düzeltilen alan sayısı (kaçırılmış güncellemeler)
+        self._lock = threading.Lock()
+
+    def set_led(self, index, on):
+        """LED durumunu yazar; değiştiyse True döner."""
+        with self._lock:
+            if self.leds[index] == on:
+                return False
+            self.leds[index] = on
+            self.version += 1
+            return True
+
+    def set_door(self, is_open):
+        with self._lock:
+            if self.door_open == is_open:
+                return False
+            self.door_open = is_open
+            self.version += 1
+            return True
+
+    def set_pot(self, value):
+        with self._lock:
+            if self.pot == value:
+                return False
+            self.pot = value
+            self.version += 1
+            return True
+
+    def apply_snapshot(self, leds, door_open, pot):
+        """STATE yanıtını uygular; değişen alanları [(olay, argümanlar), ...] olarak döndürür."""
+        changes = []
+        with self._lock:
+            for index, on in enumerate(leds[:len(self.leds)]):
+                if self.leds[index] != on:
+                    self.leds[index] = on
+                    changes.append(("led", (index, on)))
+            if self.door_open != door_open:
+                self.door_open = door_open
+                changes.append(("door", (door_open,)))
+            if self.pot != pot:
+                self.pot = pot
+                changes.append(("pot", (pot,)))
+            if self.synced_version is not None:
+                # Pot değeri kendiliğinden değişir; LED ve kapı farkı kaçırılmış yanıt demektir
+                self.corrections += sum(1 for event, _ in changes if event != "pot")
+            self.version += len(changes)
+            self.synced_version = self.version
+            self.syncs += 1
+        return changes
+
+    def snapshot(self):
+        """(sürüm, LED'ler, kapı, pot) kopyası."""
+        with self._lock:
+            return self.version, list(self.leds), self.door_open, self.pot
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Potansiyometre (hedef sıcaklık) geçmişi.
+
+SampleRing: sabit boyutlu, array tabanlı (zaman, değer) halka tamponu;
+bellek kullanımı örnek sayısından bağımsızdır.
+
+TimeSeriesStore: diske yalnızca sona ekleyen, sabit uzunluklu kayıtlardan
+oluşan bir dosya. Kayıtlar zamana göre sıralı olduğundan aralık sorguları
+mmap üzerinde ikili arama ile yapılır. Eski ham kayıtlar downsample() ile
+(min, maks, ortalama) kovalarına indirilir ve ayrı bir dosyada tutulur.
+
+PotHistory ikisini birleştirir: son örnekler bellekte, hepsi diskte.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".domu", "pot_history.bin")
+RING_CAPACITY = 3600        # Bellekte tutulan son örnek sayısı
+FLUSH_EVERY = 64            # Diske yazmadan önce biriktirilen kayıt sayısı
+BUCKET_SECONDS = 60         # Eski veriler için kova genişliği (saniye)
+KEEP_RAW_SECONDS = 24 * 3600  # Bu süreden eski ham kayıtlar kovalara indirilir
+
+RECORD = struct.Struct("<df")      # zaman, değer
+ROLLUP = struct.Struct("<dfffI")   # kova başlangıcı, min, maks, ortalama, örnek sayısı
+
+
+class SampleRing:
+    """Sabit kapasiteli (zaman, değer) halka tamponu."""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        with self._lock:
+            self._times[self._next] = timestamp
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def _slot(self, i):
+        # i. en eski örneğin dizideki yeri
+        return (self._next - self._count + i) % self.capacity
+
+    def _bisect(self, timestamp):
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._times[self._slot(mid)] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def range(self, start, end):
+        """[start, end) aralığındaki örnekleri [(zaman, değer), ...] olarak döndürür."""
+        with self._lock:
+            first, last = self._bisect(start), self._bisect(end)
+            return [(self._times[self._slot(i)], self._values[self._slot(i)]) for i in range(first, last)]
+
+    def latest(self, count):
+        """Son count değeri eskiden yeniye liste olarak döndürür."""
+        with self._lock:
+            count = min(count, self._count)
+            return [self._values[self._slot(i)] for i in range(self._count - count, self._count)]
+
+    def oldest(self):
+        with self._lock:
+            return self._times[self._slot(0)] if self._count else None
+
+
+def _bisect_records(data, record_size, timestamp):
+    """Sıralı kayıtlardan oluşan tamponda zamanı timestamp'ten küçük olmayan ilk kaydın indeksi."""
+    low, high = 0, len(data) // record_size
+    while low < high:
+        mid = (low + high) // 2
+        if struct.unpack_from("<d", data, mid * record_size)[0] < timestamp:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def _read_range(path, layout, start, end):
+    if not os.path.exists(path) or os.path.getsize(path) < layout.size:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        usable = memoryview(data)[:len(data) - len(data) % layout.size]
+        try:
+            first = _bisect_records(usable, layout.size, start)
+            last = _bisect_records(usable, layout.size, end)
+            return [layout.unpack_from(usable, i * layout.size) for i in range(first, last)]
+        finally:
+            usable.release()
+
+
+class TimeSeriesStore:
+    """Diskte sona eklemeli zaman serisi ve kovalanmış eski veriler."""
+
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.rollup_path = path + ".rollup"
+        self.flush_every = flush_every
+        self._pending = bytearray()
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, timestamp, value):
+        with self._lock:
+            self._pending += RECORD.pack(timestamp, value)
+            self._pending_count += 1
+            if self._pending_count >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            with open(self.path, "ab") as f:
+                f.write(self._pending)
+            self._pending.clear()
+            self._pending_count = 0
+
+    def last_timestamp(self):
+        """Diskteki son ham kaydın zamanı; kayıt yoksa 0.0."""
+        with self._lock:
+            if self._pending:
+                return RECORD.unpack_from(self._pending, len(self._pending) - RECORD.size)[0]
+            if not os.path.exists(self.path):
+                return 0.0
+            size = os.path.getsize(self.path)
+            if size < RECORD.size:
+                return 0.0
+            with open(self.path, "rb") as f:
+                f.seek(size - size % RECORD.size - RECORD.size)
+                return RECORD.unpack(f.read(RECORD.size))[0]
+
+    def range(self, start, end):
+        """[start, end) aralığındaki ham kayıtlar: [(zaman, değer), ...]."""
+        self.flush()
+        return _read_range(self.path, RECORD, start, end)
+
+    def buckets(self, start, end):
+        """[start, end) aralığındaki kovalar: [(başlangıç, min, maks, ortalama, sayı), ...]."""
+        return _read_range(self.rollup_path, ROLLUP, start, end)
+
+    def downsample(self, older_than, bucket_seconds=BUCKET_SECONDS):
+        """older_than'dan eski ham kayıtları kovalara indirir ve ham dosyadan siler."""
+        with self._lock:
+            self._flush()
+            if not os.path.exists(self.path):
+                return 0
+            with open(self.path, "rb") as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % RECORD.size]
+            # Kova sınırına hizala ki yarım kova oluşmasın
+            cutoff = older_than - older_than % bucket_seconds
+            split = _bisect_records(data, RECORD.size, cutoff) * RECORD.size
+            if not split:
+                return 0
+
+            rollups = bytearray()
+            current, low, high, total, count = None, 0.0, 0.0, 0.0, 0
+            for timestamp, value in RECORD.iter_unpack(data[:split]):
+                bucket = timestamp - timestamp % bucket_seconds
+                if bucket != current:
+                    if count:
+                        rollups += ROLLUP.pack(current, low, high, total / count, count)
+                    current, low, high, total, count = bucket, value, value, 0.0, 0
+                low = min(low, value)
+                high = max(high, value)
+                total += value
+                count += 1
+            if count:
+                rollups += ROLLUP.pack(current, low, high, total / count, count)
+
+            with open(self.rollup_path, "ab") as f:
+                f.write(rollups)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data[split:])
+            os.replace(temp_path, self.path)
+            return split // RECORD.size
+
+    def close(self):
+        self.flush()
+
+
+class PotHistory:
+    """Potansiyometre okumalarının bellek + disk geçmişi."""
+
+    def __init__(self, path=None, capacity=RING_CAPACITY, keep_raw=KEEP_RAW_SECONDS,
+                 bucket_seconds=BUCKET_SECONDS):
+        self.ring = SampleRing(capacity)
+        self.store = TimeSeriesStore(path) if path else None
+        self.keep_raw = keep_raw
+        self.bucket_seconds = bucket_seconds
+        self._last_time = self.store.last_timestamp() if self.store else 0.0
+
+    def record(self, value, timestamp=None):
+        """Yeni bir okuma ekler (tek bir thread'den, ör. okuma thread'inden çağrılır)."""
+        # Saat geri alınsa da (ör. NTP) zamanlar sıralı kalsın: aramalar ikili arama yapar
+        timestamp = max(time.time() if timestamp is None else timestamp, self._last_time)
+        self._last_time = timestamp
+        self.ring.append(timestamp, value)
+        if self.store:
+            self.store.append(timestamp, value)
+
+    def range(self, start, end):
+        """Ham örnekler; aralık bellekteki tamponla karşılanabiliyorsa diske gidilmez."""
+        oldest = self.ring.oldest()
+        if self.store is None or (oldest is not None and oldest <= start):
+            return self.ring.range(start, end)
+        return self.store.range(start, end)
+
+    def buckets(self, start, end):
+        return self.store.buckets(start, end) if self.store else []
+
+    def latest(self, count):
+        return self.ring.latest(count)
+
+    def maintain(self, now=None):
+        """Eski ham kayıtları kovalara indirir; indirilen kayıt sayısını döndürür."""
+        if self.store is None:
+            return 0
+        return self.store.downsample((now or time.time()) - self.keep_raw, self.bucket_seconds)
+
+    def close(self):
+        if self.store:
+            self.store.close()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Okuma thread'i ile Tk arasında birleştirici güncelleme kuyruğu.
+
+Okuma thread'i her mesaj için root.after(0, ...) çağırmak yerine
+güncellemeyi bir anahtarla kuyruğa koyar. Aynı anahtar için yalnızca en son
+güncelleme tutulur (ör. art arda gelen 50 POT: değerinden sadece sonuncusu
+çizilir). Tk thread'i kuyruğu sabit bir kare hızında tek seferde boşaltır;
+böylece mesaj patlamaları Tk olay kuyruğunu doldurmaz.
+"""
+
+import itertools
+import threading
+import time
+
+FRAME_RATE = 30  # Kuyruğun saniyede boşaltılma sayısı
+
+
+class CoalescingUpdateQueue:
+    """Anahtar başına son güncellemeyi tutan, thread güvenli kuyruk."""
+
+    def __init__(self, metrics=None):
+        self._pending = {}  # anahtar -> (geri çağrı, argümanlar); ekleme sırası korunur
+        self._lock = threading.Lock()
+        self._unique = itertools.count()
+
+        # İstatistikler
+        self.puts = 0
+        self.coalesced = 0
+        self.applied = 0
+
+        # İsteğe bağlı ölçümler (domu_metrics): Tk thread'inde geçen süreler
+        self.callback_time = self.frame_time = self.errors = None
+        if metrics is not None:
+            self.callback_time = metrics.histogram("domu_ui_callback_seconds", "Tk thread'inde tek güncellemenin süresi")
+            self.frame_time = metrics.histogram("domu_ui_frame_seconds", "Tk thread'inde bir kuyruk boşaltmasının süresi")
+            self.errors = metrics.counter("domu_ui_errors_total", "Arayüz güncellemelerinde oluşan hata")
+            metrics.callback("domu_ui_updates_total", "Kuyruğa konan güncelleme", lambda q: q.puts,
+                             kind="counter", owner=self)
+            metrics.callback("domu_ui_coalesced_total", "Yenisi geldiği için atlanan güncelleme",
+                             lambda q: q.coalesced, kind="counter", owner=self)
+
+    def put(self, key, callback, *args):
+        """Güncellemeyi ekler; aynı anahtarda bekleyen eski güncellemenin yerini alır."""
+        with self._lock:
+            self.puts += 1
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (callback, args)
+
+    def post(self, callback, *args):
+        """Birleştirilmeyecek (her biri çalışması gereken) bir güncelleme ekler."""
+        self.put(("post", next(self._unique)), callback, *args)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def drain(self):
+        """Bekleyen bütün güncellemeleri sırayla uygular (Tk thread'inde çağrılır)."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        callback_time = self.callback_time
+        for callback, args in pending.values():
+            start = time.perf_counter()
+            try:
+                callback(*args)
+            except Exception as e:
+                if self.errors:
+                    self.errors.inc()
+                print(f"Arayüz güncellenirken hata: {str(e)}")
+            if callback_time:
+                callback_time.record(time.perf_counter() - start)
+        self.applied += len(pending)
+        return len(pending)
+
+
+class TkUpdatePump:
+    """Kuyruğu Tk ana döngüsünde sabit kare hızında boşaltır."""
+
+    def __init__(self, root, queue, fps=FRAME_RATE):
+        self.root = root
+        self.queue = queue
+        self.interval = max(1, int(1000 / fps))
+        self.last_batch = 0
+        self.last_drain_ms = 0.0
+        self.max_drain_ms = 0.0
+        self._job = self.root.after(self.interval, self._tick)
+
+    def _tick(self):
+        # Önce bir sonrakini zamanla: güncelleme modal bir pencere açsa da
+        # (ör. kapı sorusu) kuyruk boşaltılmaya devam eder
+        self._job = self.root.after(self.interval, self._tick)
+        start = time.perf_counter()
+        count = self.queue.drain()
+        if count:
+            elapsed = time.perf_counter() - start
+            self.last_batch = count
+            self.last_drain_ms = elapsed * 1000.0
+            self.max_drain_ms = max(self.max_drain_ms, self.last_drain_ms)
+            if self.queue.frame_time:
+                self.queue.frame_time.record(elapsed)
+
+    def stop(self):
+        if self._job:
+            self.root.after_cancel(self._job)
+            self._job = None
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Hava durumu sağlayıcıları ve önbellekli hava durumu servisi.
+
+Sağlayıcılar yalnızca fetch() metodu olan nesnelerdir ve Weather döndürür;
+yavaş olabilirler (ağ, dosya). WeatherService onları arayüz thread'inde
+değil, tek bir işçi thread'inde çağırır:
+
+    get()      Önbellekteki değeri hemen döndürür. Değer TTL'den eskiyse
+               arka planda yenileme başlatılır ve bu arada eski değer
+               kullanılmaya devam eder (stale-while-revalidate). MAX_STALE'den
+               eski değer hiç döndürülmez.
+    refresh()  Yenilemeyi başlatır; zaten süren bir yenileme varsa yenisi
+               başlatılmaz, aynı Future döner.
+
+Yeni değer gelince dinleyiciler işçi thread'inden çağrılır: callback(weather).
+Veri uyduran sağlayıcılar (auto_refresh = False, ör. RandomProvider) süresi
+dolunca kendiliğinden yenilenmez; açılışta ve kullanıcı isteyince alınır.
+Son değer diske yazılır; uygulama açılırken ilk değer ağı beklemeden gelir.
+
+Sağlayıcı tanımları (arduino_gui_tkinter.py --weather):
+    random               Rastgele değerler (API yokken eski davranış)
+    file:<yol>           {"temperature": 21.5, "condition": "Açık"} içeren JSON dosyası
+    open-meteo:<enlem>,<boylam>   https://open-meteo.com (anahtar gerekmez)
+"""
+
+import datetime
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+WEATHER_TTL = 30 * 60      # Bu süreden eski değer arka planda yenilenir (saniye)
+MAX_STALE = 6 * 60 * 60    # Bu süreden eski değer gösterilmez (saniye)
+RETRY_INTERVAL = 60        # Başarısız yenilemeden sonra tekrar deneme süresi (saniye)
+FETCH_TIMEOUT = 10         # Ağ sağlayıcısının zaman aşımı (saniye)
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".domu", "weather.json")
+
+
+class Weather:
+    """Tek bir hava durumu ölçümü; fetched_at time.time() zamanıdır."""
+
+    __slots__ = ("temperature", "condition", "fetched_at")
+
+    def __init__(self, temperature, condition, fetched_at=None):
+        self.temperature = temperature
+        self.condition = condition
+        self.fetched_at = fetched_at
+
+    def to_dict(self):
+        return {"temperature": self.temperature, "condition": self.condition, "fetched_at": self.fetched_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(float(data["temperature"]), data["condition"], data.get("fetched_at"))
+
+
+class RandomProvider:
+    """Mevsime uygun rastgele değerler (gerçek kaynak yokken)."""
+
+    auto_refresh = False  # Uydurma değerler HVAC'a kendiliğinden verilmesin
+
+    def fetch(self):
+        temp = round(random.uniform(0.0, 35.0), 1)
+        if datetime.datetime.now().month in [5, 6, 7, 8, 9]:  # Yaz ayları
+            conditions = ["Güneşli", "Parçalı bulutlu", "Az bulutlu", "Açık"]
+        else:  # Kış ayları
+            conditions = ["Bulutlu", "Yağmurlu", "Parçalı bulutlu", "Kapalı"]
+        return Weather(temp, random.choice(conditions))
+
+
+class FileProvider:
+    """Her okumada JSON dosyasından değer alır (test ve yerel istasyonlar için)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self):
+        with open(self.path, encoding="utf-8") as f:
+            return Weather.from_dict(json.load(f))
+
+
+# WMO hava kodları -> durum metni (kodun üst sınırına göre)
+WMO_CONDITIONS = [(0, "Açık"), (2, "Parçalı bulutlu"), (3, "Kapalı"), (48, "Sisli"),
+                  (67, "Yağmurlu"), (77, "Karlı"), (82, "Sağanak"), (99, "Fırtınalı")]
+
+
+class OpenMeteoProvider:
+    """open-meteo.com anlık hava durumu."""
+
+    URL = "https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+
+    def __init__(self, latitude, longitude, timeout=FETCH_TIMEOUT):
+        self.url = self.URL.format(lat=latitude, lon=longitude)
+        self.timeout = timeout
+
+    def fetch(self):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            current = json.load(response)["current_weather"]
+        code = int(current.get("weathercode", 0))
+        condition = next((text for limit, text in WMO_CONDITIONS if code <= limit), "Bilinmiyor")
+        return Weather(round(float(current["temperature"]), 1), condition)
+
+
+def provider_from_spec(spec):
+    """"random", "file:<yol>" ya da "open-meteo:<enlem>,<boylam>" -> sağlayıcı."""
+    kind, _, value = spec.partition(":")
+    if kind == "random":
+        return RandomProvider()
+    if kind == "file":
+        return FileProvider(value)
+    if kind == "open-meteo":
+        latitude, longitude = value.split(",")
+        return OpenMeteoProvider(float(latitude), float(longitude))
+    raise ValueError(f"Bilinmeyen hava durumu sağlayıcısı: {spec}")
+
+
+class WeatherService:
+    """Sağlayıcıyı arka planda çağıran, TTL'li ve birleştirmeli önbellek."""
+
+    def __init__(self, provider, ttl=WEATHER_TTL, max_stale=MAX_STALE, cache_path=DEFAULT_CACHE_PATH,
+                 scheduler=None, clock=time.time, metrics=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.cache_path = cache_path
+        self.scheduler = scheduler  # domu_automation.Scheduler verilirse değer süresi dolunca kendiliğinden yenilenir
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="domu-weather")
+        self._lock = threading.Lock()
+        self._inflight = None  # Süren yenilemenin Future'ı
+        self._timer = None
+        self._listeners = []
+        self.current = self._load()
+
+        # İstatistikler
+        self.fetches = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.duration = None
+        if metrics is not None:
+            self.duration = metrics.histogram("domu_weather_fetch_seconds", "Hava durumu sağlayıcısının yanıt süresi")
+            metrics.callback("domu_weather_fetches_total", "Hava durumu sağlayıcısı çağrısı",
+                             lambda s: s.fetches, kind="counter", owner=self)
+            metrics.callback("domu_weather_errors_total", "Başarısız hava durumu yenilemesi",
+                             lambda s: s.errors, kind="counter", owner=self)
+            metrics.callback("domu_weather_coalesced_total", "Süren yenilemeye katılan istek",
+                             lambda s: s.coalesced, kind="counter", owner=self)
+            metrics.callback("domu_weather_age_seconds", "Önbellekteki hava durumunun yaşı",
+                             lambda s: s.age() or 0.0, owner=self)
+
+    def on(self, callback):
+        self._listeners.append(callback)
+
+    def age(self):
+        current = self.current
+        if current is None or current.fetched_at is None:
+            return None
+        return self.clock() - current.fetched_at
+
+    def get(self):
+        """Önbellekteki değer (bloklamaz); eskiyse arka planda yenileme başlatır."""
+        current = self.current
+        age = self.age()
+        if age is None or age >= self.ttl:
+            self.refresh()
+            if age is None or age >= self.max_stale:
+                return None
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return current
+
+    def start(self):
+        """Açılışta çağrılır: değer eskiyse hemen, değilse süresi dolunca yeniler."""
+        age = self.age()
+        if age is None or age >= self.ttl:
+            self.refresh()
+        else:
+            self._schedule(self.ttl - age)
+
+    def refresh(self):
+        """Yenilemeyi başlatır; süren bir yenileme varsa onun Future'ını döndürür."""
+        with self._lock:
+            if self._inflight is not None:
+                self.coalesced += 1
+                return self._inflight
+            future = self._inflight = self._executor.submit(self._fetch)
+        return future
+
+    def _fetch(self):
+        start = time.perf_counter()
+        self.fetches += 1
+        try:
+            weather = self.provider.fetch()
+            weather.fetched_at = self.clock()
+        except Exception as e:
+            self.errors += 1
+            print(f"Hava durumu alınamadı: {str(e)}")
+            with self._lock:
+                self._inflight = None
+            self._schedule(RETRY_INTERVAL)  # Eski değer MAX_STALE'e kadar gösterilmeye devam eder
+            raise
+        finally:
+            if self.duration:
+                self.duration.record(time.perf_counter() - start)
+        with self._lock:
+            self.current = weather
+            self._inflight = None
+        self._save(weather)
+        self._schedule(self.ttl)
+        for callback in list(self._listeners):
+            try:
+                callback(weather)
+            except Exception as e:
+                print(f"Hava durumu işlenirken hata: {str(e)}")
+        return weather
+
+    def _schedule(self, delay):
+        if self.scheduler is None or not getattr(self.provider, "auto_refresh", True):
+            return
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = self.scheduler.call_later(delay, self.refresh)
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return Weather.from_dict(json.load(f))
+        except Exception as e:
+            print(f"Hava durumu önbelleği okunamadı: {str(e)}")
+            return None
+
+    def _save(self, weather):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(weather.to_dict(), f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Hava durumu önbelleği yazılamadı: {str(e)}")
+
+    def close(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        self._executor.shutdown(wait=False)
@@ -7,16 +7,69 @@ const int ledPins[] = {3, 4, 5, 6}; // LED pinleri
 const int servoPin = 7; // Servo motor pin
 const int buzzerPin = 8; // Buzzer pini
 
+const int PROTOCOL_VERSION = 4; // READY satırında bildirilir (2: sıra numaraları, SUB_POT; 3: STATE, LED_SET; 4: LINK)
+
+// Hız ve çerçeve anlaşması (LINK): geçişten sonra LINK_CONFIRM_MS içinde
+// geçerli bir komut gelmezse başlangıç ayarına (9600, metin) dönülür
+const unsigned long BASE_BAUD = 9600;
+const unsigned long LINK_CONFIRM_MS = 1000;
+const long LINK_BAUDS[] = {9600, 19200, 38400, 57600, 115200, 230400, 250000, 500000, 1000000};
+const int LINK_BAUD_COUNT = 9;
+boolean binaryMode = false;   // Komutlar ve yanıtlar ikili çerçeveyle mi?
+boolean linkPending = false;  // Geçiş henüz doğrulanmadı
+unsigned long linkSwitchedAt = 0;
+
+// İkili çerçeve: 0xD5 | uzunluk | işlem kodu | [sıra, 2 bayt] | argümanlar | CRC-8
+// Argümanlar küçük uçlu sayılardır; biçimleri B (1 bayt), H (2), I (4)
+const byte FRAME_SYNC = 0xD5;
+const byte SEQ_FLAG = 0x80;
+const int MAX_FRAME_BODY = 24;
+const int COMMAND_COUNT = 11; // İşlem kodu 1..10
+const char* const COMMAND_NAMES[COMMAND_COUNT] = {"", "LED", "LED_SET", "OPEN_DOOR", "CLOSE_DOOR", "SUB_POT",
+                                                  "UNSUB_POT", "GET_POT", "STATE", "HELLO", "LINK"};
+const char* const COMMAND_ARGS[COMMAND_COUNT] = {"", "B", "BB", "", "", "BH", "", "", "", "", "IB"};
+const byte REPLY_OPCODE_BASE = 0x21;
+const int REPLY_COUNT = 10;
+const int STATE_REPLY = 6;
+const char* const REPLY_NAMES[REPLY_COUNT] = {"LED_OK", "DOOR_OPENED", "DOOR_CLOSED", "SUB_OK", "UNSUB_OK", "POT",
+                                              "STATE", "READY", "BUTTON_PRESSED", "LINK_OK"};
+const char* const REPLY_ARGS[REPLY_COUNT] = {"BB", "", "", "", "", "H", "BBH", "B", "", "IB"};
+byte frameBuffer[MAX_FRAME_BODY + 2]; // uzunluk, gövde, CRC
+int framePos = -1;                    // -1: 0xD5 bekleniyor; sonra alınan bayt sayısı
+
 Servo myServo; // Servo nesnesi
+int servoAngle = 0; // Servo'ya en son yazılan açı (STATE yanıtı için)
 String inputString = "";      // Seri porttan gelen string
 boolean stringComplete = false;  // String tamamlandı mı?
+const int RECENT_COUNT = 4;   // Hatırlanan son yanıt sayısı (istemcinin komut penceresi kadar)
+long recentSeqs[RECENT_COUNT] = {-1, -1, -1, -1}; // Son işlenen komutların sıra numaraları
+String recentReplies[RECENT_COUNT];               // Bu komutlara verilen yanıtlar
+int recentIndex = 0;
+
+// Potansiyometre aboneliği: değer ölü banttan fazla değişince POT: gönderilir
+boolean potSubscribed = false;
+int potDeadband = 4;                 // Bu kadar ya da daha az değişim gönderilmez
+unsigned long potMinInterval = 100;  // İki gönderim arasındaki en kısa süre (ms)
+int lastPotSent = -1;
+unsigned long lastPotSentAt = 0;
 
 void setupButton();
 void setupLEDs();
 void setupServo();
 void setupBuzzer();
 void checkButtonAndPotentiometer();
+void checkPotSubscription();
 void processSerialCommands();
+void reply(String message);
+void sendMessage(String message);
+void sendFrame(String message);
+void writeFrame(byte opcode, long seq, const byte* payload, int n);
+byte crc8(const byte* data, int n);
+void readFrameByte(byte inByte);
+void decodeFrame();
+void switchLink(long baud, boolean binary);
+void replyLedState(int ledNum);
+int findRecentReply(long seq);
 
 void setup() {
   setupButton();
@@ -27,9 +80,20 @@ void setup() {
   // Seri port iletişimi başlatılıyor
   Serial.begin(9600);
   inputString.reserve(200); // Seri port için bellek ayrılıyor
+  for (int i = 0; i < RECENT_COUNT; i++) {
+    recentReplies[i].reserve(24);
+  }
+
+  // Kurulum bitti: istemci sabit bir süre beklemek yerine bu satırı bekler
+  Serial.println("READY:" + String(PROTOCOL_VERSION));
 }
 
 void loop() {
+  // Yeni ayarla geçerli komut gelmediyse (istemci geçemedi) başlangıç ayarına dön
+  if (linkPending && millis() - linkSwitchedAt >= LINK_CONFIRM_MS) {
+    linkPending = false;
+    switchLink(BASE_BAUD, false);
+  }
   checkButtonAndPotentiometer();
   // runLEDSequence(); // Otomatik LED animasyonu kaldırıldı
   processSerialCommands();
@@ -49,6 +113,7 @@ void setupLEDs() {
 void setupServo() {
   myServo.attach(servoPin); // Servo motoru 7. pine bağla
   myServo.write(0); // Başlangıç pozisyonu
+  servoAngle = 0;
 }
 
 void setupBuzzer() {
@@ -56,6 +121,8 @@ void setupBuzzer() {
 }
 
 void checkButtonAndPotentiometer() {
+  checkPotSubscription();
+  
   buttonState = digitalRead(buttonPin);
   if (buttonState == LOW && lastButtonState == HIGH) { // Sadece ilk basışta
     // Zil sesi çal
@@ -65,13 +132,30 @@ void checkButtonAndPotentiometer() {
     delay(500); // Zil sesinin çalma süresi kadar bekle
     
     // Butona basıldığında GUI'ye bildir, kamerayı açmak için
-    Serial.println("BUTTON_PRESSED");
+    sendMessage("BUTTON_PRESSED");
     
     delay(500); // Debounce için kısa bekleme
   }
   lastButtonState = buttonState;
 }
 
+// Abonelik açıksa potansiyometre değişimini GUI'ye bildir
+void checkPotSubscription() {
+  if (!potSubscribed) {
+    return;
+  }
+  unsigned long now = millis();
+  if (now - lastPotSentAt < potMinInterval) {
+    return;
+  }
+  int potValue = analogRead(A0);
+  if (lastPotSent < 0 || abs(potValue - lastPotSent) > potDeadband) {
+    sendMessage("POT:" + String(potValue));
+    lastPotSent = potValue;
+    lastPotSentAt = now;
+  }
+}
+
 void runLEDSequence() {
   // static unsigned long previousMillis = 0;
   // const long interval = 400; // LED'ler arası geçiş süresi (ms)
@@ -101,9 +185,13 @@ void runLEDSequence() {
 
 // Seri porttan gelen veriyi işle
 void serialEvent() {
-  while (Serial.available()) {
+  // Bir komut tamamlandığında okumayı bırak; sonraki komutlar işlenene
+  // kadar donanım tamponunda bekler (ardışık gönderilen komutlar karışmaz)
+  while (Serial.available() && !stringComplete) {
     char inChar = (char)Serial.read();
-    if (inChar == '\n') {
+    if (binaryMode) {
+      readFrameByte((byte)inChar);
+    } else if (inChar == '\n') {
       stringComplete = true;
     } else {
       inputString += inChar;
@@ -111,36 +199,303 @@ void serialEvent() {
   }
 }
 
+// İkili kipte gelen baytı çerçeveye ekle; çerçeve tamamlanınca komut satırına çevir
+void readFrameByte(byte inByte) {
+  if (framePos < 0) {
+    if (inByte == FRAME_SYNC) {
+      framePos = 0;
+    }
+    return;
+  }
+  if (framePos == 0 && (inByte == 0 || inByte > MAX_FRAME_BODY)) {
+    framePos = -1; // Bozuk uzunluk: sonraki 0xD5'i bekle
+    return;
+  }
+  frameBuffer[framePos++] = inByte;
+  int length = frameBuffer[0];
+  if (framePos < length + 2) {
+    return;
+  }
+  framePos = -1;
+  if (crc8(frameBuffer, length + 1) == frameBuffer[length + 1]) {
+    decodeFrame();
+  }
+}
+
+// Çerçeveyi metin komutuna çevir (ör. 0x82 0x11 0x00 0x02 0x01 -> "LED_SET:2:1#17");
+// böylece komutlar iki kipte de aynı kodla işlenir
+void decodeFrame() {
+  int length = frameBuffer[0];
+  byte opcode = frameBuffer[1];
+  int pos = 2;
+  long seq = -1;
+  if (opcode & SEQ_FLAG) {
+    seq = frameBuffer[2] | ((long)frameBuffer[3] << 8);
+    pos = 4;
+    opcode &= ~SEQ_FLAG;
+  }
+  if (opcode == 0 || opcode >= COMMAND_COUNT) {
+    return;
+  }
+  String command = COMMAND_NAMES[opcode];
+  for (const char* layout = COMMAND_ARGS[opcode]; *layout; layout++) {
+    int size = *layout == 'B' ? 1 : *layout == 'H' ? 2 : 4;
+    if (pos + size > length + 1) {
+      return; // Argümanlar eksik
+    }
+    unsigned long value = 0;
+    for (int i = size - 1; i >= 0; i--) {
+      value = (value << 8) | frameBuffer[pos + i];
+    }
+    command += ":" + String(value);
+    pos += size;
+  }
+  if (pos != length + 1) {
+    return; // Fazla bayt: bu işlem kodunun çerçevesi değil
+  }
+  if (seq >= 0) {
+    command += "#" + String(seq);
+  }
+  inputString = command;
+  stringComplete = true;
+}
+
+// CRC-8, polinom 0x07
+byte crc8(const byte* data, int n) {
+  byte crc = 0;
+  for (int i = 0; i < n; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = crc & 0x80 ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Mesajı geçerli kipte gönder: metin satırı ya da ikili çerçeve
+void sendMessage(String message) {
+  if (binaryMode) {
+    sendFrame(message);
+  } else {
+    Serial.println(message);
+  }
+}
+
+// "LED_OK:2:1#17" gibi bir yanıtı ikili çerçeveye çevirip gönder
+void sendFrame(String message) {
+  long seq = -1;
+  int seqIndex = message.indexOf('#');
+  if (seqIndex >= 0) {
+    seq = message.substring(seqIndex + 1).toInt();
+    message = message.substring(0, seqIndex);
+  }
+  int colon = message.indexOf(':');
+  String name = colon >= 0 ? message.substring(0, colon) : message;
+  int index = -1;
+  for (int i = 0; i < REPLY_COUNT; i++) {
+    if (name.equals(REPLY_NAMES[i])) {
+      index = i;
+    }
+  }
+  if (index < 0) {
+    return;
+  }
+  byte payload[MAX_FRAME_BODY];
+  int n = 0;
+  int start = colon + 1;
+  for (const char* layout = REPLY_ARGS[index]; *layout && start > 0; layout++) {
+    int end = message.indexOf(':', start);
+    String field = message.substring(start, end >= 0 ? end : message.length());
+    start = end + 1;
+    unsigned long value = field.toInt();
+    if (index == STATE_REPLY && layout == REPLY_ARGS[index]) {
+      // LED bitleri ("0101") tek bayta: bit i = LED i
+      value = 0;
+      for (unsigned int i = 0; i < field.length(); i++) {
+        if (field.charAt(i) == '1') {
+          value |= 1 << i;
+        }
+      }
+    }
+    int size = *layout == 'B' ? 1 : *layout == 'H' ? 2 : 4;
+    for (int i = 0; i < size; i++) {
+      payload[n++] = (value >> (8 * i)) & 0xFF;
+    }
+  }
+  writeFrame(REPLY_OPCODE_BASE + index, seq, payload, n);
+}
+
+void writeFrame(byte opcode, long seq, const byte* payload, int n) {
+  byte frame[MAX_FRAME_BODY + 3];
+  int length = 0;
+  frame[length++] = FRAME_SYNC;
+  frame[length++] = 0; // Uzunluk aşağıda yazılır
+  frame[length++] = seq >= 0 ? opcode | SEQ_FLAG : opcode;
+  if (seq >= 0) {
+    frame[length++] = seq & 0xFF;
+    frame[length++] = (seq >> 8) & 0xFF;
+  }
+  for (int i = 0; i < n; i++) {
+    frame[length++] = payload[i];
+  }
+  frame[1] = length - 2;
+  frame[length] = crc8(frame + 1, length - 1);
+  length++;
+  Serial.write(frame, length);
+}
+
+// Yanıt eski ayarla gittikten sonra yeni hıza ve kipe geç
+void switchLink(long baud, boolean binary) {
+  Serial.flush(); // Gönderilmeyi bekleyen yanıtın bitmesini bekle
+  Serial.end();
+  Serial.begin(baud);
+  binaryMode = binary;
+  framePos = -1;
+  inputString = "";
+  linkSwitchedAt = millis();
+}
+
+// Yanıtı gönder; komut sıra numarasıyla geldiyse numarayı geri yolla
+// (ör. "LED:2#17" -> "LED_OK:2:1#17")
+long currentSeq = -1;
+
+void reply(String message) {
+  if (currentSeq >= 0) {
+    message += "#";
+    message += currentSeq;
+    recentSeqs[recentIndex] = currentSeq;
+    recentReplies[recentIndex] = message;
+    recentIndex = (recentIndex + 1) % RECENT_COUNT;
+  }
+  sendMessage(message);
+}
+
+// LED'in mutlak durumunu bildir: "LED_OK:<led>:<0|1>"
+void replyLedState(int ledNum) {
+  reply("LED_OK:" + String(ledNum) + ":" + String(digitalRead(ledPins[ledNum]) == HIGH ? 1 : 0));
+}
+
+// Bu sıra numarası yakın zamanda işlendiyse yanıtının indeksini döndür
+int findRecentReply(long seq) {
+  for (int i = 0; i < RECENT_COUNT; i++) {
+    if (recentSeqs[i] == seq) {
+      return i;
+    }
+  }
+  return -1;
+}
+
 // Seri porttan gelen komutları işle
 void processSerialCommands() {
   if (stringComplete) {
+    // İsteğe bağlı sıra numarasını ayır: "KOMUT#123"
+    currentSeq = -1;
+    int seqIndex = inputString.indexOf('#');
+    if (seqIndex >= 0) {
+      currentSeq = inputString.substring(seqIndex + 1).toInt();
+      inputString = inputString.substring(0, seqIndex);
+    }
+    inputString.trim();
+
+    // Aynı sıra numarası tekrar geldiyse (yanıt kaybolmuş, istemci yeniden
+    // denemiş) komutu tekrar çalıştırma, önceki yanıtı yeniden gönder
+    int recent = currentSeq >= 0 ? findRecentReply(currentSeq) : -1;
+    boolean recognized = true;
+    boolean linkCommand = inputString.startsWith("LINK:");
+    if (recent >= 0) {
+      sendMessage(recentReplies[recent]);
+    }
     // LED kontrolü
-    if (inputString.startsWith("LED:")) {
+    else if (inputString.startsWith("LED:")) {
       int ledNum = inputString.substring(4).toInt();
       if (ledNum >= 0 && ledNum < 4) {
         // LED'in mevcut durumunu oku ve tersine çevir (toggle)
         int currentState = digitalRead(ledPins[ledNum]);
         digitalWrite(ledPins[ledNum], !currentState); // Yeni durumu yaz
         
-        Serial.print("LED_OK:");
-        Serial.println(ledNum); // Hangi LED'in durumu değiştiğini GUI'ye bildir
+        replyLedState(ledNum); // LED'in yeni durumunu GUI'ye bildir
+      }
+    }
+    // LED'i belirli bir duruma getir: "LED_SET:<led>:<0|1>" (tekrar gelmesi zararsız)
+    else if (inputString.startsWith("LED_SET:")) {
+      int separator = inputString.indexOf(':', 8);
+      int ledNum = inputString.substring(8, separator >= 0 ? separator : inputString.length()).toInt();
+      if (ledNum >= 0 && ledNum < 4 && separator >= 0) {
+        int value = inputString.substring(separator + 1).toInt();
+        digitalWrite(ledPins[ledNum], value ? HIGH : LOW);
+        replyLedState(ledNum);
       }
     }
     // Servo kontrolü - kapı açma
     else if (inputString.startsWith("OPEN_DOOR")) {
       myServo.write(90); // Kapıyı aç - 90 derece döndür
-      Serial.println("DOOR_OPENED");
+      servoAngle = 90;
+      reply("DOOR_OPENED");
     }
     // Servo kontrolü - kapı kapama
     else if (inputString.startsWith("CLOSE_DOOR")) {
       myServo.write(0); // Kapıyı kapat - başlangıç pozisyonuna dön
-      Serial.println("DOOR_CLOSED");
+      servoAngle = 0;
+      reply("DOOR_CLOSED");
+    }
+    // Potansiyometre aboneliği: "SUB_POT:<ölü bant>:<en kısa aralık ms>"
+    else if (inputString.startsWith("SUB_POT")) {
+      int first = inputString.indexOf(':');
+      int second = inputString.indexOf(':', first + 1);
+      if (first >= 0) {
+        potDeadband = inputString.substring(first + 1, second >= 0 ? second : inputString.length()).toInt();
+      }
+      if (second >= 0) {
+        potMinInterval = inputString.substring(second + 1).toInt();
+      }
+      potSubscribed = true;
+      lastPotSent = -1; // İlk değeri hemen gönder
+      reply("SUB_OK");
+    }
+    else if (inputString.equals("UNSUB_POT")) {
+      potSubscribed = false;
+      reply("UNSUB_OK");
     }
     // Potansiyometre değerini oku
     else if (inputString.equals("GET_POT")) {
       int potValue = analogRead(A0);
-      Serial.print("POT:");
-      Serial.println(potValue);
+      reply("POT:" + String(potValue));
+    }
+    // Bütün durum tek satırda: "STATE:<LED bitleri>:<servo açısı>:<pot>"
+    else if (inputString.equals("STATE")) {
+      String state = "STATE:";
+      for (int i = 0; i < 4; i++) {
+        state += digitalRead(ledPins[i]) == HIGH ? "1" : "0";
+      }
+      state += ":" + String(servoAngle) + ":" + String(analogRead(A0));
+      reply(state);
+    }
+    // Port açılınca reset olmayan kartlar için READY satırını tekrar gönder
+    else if (inputString.equals("HELLO")) {
+      reply("READY:" + String(PROTOCOL_VERSION));
+    }
+    // Hız ve çerçeve anlaşması: "LINK:<baud>:<0|1>"; yanıt eski ayarla gider, sonra geçilir
+    else if (linkCommand) {
+      int separator = inputString.indexOf(':', 5);
+      long baud = inputString.substring(5, separator >= 0 ? separator : inputString.length()).toInt();
+      boolean binary = separator >= 0 && inputString.substring(separator + 1).toInt() != 0;
+      boolean supported = false;
+      for (int i = 0; i < LINK_BAUD_COUNT; i++) {
+        supported = supported || LINK_BAUDS[i] == baud;
+      }
+      if (supported) {
+        reply("LINK_OK:" + String(baud) + ":" + String(binary ? 1 : 0));
+        switchLink(baud, binary);
+        linkPending = true;
+      }
+    }
+    else {
+      recognized = false;
+    }
+
+    // Yeni ayarla geçerli bir komut geldi: geçiş kalıcı
+    if (recognized && !linkCommand) {
+      linkPending = false;
     }
     
     // Komut işlendikten sonra temizle